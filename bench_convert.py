@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_convert.py - 画像変換パイプライン（convert_to_webp.py）のベンチマーク
+
+エンコード設定を変える前後で実行し、速度とファイルサイズの変化をデータで確認するためのもの。
+
+使い方:
+  python bench_convert.py                            # 現在の設定で計測 → 履歴に追記 → ベースラインと比較
+  python bench_convert.py --quality 75 85 90 --method 4 6   # 設定の組み合わせを比較
+  python bench_convert.py --scale 0.5                # コーパスを縮小して手早く確認
+  python bench_convert.py --save-baseline            # 今回の結果をベースラインとして保存
+  python bench_convert.py --check                    # ベースラインより悪化していたら終了コード 1
+
+計測内容:
+  - 合成コーパス: generate_images.py の IMAGES と同じアスペクト比 × 長辺 3 サイズ × RGB / RGBA / P
+    （乱数シード固定なので毎回同じ画像。RGB は JPEG、RGBA / P は PNG として用意する）
+  - 設定（WebP の quality × method、AVIF）ごとに デコード / エンコード / 書き込み を別々に計測し、
+    スループット（MP/s = 100万画素/秒）・出力バイト数・ピークメモリ（RSS）を記録
+    （ピークメモリを設定ごとに測るため、設定ごとに新しいプロセスで実行する）
+  - convert_image() 相当（_convert_task: バリアント・AVIF 比較込み）の1枚あたり時間
+  - update_html() の HTML 書き換え（rewrite_references / add_srcset）の処理時間
+  - 結果は bench/history.json に追記し、bench/baseline.json と比較する
+"""
+
+import argparse
+import ast
+import io
+import json
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from io import BytesIO
+from pathlib import Path
+
+# Windows ターミナルの文字化け対策
+if sys.stdout.encoding.lower() != "utf-8":
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
+if sys.stderr.encoding.lower() != "utf-8":
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8")
+
+import convert_to_webp as cw
+from PIL import Image, __version__ as PILLOW_VERSION
+
+
+# ============================================================
+# 設定
+# ============================================================
+
+BENCH_DIR     = Path("bench")
+HISTORY_PATH  = BENCH_DIR / "history.json"
+BASELINE_PATH = BENCH_DIR / "baseline.json"
+
+LONG_EDGES = (800, 1920, 3840)      # コーパスの長辺 [px]（--scale で一律に縮小）
+MODES      = ("RGB", "RGBA", "P")
+SEED       = 20240601
+
+# ベースラインとの比較でこれを超えたら悪化とみなす
+REGRESSION_SPEED = 0.10   # スループットの低下率
+REGRESSION_BYTES = 0.01   # 出力バイト数の増加率
+
+
+# ============================================================
+# コーパス
+# ============================================================
+
+def spec_aspect_ratios(path: Path = Path("generate_images.py")) -> list:
+    """
+    generate_images.py の IMAGES からアスペクト比の一覧を取る。
+    google-genai がないと import できないので、ソースを構文解析して読む。
+    """
+    ratios = []
+    tree = ast.parse(path.read_text(encoding="utf-8"))
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and getattr(node.targets[0], "id", None) == "IMAGES":
+            for item in node.value.elts:
+                for key, value in zip(item.keys, item.values):
+                    if getattr(key, "value", None) == "aspect_ratio" and isinstance(value, ast.Constant):
+                        ratios.append(value.value)
+    return sorted(set(ratios)) or ["4:3"]
+
+
+def synth_image(width: int, height: int, mode: str, rng: random.Random) -> "Image.Image":
+    """写真に近い情報量の合成画像（グラデーション + ノイズ + 図形）"""
+    gradient = Image.linear_gradient("L").resize((width, height)).rotate(rng.uniform(0, 360))
+    channels = [
+        Image.blend(gradient, Image.effect_noise((width, height), rng.uniform(10, 60)), rng.uniform(0.2, 0.6))
+        for _ in range(3)
+    ]
+    img = Image.merge("RGB", channels)
+    for _ in range(8):
+        x, y = rng.randrange(width), rng.randrange(height)
+        r = rng.randrange(max(2, min(width, height) // 4))
+        color = tuple(rng.randrange(256) for _ in range(3))
+        img.paste(color, (max(0, x - r), max(0, y - r), min(width, x + r), min(height, y + r)))
+
+    if mode == "RGBA":
+        img.putalpha(Image.linear_gradient("L").resize((width, height)))
+    elif mode == "P":
+        img = img.quantize(colors=256)
+    return img
+
+
+def build_corpus(scale: float) -> list:
+    """
+    合成コーパスを作る。
+    戻り値: [{"name", "mode", "width", "height", "source": 元ファイルのバイト列, "ext"}, ...]
+    """
+    rng = random.Random(SEED)
+    corpus = []
+    for ratio in spec_aspect_ratios():
+        rw, rh = (int(x) for x in ratio.split(":"))
+        for edge in LONG_EDGES:
+            edge = max(16, int(edge * scale))
+            w, h = (edge, round(edge * rh / rw)) if rw >= rh else (round(edge * rw / rh), edge)
+            for mode in MODES:
+                img = synth_image(w, h, mode, rng)
+                buf = BytesIO()
+                ext = ".jpg" if mode == "RGB" else ".png"
+                img.save(buf, format="JPEG" if ext == ".jpg" else "PNG", quality=92)
+                corpus.append({
+                    "name": f"{ratio.replace(':', 'x')}-{edge}-{mode.lower()}{ext}",
+                    "mode": mode, "width": w, "height": h,
+                    "source": buf.getvalue(), "ext": ext,
+                })
+    return corpus
+
+
+# ============================================================
+# 計測（設定ごとに新しいプロセスで実行する）
+# ============================================================
+
+def _decode(source: bytes) -> "Image.Image":
+    """convert_to_webp の _decode() でデコードする（モード変換・省メモリ設定も本番と同じ）"""
+    memory_limit = cw.MEMORY_LIMIT_MB if cw.LOW_MEMORY else None
+    return cw._decode(Image.open(BytesIO(source)), memory_limit)
+
+
+def _encode(img: "Image.Image", setting: dict) -> bytes:
+    buf = BytesIO()
+    if setting["format"] == "WEBP":
+        img.save(buf, format="WEBP", quality=setting["quality"], method=setting["method"])
+    else:
+        img.save(buf, format="AVIF", quality=setting["quality"], speed=setting["speed"])
+    return buf.getvalue()
+
+
+def bench_setting(setting: dict, corpus: list, repeat: int) -> dict:
+    """1つのエンコード設定について、デコード / エンコード / 書き込みの時間を測る（最速の回を採用）"""
+    decode_s = encode_s = write_s = 0.0
+    output_bytes = 0
+    megapixels = sum(item["width"] * item["height"] for item in corpus) / 1e6
+
+    with tempfile.TemporaryDirectory(prefix="bench_convert_") as tmp:
+        for item in corpus:
+            best = None
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                img = _decode(item["source"])
+                t1 = time.perf_counter()
+                data = _encode(img, setting)
+                t2 = time.perf_counter()
+                Path(tmp, item["name"]).with_suffix(setting["ext"]).write_bytes(data)
+                t3 = time.perf_counter()
+                times = (t1 - t0, t2 - t1, t3 - t2)
+                if best is None or sum(times) < sum(best):
+                    best = times
+            decode_s += best[0]
+            encode_s += best[1]
+            write_s += best[2]
+            output_bytes += len(data)
+
+    return {
+        "megapixels":   round(megapixels, 2),
+        "decode_s":     round(decode_s, 4),
+        "encode_s":     round(encode_s, 4),
+        "write_s":      round(write_s, 4),
+        "decode_mps":   round(megapixels / decode_s, 2) if decode_s else None,
+        "encode_mps":   round(megapixels / encode_s, 2) if encode_s else None,
+        "write_mps":    round(megapixels / write_s, 2) if write_s else None,
+        "input_bytes":  sum(len(item["source"]) for item in corpus),
+        "output_bytes": output_bytes,
+        "peak_rss_mb":  cw.peak_rss_mb(),
+    }
+
+
+def bench_convert_task(corpus: list, quality: int) -> dict:
+    """convert_image() と同じ処理（_convert_task: バリアント・AVIF 比較込み）を1枚ずつ実行して測る"""
+    megapixels = sum(item["width"] * item["height"] for item in corpus) / 1e6
+    output_bytes = 0
+    with tempfile.TemporaryDirectory(prefix="bench_convert_") as tmp:
+        started = time.perf_counter()
+        for item in corpus:
+            src = Path(tmp, item["name"])
+            src.write_bytes(item["source"])
+            ok, _, _, error, _, entry = cw._convert_task(src, quality)
+            if not ok:
+                raise RuntimeError(f"{item['name']}: {error}")
+            output_bytes += cw.served_size(entry)
+        elapsed = time.perf_counter() - started
+    return {
+        "megapixels":   round(megapixels, 2),
+        "total_s":      round(elapsed, 4),
+        "per_image_ms": round(elapsed / len(corpus) * 1000, 1),
+        "total_mps":    round(megapixels / elapsed, 2),
+        "output_bytes": output_bytes,
+        "peak_rss_mb":  cw.peak_rss_mb(),
+    }
+
+
+def run_isolated(fn, *args) -> dict:
+    """ピークメモリを設定ごとに分けるため、新しいプロセスで 1 回だけ実行する"""
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def bench_update_html(repeat: int) -> dict:
+    """
+    update_html() の書き換え処理（rewrite_references + add_srcset）の時間を測る。
+    案件フォルダを一時ディレクトリにコピーして実行するので、実ファイルは変更しない。
+    """
+    project_dir = cw.HTML_PATH.parent
+    if not cw.HTML_PATH.exists():
+        return {}
+    with tempfile.TemporaryDirectory(prefix="bench_convert_") as tmp:
+        work = Path(tmp) / project_dir.name
+        shutil.copytree(project_dir, work, ignore=shutil.ignore_patterns("*.bak", "logs", "php"))
+        html = (work / "index.html").read_text(encoding="utf-8")
+        rewrite = srcset = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            rewritten, _, _ = cw.rewrite_references(html, work)
+            t1 = time.perf_counter()
+            cw.add_srcset(rewritten, work)
+            t2 = time.perf_counter()
+            rewrite, srcset = min(rewrite, t1 - t0), min(srcset, t2 - t1)
+    size_mb = len(html.encode("utf-8")) / 1e6
+    return {
+        "html_bytes":       len(html.encode("utf-8")),
+        "rewrite_ms":       round(rewrite * 1000, 2),
+        "add_srcset_ms":    round(srcset * 1000, 2),
+        "rewrite_mb_per_s": round(size_mb / rewrite, 2) if rewrite else None,
+    }
+
+
+# ============================================================
+# 履歴・ベースライン
+# ============================================================
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def append_history(run: dict) -> None:
+    BENCH_DIR.mkdir(exist_ok=True)
+    history = json.loads(HISTORY_PATH.read_text(encoding="utf-8")) if HISTORY_PATH.exists() else []
+    history.append(run)
+    HISTORY_PATH.write_text(json.dumps(history, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+
+
+def compare(run: dict, baseline: dict) -> list:
+    """ベースラインとの比較を表示し、悪化した項目の一覧を返す"""
+    regressions = []
+    if baseline.get("scale") != run["scale"]:
+        print(f"  [WARN] コーパスの縮小率が違います（ベースライン {baseline.get('scale')} / 今回 {run['scale']}）")
+
+    print(f"\n-- ベースライン比較（{baseline.get('timestamp', '?')} / {baseline.get('commit') or '-'}） --")
+    for key, now in run["settings"].items():
+        before = baseline.get("settings", {}).get(key)
+        if not before:
+            print(f"  {key:<20} （ベースラインになし）")
+            continue
+        speed = (now["encode_mps"] / before["encode_mps"] - 1) if before.get("encode_mps") else 0
+        size = (now["output_bytes"] / before["output_bytes"] - 1) if before.get("output_bytes") else 0
+        mark = ""
+        if speed < -REGRESSION_SPEED:
+            regressions.append(f"{key}: エンコード速度 {speed:+.0%}")
+            mark += " ⚠ 速度"
+        if size > REGRESSION_BYTES:
+            regressions.append(f"{key}: 出力サイズ {size:+.1%}")
+            mark += " ⚠ サイズ"
+        print(f"  {key:<20} エンコード {before['encode_mps']:>7.2f} → {now['encode_mps']:>7.2f} MP/s ({speed:+.0%})"
+              f"  出力 {before['output_bytes'] // 1024:>7} → {now['output_bytes'] // 1024:>7} KB ({size:+.1%}){mark}")
+    return regressions
+
+
+# ============================================================
+# メイン処理
+# ============================================================
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="画像変換パイプラインのベンチマーク")
+    parser.add_argument("--quality", type=int, nargs="+", default=[cw.WEBP_QUALITY],
+                        help=f"WebP の quality（複数指定可。既定: {cw.WEBP_QUALITY}）")
+    parser.add_argument("--method", type=int, nargs="+", default=[cw.WEBP_METHOD],
+                        help=f"WebP の method（複数指定可。既定: {cw.WEBP_METHOD}）")
+    parser.add_argument("--no-avif", action="store_true", help="AVIF の計測を行わない")
+    parser.add_argument("--scale", type=float, default=1.0, help="コーパスの縮小率（既定: 1.0）")
+    parser.add_argument("--repeat", type=int, default=1, help="各画像の計測回数（最速の回を採用）")
+    parser.add_argument("--save-baseline", action="store_true", help="今回の結果をベースラインとして保存")
+    parser.add_argument("--check", action="store_true", help="ベースラインより悪化していたら終了コード 1")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    settings = {
+        f"webp-q{q}-m{m}": {"format": "WEBP", "quality": q, "method": m, "ext": ".webp"}
+        for q in args.quality for m in args.method
+    }
+    if cw.avif_enabled() and not args.no_avif:
+        settings[f"avif-q{cw.AVIF_QUALITY}-s{cw.AVIF_SPEED}"] = {
+            "format": "AVIF", "quality": cw.AVIF_QUALITY, "speed": cw.AVIF_SPEED, "ext": ".avif",
+        }
+
+    corpus = build_corpus(args.scale)
+    megapixels = sum(item["width"] * item["height"] for item in corpus) / 1e6
+
+    print(f"\n{'='*50}")
+    print(f"  画像変換ベンチマーク")
+    print(f"  コーパス: {len(corpus)} 枚 / {megapixels:.1f} MP（縮小率 {args.scale}）")
+    print(f"  設定:     {', '.join(settings)}")
+    print(f"  Pillow {PILLOW_VERSION} / Python {platform.python_version()}")
+    print(f"{'='*50}\n")
+
+    results = {}
+    for key, setting in settings.items():
+        r = results[key] = run_isolated(bench_setting, setting, corpus, args.repeat)
+        rss = f"{r['peak_rss_mb']} MB" if r["peak_rss_mb"] is not None else "-"
+        print(f"  {key:<20} デコード {r['decode_mps']:>7.2f} / エンコード {r['encode_mps']:>7.2f} / "
+              f"書き込み {r['write_mps']:>8.2f} MP/s   出力 {r['output_bytes'] // 1024:>7} KB   RSS {rss}")
+
+    task = run_isolated(bench_convert_task, corpus, cw.WEBP_QUALITY)
+    print(f"\n  convert_image()     {task['per_image_ms']:>8.1f} ms/枚  {task['total_mps']:.2f} MP/s  "
+          f"出力 {task['output_bytes'] // 1024} KB（バリアント・AVIF 比較込み）")
+
+    html = bench_update_html(max(3, args.repeat))
+    if html:
+        print(f"  update_html()       書き換え {html['rewrite_ms']} ms + srcset {html['add_srcset_ms']} ms"
+              f"（{html['html_bytes'] // 1024} KB）")
+
+    run = {
+        "timestamp":    datetime.now().isoformat(timespec="seconds"),
+        "commit":       git_commit(),
+        "python":       platform.python_version(),
+        "pillow":       PILLOW_VERSION,
+        "scale":        args.scale,
+        "corpus":       {"images": len(corpus), "megapixels": round(megapixels, 2)},
+        "settings":     results,
+        "convert_task": task,
+        "update_html":  html,
+    }
+    append_history(run)
+    print(f"\n  📄 履歴に追記: {HISTORY_PATH}")
+
+    regressions = []
+    if BASELINE_PATH.exists():
+        regressions = compare(run, json.loads(BASELINE_PATH.read_text(encoding="utf-8")))
+    if args.save_baseline or not BASELINE_PATH.exists():
+        BASELINE_PATH.write_text(json.dumps(run, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        print(f"  📌 ベースラインを保存: {BASELINE_PATH}")
+
+    if regressions:
+        print("\n  ベースラインより悪化した項目:")
+        for line in regressions:
+            print(f"    - {line}")
+    print()
+
+    if args.check and regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,832 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+build_assets.py - CSS / JS のビルド（圧縮 + ファイル名へのハッシュ付与）
+
+サイト完成後、convert_to_webp.py と同じタイミングで実行する。
+output/{案件名}/assets/css/*.css と assets/js/*.js を圧縮し、内容のハッシュを付けたファイル
+（例: styles.3f2a9c1d.css / script.8b7e01aa.js）として書き出して、index.html の参照を書き換える。
+ファイル名が内容ごとに変わるので、ハッシュ付きファイルは 1 年間キャッシュさせてよい
+（assets/.htaccess で Cache-Control: immutable を付ける）。
+
+使い方:
+  python build_assets.py
+  python build_assets.py --all         # output/ 配下の全案件をまとめてビルド
+  python build_assets.py --critical    # ファーストビューの CSS を index.html に埋め込む（Playwright が必要）
+
+機能:
+  - CSS の圧縮（コメント・余分な空白・最後のセミコロンを削除。文字列の中身はそのまま）
+  - JS の圧縮（コメントとインデント・空行を削除。改行は ASI に影響する箇所だけ残す。
+    文字列・テンプレートリテラル・正規表現リテラルの中身はそのまま）
+  - 内容の SHA-256 先頭 8 桁をファイル名に付与し、古いハッシュ付きファイルは削除
+  - index.html の <link href> / <script src> を書き換え
+    （convert_to_webp.py と同じくタグ単位で解析し、属性値だけを対象にする。再実行しても同じ結果）
+  - assets/.asset-manifest.json に 元ファイル → ハッシュ付きファイル の対応を記録
+  - assets/.htaccess にハッシュ付きファイル用のキャッシュ設定を書き出す（Apache / XAMPP）
+  - 元の styles.css / script.js は編集用にそのまま残す
+  - --critical: テストと同じ 3 画面サイズで描画し、ファーストビューに当たるルールだけを
+    <style data-critical> として <head> に埋め込み、スタイルシート（Google Fonts 含む）は非同期読み込みにする
+    （再実行すると前回の埋め込みを外してから作り直す）
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import posixpath
+import re
+import shutil
+import sys
+from pathlib import Path
+from urllib.parse import urlsplit
+from urllib.request import url2pathname
+
+# Windows ターミナルの文字化け対策
+if sys.stdout.encoding.lower() != "utf-8":
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
+if sys.stderr.encoding.lower() != "utf-8":
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8")
+
+# HTML の解析は画像参照の書き換えと共通のものを使う
+from convert_to_webp import CANONICAL_RE, CSS_URL_RE, TAG_ATTR_RE, TOKEN_RE, _local_path
+
+
+# ============================================================
+# 設定（案件ごとにここを変更する）
+# ============================================================
+
+PROJECT_NAME = "THE-CORNER-CAFE_v3"
+PROJECT_DIR  = Path(f"output/{PROJECT_NAME}")
+
+OUTPUT_ROOT  = Path("output")  # --all で案件を探すディレクトリ（{案件名}/index.html）
+
+ASSET_DIRS    = {"css": ".css", "js": ".js"}   # assets/ 配下のビルド対象ディレクトリと拡張子
+HASH_LENGTH   = 8
+MANIFEST_NAME = ".asset-manifest.json"         # assets/ 内に保存
+
+# ハッシュ付きファイルの配信設定（assets/.htaccess に書き出す）
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+HASHED_RE = re.compile(r"\.[0-9a-f]{%d}(\.[a-z0-9]+)$" % HASH_LENGTH)
+
+HTACCESS = f"""# build_assets.py が生成（ハッシュ付きファイルは内容が変わると名前も変わるので 1 年キャッシュする）
+<IfModule mod_headers.c>
+  <FilesMatch "\\.[0-9a-f]{{{HASH_LENGTH}}}\\.(css|js|woff2)(\\.br|\\.gz)?$">
+    Header set Cache-Control "{IMMUTABLE_CACHE_CONTROL}"
+  </FilesMatch>
+</IfModule>
+"""
+
+
+# ============================================================
+# CSS の圧縮
+# ============================================================
+
+CSS_TOKEN_RE = re.compile(
+    r"""
+      (?P<comment>/\*.*?\*/)
+    | (?P<string>"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')
+    | (?P<space>\s+)
+    """,
+    re.DOTALL | re.VERBOSE,
+)
+# 前後の空白を消してよい記号（: はセレクタの "a :hover" と "a:hover" が別物なので後ろだけ）
+CSS_TIGHT_BOTH   = set("{};,>")
+CSS_TIGHT_AFTER  = set(":(")
+CSS_TIGHT_BEFORE = set(")")
+CSS_TRAILING_SEMICOLON_RE = re.compile(r";+(?=\})")
+
+
+def minify_css(css: str) -> str:
+    """コメントと不要な空白、} の直前の ; を削除する。文字列の中身と calc() の演算子まわりの空白は残す。"""
+    out: list = []
+    pos = 0
+
+    def _last() -> str:
+        return out[-1][-1] if out else ""
+
+    def _append(chunk: str, literal: bool = True) -> None:
+        if literal:
+            # 文字列トークン以外の中にある ;} もまとめる（.a{margin:0 auto;} など空白を挟まない場合）
+            chunk = CSS_TRAILING_SEMICOLON_RE.sub("", chunk)
+        if not chunk:
+            return
+        if chunk[0] == "}" and _last() == ";":
+            out[-1] = out[-1][:-1]
+            if not out[-1]:
+                out.pop()
+        out.append(chunk)
+
+    for m in CSS_TOKEN_RE.finditer(css):
+        _append(css[pos:m.start()])
+        pos = m.end()
+        if m.group("string"):
+            _append(m.group("string"), literal=False)
+        elif m.group("space"):
+            nxt = css[pos:pos + 1]
+            if _last() in CSS_TIGHT_BOTH | CSS_TIGHT_AFTER or nxt in CSS_TIGHT_BOTH | CSS_TIGHT_BEFORE or not nxt:
+                continue
+            # コメントを消した結果、空白が並ぶ場合は 1 つにまとめる
+            if _last() not in ("", " "):
+                _append(" ")
+        elif m.group("comment"):
+            # コメントは捨てる（/*! で始まるライセンス表記も含めて削除する）。
+            # a/*x*/b のように前後がつながって 1 語になる場合だけ、空のコメントを区切りとして残す
+            nxt = css[pos:pos + 1]
+            tight = CSS_TIGHT_BOTH | CSS_TIGHT_AFTER | CSS_TIGHT_BEFORE
+            if _last() not in ("", " ") and nxt and not nxt.isspace() and not {_last(), nxt} & tight:
+                _append("/**/")
+    _append(css[pos:])
+    return "".join(out).strip()
+
+
+# ============================================================
+# JS の圧縮
+# ============================================================
+
+# この直後の "/" は割り算ではなく正規表現リテラルの開始
+REGEX_PREFIX_CHARS    = set("(,=:[!&|?{};+-*%<>~^")
+REGEX_PREFIX_KEYWORDS = {"return", "typeof", "case", "do", "else", "in", "of", "new",
+                         "delete", "void", "throw", "yield", "await", "instanceof"}
+# この前後の空白は消してよい（+ - . / は "a + +b" "1 .toString()" などがあるので残す）
+JS_TIGHT = set("{}()[];,:=<>!?&|*%^~")
+# この直後 / 直前の改行は消しても ASI（自動セミコロン挿入）の結果が変わらない
+JS_NEWLINE_AFTER  = set("{;,")
+JS_NEWLINE_BEFORE = set("}")
+
+
+def _is_ident(ch: str) -> bool:
+    return ch.isalnum() or ch in "_$" or ord(ch) > 127
+
+
+def _skip_string(src: str, i: int) -> int:
+    """src[i] の引用符から始まる文字列の直後の位置を返す。"""
+    quote = src[i]
+    i += 1
+    while i < len(src) and src[i] != quote:
+        i += 2 if src[i] == "\\" else 1
+    return i + 1
+
+
+def _skip_template(src: str, i: int) -> int:
+    """src[i] のバッククォートから始まるテンプレートリテラルの直後の位置を返す（${} の入れ子に対応）。"""
+    i += 1
+    while i < len(src):
+        ch = src[i]
+        if ch == "\\":
+            i += 2
+        elif ch == "`":
+            return i + 1
+        elif src.startswith("${", i):
+            i = _skip_braces(src, i + 1)
+        else:
+            i += 1
+    return i
+
+
+def _skip_braces(src: str, i: int) -> int:
+    """src[i] の { に対応する } の直後の位置を返す（中の文字列・テンプレートは読み飛ばす）。"""
+    depth = 0
+    while i < len(src):
+        ch = src[i]
+        if ch in "\"'":
+            i = _skip_string(src, i)
+            continue
+        if ch == "`":
+            i = _skip_template(src, i)
+            continue
+        if ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return i
+
+
+def _skip_regex(src: str, i: int) -> int:
+    """src[i] の / から始まる正規表現リテラル（フラグ込み）の直後の位置を返す。"""
+    i += 1
+    in_class = False
+    while i < len(src) and src[i] != "\n":
+        ch = src[i]
+        if ch == "\\":
+            i += 2
+            continue
+        if ch == "[":
+            in_class = True
+        elif ch == "]":
+            in_class = False
+        elif ch == "/" and not in_class:
+            i += 1
+            break
+        i += 1
+    while i < len(src) and _is_ident(src[i]):
+        i += 1
+    return i
+
+
+def minify_js(src: str) -> str:
+    """
+    コメント・インデント・空行を削除し、記号まわりの空白を詰める。
+    変数名の短縮などの書き換えは行わない（安全側の圧縮）。
+    """
+    out: list = []
+    last_word = ""        # 直前の識別子（正規表現リテラルの判定用）
+    pending_space = False
+    pending_newline = False
+    i = 0
+    n = len(src)
+
+    def _last() -> str:
+        return out[-1][-1] if out else ""
+
+    def _postfix_op() -> bool:
+        # a++ / 2 の ++ / -- は後置演算子なので、直後の / は割り算
+        tail = "".join(out[-2:])
+        return tail.endswith(("++", "--"))
+
+    def _emit(token: str) -> None:
+        nonlocal pending_space, pending_newline
+        prev, first = _last(), token[0]
+        if pending_newline and prev and prev not in JS_NEWLINE_AFTER and first not in JS_NEWLINE_BEFORE:
+            out.append("\n")
+        elif (pending_space or pending_newline) and prev and prev not in JS_TIGHT and first not in JS_TIGHT:
+            out.append(" ")
+        pending_space = pending_newline = False
+        out.append(token)
+
+    while i < n:
+        ch = src[i]
+        if ch == "\n":
+            pending_newline = True
+            i += 1
+        elif ch.isspace():
+            pending_space = True
+            i += 1
+        elif src.startswith("//", i):
+            end = src.find("\n", i)
+            i = n if end < 0 else end
+        elif src.startswith("/*", i):
+            end = src.find("*/", i + 2)
+            if "\n" in src[i:end]:
+                pending_newline = True
+            else:
+                pending_space = True
+            i = n if end < 0 else end + 2
+        elif ch in "\"'":
+            end = _skip_string(src, i)
+            _emit(src[i:end])
+            last_word, i = "", end
+        elif ch == "`":
+            end = _skip_template(src, i)
+            _emit(src[i:end])
+            last_word, i = "", end
+        elif ch == "/" and (not out or (_last() in REGEX_PREFIX_CHARS and not _postfix_op())
+                            or last_word in REGEX_PREFIX_KEYWORDS):
+            end = _skip_regex(src, i)
+            _emit(src[i:end])
+            last_word, i = "", end
+        elif _is_ident(ch):
+            end = i
+            while end < n and (_is_ident(src[end]) or (src[end] == "." and src[i].isdigit())):
+                end += 1
+            # obj.return のようなプロパティ名はキーワードとして扱わない（直後の / は割り算）
+            word = src[i:end] if _last() != "." else ""
+            _emit(src[i:end])
+            last_word, i = word, end
+        else:
+            _emit(ch)
+            last_word = ""
+            i += 1
+
+    return "".join(out) + "\n"
+
+
+MINIFIERS = {".css": minify_css, ".js": minify_js}
+
+
+# ============================================================
+# ビルド
+# ============================================================
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def hashed_name(src: Path, digest: str) -> str:
+    """styles.css -> styles.3f2a9c1d.css"""
+    return f"{src.stem}.{digest}{src.suffix}"
+
+
+def source_name(name: str) -> str:
+    """ハッシュ付きのファイル名を元の名前に戻す（styles.3f2a9c1d.css -> styles.css）"""
+    return HASHED_RE.sub(r"\1", name)
+
+
+def find_sources(assets_dir: Path) -> list:
+    """ビルド対象（ハッシュなしの .css / .js）をパス順で返す。"""
+    return sorted(
+        p for sub, ext in ASSET_DIRS.items() if (assets_dir / sub).is_dir()
+        for p in (assets_dir / sub).iterdir()
+        if p.is_file() and p.suffix == ext and not HASHED_RE.search(p.name)
+    )
+
+
+def save_manifest(assets_dir: Path, entries: dict) -> Path:
+    """マニフェストを書き出す（一時ファイル経由で置き換え、途中終了でも壊さない）。"""
+    path = assets_dir / MANIFEST_NAME
+    tmp  = path.with_name(path.name + ".tmp")
+    data = {"version": 1, "cache_control": IMMUTABLE_CACHE_CONTROL, "assets": dict(sorted(entries.items()))}
+    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+    return path
+
+
+def build_asset(src: Path, assets_dir: Path) -> dict:
+    """
+    1 ファイルを圧縮してハッシュ付きの名前で書き出し、同じ元ファイルの古いハッシュ付きファイルを削除する。
+    戻り値: マニフェストの記録
+    """
+    source = src.read_bytes()
+    minified = MINIFIERS[src.suffix](source.decode("utf-8")).encode("utf-8")
+    dst = src.with_name(hashed_name(src, content_hash(minified)))
+    if not dst.exists() or dst.read_bytes() != minified:
+        tmp = dst.with_name(dst.name + ".tmp")
+        tmp.write_bytes(minified)
+        os.replace(tmp, dst)
+
+    for old in src.parent.glob(f"{src.stem}.*{src.suffix}"):
+        if old != dst and HASHED_RE.search(old.name) and source_name(old.name) == src.name:
+            old.unlink()
+
+    return {
+        "output":      dst.relative_to(assets_dir).as_posix(),
+        "sha256":      hashlib.sha256(source).hexdigest(),
+        "size":        len(source),
+        "output_size": len(minified),
+    }
+
+
+# ============================================================
+# HTML 置換処理
+# ============================================================
+
+SCRIPT_OPEN_RE = re.compile(r"""<script\b(?:[^>"']|"[^"]*"|'[^']*')*>""", re.IGNORECASE)
+
+
+def _rewrite_asset_url(url: str, where: str, line: int, state: dict) -> str:
+    """
+    assets/ 配下の .css / .js への参照を、マニフェストのハッシュ付きファイルに差し替える。
+    以前のビルドのハッシュ付き参照も元ファイル名に戻してから引き直す。クエリ・フラグメントは保持する。
+    """
+    local = _local_path(state["html_dir"], url, state["site_origins"])
+    if local is None:
+        return url
+    try:
+        rel = local.resolve().relative_to(state["assets_dir"].resolve())
+    except ValueError:
+        return url
+    key = rel.with_name(source_name(rel.name)).as_posix()
+    entry = state["manifest"].get(key)
+    if entry is None:
+        return url
+
+    parts = urlsplit(url)
+    new_name = Path(entry["output"]).name
+    new_url = parts._replace(path=parts.path.rsplit("/", 1)[0] + "/" + new_name
+                             if "/" in parts.path else new_name).geturl()
+    if new_url != url:
+        state["changes"].append((line, where, url, new_url))
+    return new_url
+
+
+def _rewrite_asset_tag(tag: str, line: int, state: dict) -> str:
+    """<link rel="stylesheet|preload|modulepreload" href> と <script src> を書き換える。"""
+    name = tag[1:].split(None, 1)[0].rstrip("/>").lower()
+    attrs = {
+        m.group(2).lower(): (m.group(4) or "").strip("\"'")
+        for m in TAG_ATTR_RE.finditer(tag)
+    }
+    if name == "link":
+        rels = set(attrs.get("rel", "").lower().split())
+        target = "href" if rels & {"stylesheet", "preload", "modulepreload"} else None
+    elif name == "script":
+        target = "src"
+    else:
+        target = None
+    if target is None:
+        return tag
+
+    def _sub(m: re.Match) -> str:
+        raw = m.group(4)
+        if m.group(2).lower() != target or raw is None:
+            return m.group(0)
+        quote = raw[0] if raw[0] in "\"'" else ""
+        value = raw[1:-1] if quote else raw
+        new = _rewrite_asset_url(value, f"<{name} {target}>", line + tag.count("\n", 0, m.start(4)), state)
+        if new == value:
+            return m.group(0)
+        return f"{m.group(1)}{m.group(2)}{m.group(3)}{quote}{new}{quote}"
+
+    return TAG_ATTR_RE.sub(_sub, tag)
+
+
+def rewrite_asset_references(html: str, html_dir: Path, assets_dir: Path, manifest: dict) -> tuple:
+    """
+    HTML 内の CSS / JS 参照をハッシュ付きファイルに書き換える（convert_to_webp.rewrite_references と同じ解析）。
+    戻り値: (更新後 HTML, 変更一覧 [(行番号, 箇所, 旧URL, 新URL)])
+    """
+    site_origins = set()
+    for url in CANONICAL_RE.findall(html):
+        parts = urlsplit(url)
+        site_origins.add(f"{parts.scheme}://{parts.netloc}".lower())
+
+    state = {
+        "html_dir":     html_dir,
+        "assets_dir":   assets_dir,
+        "site_origins": site_origins,
+        "manifest":     manifest,
+        "changes":      [],
+    }
+    out: list = []
+    pos = 0
+    line = 1
+
+    for m in TOKEN_RE.finditer(html):
+        out.append(html[pos:m.start()])
+        line += html.count("\n", pos, m.start())
+        pos = m.end()
+
+        if m.group("script"):
+            # <script> は要素全体で 1 トークンなので、開始タグだけ書き換える
+            element = m.group("script")
+            open_tag = SCRIPT_OPEN_RE.match(element).group(0)
+            out.append(_rewrite_asset_tag(open_tag, line, state) + element[len(open_tag):])
+        elif m.group("tag") and not m.group("tag").startswith("</"):
+            out.append(_rewrite_asset_tag(m.group("tag"), line, state))
+        else:
+            out.append(m.group(0))
+
+        line += m.group(0).count("\n")
+
+    out.append(html[pos:])
+    return "".join(out), state["changes"]
+
+
+def update_html(html_path: Path, assets_dir: Path, manifest: dict) -> int:
+    """index.html の CSS / JS 参照を書き換える。戻り値: 書き換えた参照の数"""
+    if not html_path.exists():
+        print(f"  HTML が見つかりません: {html_path}")
+        return 0
+
+    original = html_path.read_text(encoding="utf-8")
+    updated, changes = rewrite_asset_references(original, html_path.parent, assets_dir, manifest)
+
+    for line, where, old, new in changes:
+        print(f"    L{line:<5} {where:<22} {old} -> {new}")
+
+    if updated != original:
+        # バックアップを作成してから書き込む
+        backup = html_path.with_suffix(".html.bak")
+        shutil.copy2(html_path, backup)
+        html_path.write_text(updated, encoding="utf-8")
+        print(f"  [OK] {len(changes)} 箇所を置換しました（バックアップ: {backup.name}）")
+    else:
+        print("  変更なし（すでに最新のハッシュ付きファイルを参照済み）")
+    return len(changes)
+
+
+# ============================================================
+# Critical CSS（ファーストビューに必要なルールの インライン化）
+# ============================================================
+
+# tests/conftest.py の VIEWPORTS と同じ画面サイズで描画し、どれかでファーストビューに入るルールを集める
+CRITICAL_VIEWPORTS = {
+    "desktop": {"width": 1280, "height": 800},
+    "mobile":  {"width": 375, "height": 667},
+    "tablet":  {"width": 768, "height": 1024},
+}
+CRITICAL_WARN_KB = 14   # これを超えると最初の往復（TCP の初期ウィンドウ）に収まらない目安
+
+# 非同期読み込みにした <link> の印（再実行時に元へ戻すため、書き足す文字列は固定にする）
+ASYNC_ATTRS = ''' media="print" onload="this.media='all'" data-critical-async'''
+CRITICAL_STYLE_RE    = re.compile(r"<style data-critical>.*?</style>\n[ \t]*", re.DOTALL)
+CRITICAL_NOSCRIPT_RE = re.compile(r"\n[ \t]*<noscript data-critical>.*?</noscript>", re.DOTALL)
+
+# ファーストビュー（スクロール前の画面内）の要素に当たるルールを、スタイルシートごとにルールの位置で返す。
+# :hover などの状態や ::before などの疑似要素は外して判定する。非表示（大きさ 0）の要素に当たるルールも残す
+# （モーダルなどを隠すルールがないと、全体の CSS が届くまで見えてしまうため）
+COLLECT_CRITICAL_JS = """
+() => {
+    window.scrollTo(0, 0);
+    const siteBase = new URL(".", location.href).href;
+    // ブラウザは *::before を ::before と返すので、疑似要素・状態だけの部分は * にしてから外す
+    const PSEUDO = /::?(?:before|after|first-line|first-letter)(?![\\w-])|::[\\w-]+(?:\\([^)]*\\))?|:(?:hover|focus|focus-visible|focus-within|active|visited|target)(?![\\w-])/.source;
+    const strip = (selector) => selector
+        .replace(new RegExp(String.raw`(^|[\\s,>+~(])(?:${PSEUDO})`, "g"), "$1*")
+        .replace(new RegExp(PSEUDO, "g"), "");
+    const inFold = (el) => {
+        const r = el.getBoundingClientRect();
+        return (r.width === 0 && r.height === 0) || (r.top < innerHeight && r.bottom >= 0);
+    };
+    const matches = (selector) => {
+        if (!selector.trim()) return false;
+        try { return Array.from(document.querySelectorAll(selector)).some(inFold); } catch (e) { return false; }
+    };
+    const walk = (rules, path) => {
+        const kept = [];
+        Array.from(rules).forEach((rule, i) => {
+            const key = path.concat(i).join(".");
+            if (rule instanceof CSSStyleRule) {
+                if (matches(strip(rule.selectorText))) kept.push(key);
+            } else if (rule instanceof CSSMediaRule || rule instanceof CSSSupportsRule) {
+                kept.push(...walk(rule.cssRules, path.concat(i)));
+            } else if (rule instanceof CSSFontFaceRule) {
+                kept.push(key);
+            }
+        });
+        return kept;
+    };
+    const result = {};
+    for (const sheet of document.styleSheets) {
+        if (!sheet.href || !sheet.href.startsWith(siteBase)) continue;
+        let rules;
+        try { rules = sheet.cssRules; } catch (e) { continue; }
+        result[sheet.href] = walk(rules, []);
+    }
+    return result;
+}
+"""
+
+# 集めたルールを元の順序のまま CSS テキストにする（@media / @supports は中身がある場合だけ残す）
+SERIALIZE_CRITICAL_JS = """
+(keep) => {
+    const serialize = (rules, path, keys) => {
+        const parts = [];
+        Array.from(rules).forEach((rule, i) => {
+            if (rule instanceof CSSMediaRule || rule instanceof CSSSupportsRule) {
+                const inner = serialize(rule.cssRules, path.concat(i), keys);
+                if (inner.length) {
+                    const condition = rule instanceof CSSMediaRule
+                        ? `@media ${rule.media.mediaText}` : `@supports ${rule.conditionText}`;
+                    parts.push(`${condition}{${inner.join("")}}`);
+                }
+            } else if (keys.has(path.concat(i).join("."))) {
+                parts.push(rule.cssText);
+            }
+        });
+        return parts;
+    };
+    const result = {};
+    for (const sheet of document.styleSheets) {
+        if (!sheet.href || !(sheet.href in keep)) continue;
+        const rules = sheet.cssRules;
+        const parts = serialize(rules, [], new Set(keep[sheet.href]));
+        // 残したルールが使っている @keyframes だけ加える
+        const text = parts.join("");
+        Array.from(rules).forEach(rule => {
+            if (rule instanceof CSSKeyframesRule && text.includes(rule.name)) parts.push(rule.cssText);
+        });
+        result[sheet.href] = parts.join("\\n");
+    }
+    return result;
+}
+"""
+
+
+def strip_critical(html: str) -> str:
+    """以前のビルドで入れた critical CSS と非同期読み込みを取り除き、元の <link rel="stylesheet"> に戻す。"""
+    html = CRITICAL_STYLE_RE.sub("", html)
+    html = CRITICAL_NOSCRIPT_RE.sub("", html)
+    return html.replace(ASYNC_ATTRS, "")
+
+
+def rebase_css_urls(css: str, css_path: str, html_dir: str = "") -> str:
+    """スタイルシート基準の相対 url() を、HTML に埋め込んだときの相対パスに直す。"""
+    css_dir = posixpath.dirname(css_path)
+
+    def _sub(m: re.Match) -> str:
+        quote, url = m.group(1), m.group(2)
+        if not url or url.startswith(("data:", "#", "/")) or urlsplit(url).scheme:
+            return m.group(0)
+        rebased = posixpath.relpath(posixpath.normpath(posixpath.join(css_dir, url)), html_dir or ".")
+        return f"url({quote}{rebased}{quote})"
+
+    return CSS_URL_RE.sub(_sub, css)
+
+
+def collect_critical_css(html_path: Path) -> dict:
+    """
+    Playwright（テストと同じ依存）でページを描画し、ファーストビューに必要なルールを集める。
+    戻り値: {スタイルシートの HTML からの相対パス: critical CSS}（Playwright / Chromium がなければ空）
+    """
+    try:
+        from playwright.sync_api import Error as PlaywrightError, sync_playwright  # --critical のときだけ読み込む
+    except ImportError:
+        print("  [WARN] Playwright がないため critical CSS を作成しません（pip install -r requirements_test.txt）")
+        return {}
+
+    # 以前の critical CSS を外した状態で描画する（一時ファイルは同じフォルダに置き、相対パスを保つ）
+    tmp = html_path.with_name(".critical-tmp.html")
+    tmp.write_text(strip_critical(html_path.read_text(encoding="utf-8")), encoding="utf-8")
+
+    def _open(browser, viewport: dict):
+        page = browser.new_page(viewport=viewport)
+        # 外部リソース（Google Fonts など）は読まない。判定に使うのは案件内の CSS だけ
+        page.route("**/*", lambda route: route.continue_()
+                   if route.request.url.startswith("file:") else route.abort())
+        page.goto(tmp.resolve().as_uri(), wait_until="load")
+        return page
+
+    keep: dict = {}
+    try:
+        with sync_playwright() as p:
+            try:
+                # file:// はファイルごとに別オリジン扱いで cssRules を読めないため、同一オリジンとして扱わせる
+                browser = p.chromium.launch(args=["--allow-file-access-from-files"])
+            except PlaywrightError as e:
+                print(f"  [WARN] Chromium を起動できないため critical CSS を作成しません"
+                      f"（python -m playwright install chromium）: {e.message.splitlines()[0]}")
+                return {}
+            try:
+                for name, viewport in CRITICAL_VIEWPORTS.items():
+                    page = _open(browser, viewport)
+                    for href, keys in page.evaluate(COLLECT_CRITICAL_JS).items():
+                        keep.setdefault(href, set()).update(keys)
+                    page.close()
+                    print(f"    {name:<8} {viewport['width']}x{viewport['height']}: "
+                          f"{sum(len(v) for v in keep.values())} ルール（累計）")
+                page = _open(browser, CRITICAL_VIEWPORTS["desktop"])
+                css_by_href = page.evaluate(SERIALIZE_CRITICAL_JS, {h: sorted(k) for h, k in keep.items()})
+            finally:
+                browser.close()
+    finally:
+        tmp.unlink(missing_ok=True)
+
+    html_dir = html_path.parent.resolve()
+    result = {}
+    for href, css in css_by_href.items():
+        rel = Path(url2pathname(urlsplit(href).path)).resolve().relative_to(html_dir).as_posix()
+        result[rel] = minify_css(rebase_css_urls(css, rel))
+    return result
+
+
+def inline_critical_css(html: str, critical: dict) -> tuple:
+    """
+    <head> の <link rel="stylesheet"> を非同期読み込み（media="print" → onload で all）にし、
+    最初のスタイルシートの位置に critical CSS を <style data-critical> として埋め込む。
+    JavaScript が無効な環境向けに <noscript> で通常の読み込みも残す。
+    戻り値: (更新後 HTML, 非同期にしたスタイルシートの URL 一覧)
+    """
+    head_end = html.lower().find("</head>")
+    if head_end < 0 or not critical:
+        return html, []
+    head, rest = html[:head_end], html[head_end:]
+
+    out: list = []
+    pos = 0
+    deferred = []
+    for m in TOKEN_RE.finditer(head):
+        tag = m.group("tag")
+        if not tag or not tag.lower().startswith("<link"):
+            continue
+        attrs = {
+            a.group(2).lower(): (a.group(4) or "").strip("\"'") for a in TAG_ATTR_RE.finditer(tag)
+        }
+        if "stylesheet" not in attrs.get("rel", "").lower().split() or "media" in attrs:
+            continue
+
+        line_start = head.rfind("\n", 0, m.start()) + 1
+        indent = head[line_start:m.start()] if not head[line_start:m.start()].strip() else ""
+        out.append(head[pos:m.start()])
+        if not deferred:
+            css = "".join(critical.values())
+            out.append(f"<style data-critical>{css}</style>\n{indent}")
+        end = -2 if tag.endswith("/>") else -1
+        out.append(tag[:end].rstrip() + ASYNC_ATTRS + tag[end:])
+        out.append(f"\n{indent}<noscript data-critical>{tag}</noscript>")
+        deferred.append(attrs.get("href", ""))
+        pos = m.end()
+
+    out.append(head[pos:])
+    return "".join(out) + rest, deferred
+
+
+def build_critical_css(html_path: Path) -> int:
+    """critical CSS を作って index.html に埋め込む。戻り値: critical CSS のバイト数"""
+    if not html_path.exists():
+        print(f"  HTML が見つかりません: {html_path}")
+        return 0
+    critical = collect_critical_css(html_path)
+    if not critical:
+        return 0
+
+    original = html_path.read_text(encoding="utf-8")
+    updated, deferred = inline_critical_css(strip_critical(original), critical)
+    size = len("".join(critical.values()).encode("utf-8"))
+    for href in deferred:
+        print(f"    非同期読み込み: {href}")
+    print(f"  critical CSS: {size / 1024:.1f} KB（{', '.join(critical)} から抽出）")
+    if size > CRITICAL_WARN_KB * 1024:
+        print(f"  [WARN] {CRITICAL_WARN_KB} KB を超えています（最初の往復に収まらず効果が薄れます）")
+
+    if updated != original:
+        backup = html_path.with_suffix(".html.bak")
+        shutil.copy2(html_path, backup)
+        html_path.write_text(updated, encoding="utf-8")
+        print(f"  [OK] <head> に埋め込みました（バックアップ: {backup.name}）")
+    else:
+        print("  変更なし（critical CSS は最新）")
+    return size
+
+
+# ============================================================
+# メイン
+# ============================================================
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="CSS / JS の圧縮とハッシュ付きファイル名での書き出し")
+    parser.add_argument(
+        "--all", action="store_true",
+        help=f"{OUTPUT_ROOT}/ 配下の全案件をまとめてビルドする（PROJECT_NAME の設定は無視）",
+    )
+    parser.add_argument(
+        "--critical", action="store_true",
+        help="ファーストビューの CSS を index.html に埋め込み、スタイルシートを非同期読み込みにする",
+    )
+    return parser.parse_args()
+
+
+def build_project(project_dir: Path, critical: bool = False) -> dict:
+    """
+    1案件分をビルドする（圧縮・書き出し・マニフェスト・.htaccess・index.html 更新）。
+    critical なら最後に critical CSS を埋め込む（ハッシュ付きファイルへの参照を書き換えた後の HTML に対して行う）。
+    戻り値: {"built": [...], "src_kb": float, "dst_kb": float, "critical_kb": float}
+    """
+    assets_dir = project_dir / "assets"
+    sources = find_sources(assets_dir)
+    results = {"built": [], "src_kb": 0.0, "dst_kb": 0.0, "critical_kb": 0.0}
+    if not sources:
+        print(f"  ビルド対象が見つかりません（{assets_dir}/css, js）")
+        return results
+
+    manifest = {}
+    for i, src in enumerate(sources, 1):
+        key = src.relative_to(assets_dir).as_posix()
+        entry = manifest[key] = build_asset(src, assets_dir)
+        ratio = (1 - entry["output_size"] / entry["size"]) * 100 if entry["size"] else 0
+        print(f"[{i:02d}/{len(sources)}] {key} -> {entry['output']}")
+        print(f"    [OK] {entry['size'] / 1024:.1f} KB -> {entry['output_size'] / 1024:.1f} KB  ({ratio:.0f}% 削減)")
+        results["built"].append(key)
+        results["src_kb"] += entry["size"] / 1024
+        results["dst_kb"] += entry["output_size"] / 1024
+
+    save_manifest(assets_dir, manifest)
+    (assets_dir / ".htaccess").write_text(HTACCESS, encoding="utf-8")
+
+    print("\n-- index.html 更新 --")
+    update_html(project_dir / "index.html", assets_dir, manifest)
+
+    if critical:
+        print("\n-- critical CSS --")
+        results["critical_kb"] = build_critical_css(project_dir / "index.html") / 1024
+    return results
+
+
+def main():
+    args = parse_args()
+
+    if args.all:
+        projects = sorted(p.parent for p in OUTPUT_ROOT.glob("*/index.html"))
+    else:
+        if not PROJECT_DIR.exists():
+            print(f"エラー: 案件フォルダが見つかりません: {PROJECT_DIR}")
+            sys.exit(1)
+        projects = [PROJECT_DIR]
+
+    print(f"\n{'='*50}")
+    print(f"  CSS / JS ビルド（{len(projects)} 案件）")
+    print(f"  キャッシュ:   {IMMUTABLE_CACHE_CONTROL}（ハッシュ付きファイル）")
+    print(f"{'='*50}")
+
+    summaries = []
+    for project_dir in projects:
+        print(f"\n-- {project_dir.name} --")
+        summaries.append((project_dir.name, build_project(project_dir, args.critical)))
+
+    print(f"\n{'='*50}")
+    print(f"  完了")
+    for name, results in summaries:
+        src_kb, dst_kb = results["src_kb"], results["dst_kb"]
+        ratio = (1 - dst_kb / src_kb) * 100 if src_kb else 0
+        print(f"  {name}: {len(results['built'])} ファイル  {src_kb:.1f} KB -> {dst_kb:.1f} KB ({ratio:.0f}% 削減)")
+        if results["critical_kb"]:
+            print(f"    critical CSS {results['critical_kb']:.1f} KB を埋め込み")
+    print(f"{'='*50}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,630 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+build_fonts.py - Web フォントのセルフホスト化（ページで使う文字だけのサブセット WOFF2）
+
+サイト完成後、build_assets.py の前に実行する。
+index.html（と assets/css/*.css の @import）が読み込んでいる Google Fonts の書体・太さを調べ、
+手元に置いた元フォント（fonts/ 配下の .ttf / .otf / .woff / .woff2）から
+ページで実際に使う文字だけを含む WOFF2 を assets/fonts/ に書き出して、参照を差し替える。
+ネットワークには一切アクセスしない（元フォントは事前に Google Fonts などから入手して fonts/ に置く）。
+
+使い方:
+  python build_fonts.py
+  python build_fonts.py --all              # output/ 配下の全案件をまとめて処理
+  python build_fonts.py --source D:/fonts  # 元フォントの置き場所を指定
+
+機能:
+  - 書体ごとの使用文字の抽出
+    Playwright（テストと同じ依存）があれば描画して、要素ごとの font-family から書体別に集める
+    （text-transform: uppercase や ::before の content も反映。非表示のメニューやモーダルも含む）。
+    なければ HTML 全体の文字を全書体に使う。どちらの場合も半角英数記号と
+    assets/js/*.js の文字列（フォームのエラーメッセージなど）は含める
+  - 元フォントの自動判別（フォント内の名前・太さ・イタリックを読む。可変フォントは指定の太さで固定して切り出す）
+  - サブセット化して WOFF2 で書き出し（ファイル名に内容のハッシュを付与。古いものは削除）
+  - index.html の Google Fonts の <link>（preconnect / preload / stylesheet）を外し、
+    @font-face（font-display: swap）を <style data-fonts> として埋め込み、
+    ファーストビューで使う書体に <link rel="preload" as="font"> を付ける
+  - assets/css/*.css の Google Fonts の @import を削除（build_assets.py で再ビルドする）
+  - assets/fonts/.font-manifest.json に書体ごとの元フォント・出力・文字数を記録
+    （再実行時は Google Fonts の参照がなくてもここから作り直す）
+
+必要なもの:
+  pip install "fonttools[woff]"
+"""
+
+import argparse
+import html as html_lib
+import io
+import json
+import logging
+import os
+import re
+import shutil
+import string
+import sys
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+# Windows ターミナルの文字化け対策
+if sys.stdout.encoding.lower() != "utf-8":
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
+if sys.stderr.encoding.lower() != "utf-8":
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8")
+
+# HTML の解析・ハッシュ付きファイル名・描画する画面サイズは CSS / JS のビルドと共通のものを使う
+from build_assets import (
+    CRITICAL_VIEWPORTS, HASHED_RE, content_hash, find_sources, hashed_name, minify_js, source_name,
+)
+from convert_to_webp import TAG_ATTR_RE, TOKEN_RE
+
+
+# ============================================================
+# 設定（案件ごとにここを変更する）
+# ============================================================
+
+PROJECT_NAME = "THE-CORNER-CAFE_v3"
+PROJECT_DIR  = Path(f"output/{PROJECT_NAME}")
+
+OUTPUT_ROOT  = Path("output")  # --all で案件を探すディレクトリ（{案件名}/index.html）
+FONT_SOURCE_DIR = Path("fonts")  # 元フォントの置き場所（サブフォルダも探す）
+
+FONT_DIR      = "fonts"                 # assets/ 配下の出力先
+MANIFEST_NAME = ".font-manifest.json"   # assets/fonts/ 内に保存
+FONT_DISPLAY  = "swap"
+
+GOOGLE_FONT_HOSTS = {"fonts.googleapis.com", "fonts.gstatic.com"}
+SOURCE_EXTENSIONS = (".ttf", ".otf", ".woff", ".woff2")
+
+# ページに書かれていなくても必ず入れる文字（フォームへの入力や JS で差し込む数字・記号のため）
+ALWAYS_TEXT = "".join(ch for ch in string.printable if ch.isprintable())
+EXTRA_TEXT  = ""   # JS で組み立てるなど、上の方法で拾えない文字があればここに足す
+
+
+# ============================================================
+# 書体の指定（Google Fonts の URL → 書体・スタイル・太さ）
+# ============================================================
+
+IMPORT_RE = re.compile(
+    r"""@import\s+(?:url\(\s*)?(['"]?)([^'")\s]+)\1\s*\)?[^;]*;[ \t]*\n?""", re.IGNORECASE
+)
+OLD_VARIANT_RE = re.compile(r"(\d*)(i|italic)?$")
+JS_STRING_RE = re.compile(r"""'(?:[^'\\\n]|\\.)*'|"(?:[^"\\\n]|\\.)*"|`(?:[^`\\]|\\.)*`""")
+FONTS_BLOCK_RE = re.compile(
+    r"""^[ \t]*(?:<link\b[^>]*\bdata-fonts\b[^>]*>|<style data-fonts>.*?</style>)[ \t]*\n?""",
+    re.DOTALL | re.MULTILINE,
+)
+EMPTY_NOSCRIPT_RE = re.compile(r"\n[ \t]*<noscript data-critical>\s*</noscript>")
+
+
+def is_google_fonts(url: str) -> bool:
+    return urlsplit(url).hostname in GOOGLE_FONT_HOSTS
+
+
+def parse_google_fonts_url(url: str) -> list:
+    """
+    css / css2 API の URL から書体の一覧を返す。
+    例: family=Playfair+Display:ital,wght@0,400;1,700 -> [("Playfair Display", "normal", 400), ...]
+    太さの範囲指定（wght@300..700）は (300, 700) のタプルになる。
+    """
+    faces = []
+    for spec in parse_qs(urlsplit(url).query).get("family", []):
+        for family_spec in spec.split("|"):   # 旧 css API は | 区切り
+            name, _, axes = family_spec.partition(":")
+            if not axes:
+                faces.append((name, "normal", 400))
+                continue
+            if "@" not in axes:                # 旧 css API: Roboto:400,700italic
+                for v in axes.split(","):
+                    m = OLD_VARIANT_RE.match(v.strip().lower())
+                    if m:
+                        faces.append((name, "italic" if m.group(2) else "normal", int(m.group(1) or 400)))
+                continue
+            keys, _, tuples = axes.partition("@")
+            keys = keys.split(",")
+            for t in tuples.split(";"):
+                values = dict(zip(keys, t.split(",")))
+                style = "italic" if values.get("ital") == "1" else "normal"
+                weight = values.get("wght", "400")
+                if ".." in weight:
+                    lo, hi = weight.split("..")
+                    faces.append((name, style, (int(lo), int(hi))))
+                else:
+                    faces.append((name, style, int(weight)))
+    return faces
+
+
+def find_requested_faces(html: str, assets_dir: Path) -> tuple:
+    """
+    index.html の <link> と CSS の @import から Google Fonts の指定を集める。
+    戻り値: (書体の一覧, Google Fonts の URL 一覧)
+    """
+    urls = []
+    for m in TOKEN_RE.finditer(html):
+        tag = m.group("tag")
+        if tag and tag.lower().startswith("<link"):
+            attrs = {a.group(2).lower(): (a.group(4) or "").strip("\"'") for a in TAG_ATTR_RE.finditer(tag)}
+            if "stylesheet" in attrs.get("rel", "").lower().split() and is_google_fonts(attrs.get("href", "")):
+                urls.append(html_lib.unescape(attrs["href"]))
+    for css in find_sources(assets_dir):
+        if css.suffix == ".css":
+            urls += [m.group(2) for m in IMPORT_RE.finditer(css.read_text(encoding="utf-8"))
+                     if is_google_fonts(m.group(2))]
+
+    faces = []
+    for url in urls:
+        for face in parse_google_fonts_url(url):
+            if face not in faces:
+                faces.append(face)
+    return faces, urls
+
+
+# ============================================================
+# 使用文字の抽出
+# ============================================================
+
+# 要素ごとの font-family（先頭から見て最初に対象書体と一致したもの）で書体別に文字を集める。
+# あわせてファーストビューの要素で使われる 書体|スタイル|太さ を返す（preload の判定に使う）
+COLLECT_TEXT_JS = """
+(families) => {
+    const wanted = new Map(families.map(f => [f.toLowerCase(), f]));
+    const text = {};
+    const above = new Set();
+    const pick = (style) => {
+        for (const name of style.fontFamily.split(",")) {
+            const f = wanted.get(name.trim().replace(/^["']|["']$/g, "").toLowerCase());
+            if (f) return f;
+        }
+        return null;
+    };
+    const add = (family, s, style) => {
+        if (!s.trim()) return;
+        if (style.textTransform === "uppercase" || style.textTransform === "capitalize") s += s.toUpperCase();
+        if (style.textTransform === "lowercase") s += s.toLowerCase();
+        text[family] = (text[family] || "") + s;
+    };
+    for (const el of [document.body, ...document.body.querySelectorAll("*")]) {
+        const style = getComputedStyle(el);
+        const family = pick(style);
+        if (family) {
+            let s = "";
+            for (const node of el.childNodes) if (node.nodeType === Node.TEXT_NODE) s += node.data;
+            if (el.matches("input, textarea")) s += (el.placeholder || "") + (el.value || "");
+            add(family, s, style);
+            const r = el.getBoundingClientRect();
+            if (s.trim() && r.width > 0 && r.height > 0 && r.top < innerHeight && r.bottom > 0) {
+                above.add(`${family}|${style.fontStyle}|${style.fontWeight}`);
+            }
+        }
+        for (const pseudo of ["::before", "::after"]) {
+            const ps = getComputedStyle(el, pseudo);
+            const pf = pick(ps);
+            if (pf && ps.content.startsWith('"')) add(pf, ps.content.slice(1, -1).replace(/\\\\(.)/g, "$1"), ps);
+        }
+    }
+    return { text, above: [...above] };
+}
+"""
+
+
+def static_page_text(html: str) -> str:
+    """HTML の本文のテキストと、表示される属性（alt / title / placeholder など）の文字を返す。"""
+    body_start = html.lower().find("<body")
+    parts = []
+    for m in TOKEN_RE.finditer(html, max(body_start, 0)):
+        tag = m.group("tag")
+        if tag:
+            attrs = {a.group(2).lower(): (a.group(4) or "").strip("\"'") for a in TAG_ATTR_RE.finditer(tag)}
+            parts += [attrs[k] for k in ("alt", "title", "placeholder", "aria-label", "value") if k in attrs]
+    text = TOKEN_RE.sub(" ", html[max(body_start, 0):])
+    return html_lib.unescape(text + " ".join(parts))
+
+
+def script_text(assets_dir: Path) -> str:
+    """assets/js/*.js の文字列リテラルの文字（コメントは除く）を返す。"""
+    chars = []
+    for js in find_sources(assets_dir):
+        if js.suffix == ".js":
+            chars += [m.group(0)[1:-1] for m in JS_STRING_RE.finditer(minify_js(js.read_text(encoding="utf-8")))]
+    return "".join(chars)
+
+
+def collect_page_text(html_path: Path, families: list) -> tuple:
+    """
+    Playwright でページを描画し、書体ごとの使用文字とファーストビューで使う書体を集める。
+    戻り値: ({書体: 文字列}, {(書体, スタイル, 太さ), ...})。Playwright / Chromium がなければ (None, None)
+    """
+    try:
+        from playwright.sync_api import Error as PlaywrightError, sync_playwright  # あるときだけ使う
+    except ImportError:
+        return None, None
+
+    text: dict = {}
+    above: set = set()
+    with sync_playwright() as p:
+        try:
+            browser = p.chromium.launch()
+        except PlaywrightError as e:
+            print(f"  [WARN] Chromium を起動できません（python -m playwright install chromium）: {e.message.splitlines()[0]}")
+            return None, None
+        try:
+            for viewport in CRITICAL_VIEWPORTS.values():
+                page = browser.new_page(viewport=viewport)
+                # 外部リソース（Google Fonts など）は読まない。判定に使うのは案件内の CSS だけ
+                page.route("**/*", lambda route: route.continue_()
+                           if route.request.url.startswith("file:") else route.abort())
+                page.goto(html_path.resolve().as_uri(), wait_until="load")
+                result = page.evaluate(COLLECT_TEXT_JS, families)
+                page.close()
+                for family, s in result["text"].items():
+                    text[family] = text.get(family, "") + s
+                for key in result["above"]:
+                    family, style, weight = key.split("|")
+                    above.add((family, "italic" if style in ("italic", "oblique") else "normal", int(weight)))
+        finally:
+            browser.close()
+    return text, above
+
+
+# ============================================================
+# 元フォントの判別とサブセット化
+# ============================================================
+
+def _require_fonttools():
+    try:
+        import fontTools.subset  # noqa: F401
+        import brotli            # noqa: F401  WOFF2 の書き出しに必要
+    except ImportError:
+        print('エラー: fontTools（WOFF2 対応）が必要です: pip install "fonttools[woff]"')
+        sys.exit(1)
+
+
+def read_font_info(path: Path) -> dict:
+    """元フォントの書体名・スタイル・対応する太さの範囲（可変フォントは wght 軸の範囲）を読む。"""
+    from fontTools.ttLib import TTFont
+
+    with TTFont(path, lazy=True) as font:
+        name = font["name"]
+        family = name.getDebugName(16) or name.getDebugName(1) or path.stem
+        subfamily = name.getDebugName(17) or name.getDebugName(2) or ""
+        italic = bool(font["OS/2"].fsSelection & 1) or "italic" in subfamily.lower()
+        axes = {a.axisTag: (a.minValue, a.maxValue) for a in font["fvar"].axes} if "fvar" in font else {}
+        weight = axes.get("wght") or (font["OS/2"].usWeightClass,) * 2
+    return {
+        "path": path, "family": family, "style": "italic" if italic else "normal",
+        "weight": (int(weight[0]), int(weight[1])), "variable": bool(axes),
+    }
+
+
+def scan_sources(source_dir: Path) -> list:
+    """元フォントを探して情報を読む（読めないファイルは飛ばす）。"""
+    infos = []
+    for path in sorted(source_dir.rglob("*")):
+        if path.suffix.lower() not in SOURCE_EXTENSIONS:
+            continue
+        try:
+            infos.append(read_font_info(path))
+        except Exception as e:
+            print(f"  [WARN] 読み込めないフォントを飛ばします: {path}（{e}）")
+    return infos
+
+
+def find_source(infos: list, family: str, style: str, weight) -> dict:
+    """書体・スタイルが一致し、太さを含む元フォントを返す（固定の太さのフォントを優先。なければ None）"""
+    lo, hi = weight if isinstance(weight, tuple) else (weight, weight)
+    candidates = [
+        info for info in infos
+        if info["family"].lower() == family.lower() and info["style"] == style
+        and info["weight"][0] <= lo and hi <= info["weight"][1]
+    ]
+    candidates.sort(key=lambda info: (info["variable"], info["weight"][1] - info["weight"][0]))
+    return candidates[0] if candidates else None
+
+
+def subset_font(info: dict, weight, text: str) -> bytes:
+    """元フォントを指定の太さに固定し（可変フォントの場合）、text の文字だけの WOFF2 にする。"""
+    from fontTools import subset
+    from fontTools.ttLib import TTFont
+    from fontTools.varLib import instancer
+
+    logging.getLogger("fontTools").setLevel(logging.ERROR)   # 対象外テーブルを落とした旨の INFO は出さない
+    font = TTFont(info["path"], recalcTimestamp=False)   # 同じ内容なら同じファイル（同じハッシュ）にする
+    if info["variable"]:
+        # wght 以外の軸は既定値で固定する。範囲指定なら wght 軸はその範囲だけ残す
+        limits = {a.axisTag: None for a in font["fvar"].axes}
+        limits["wght"] = weight
+        font = instancer.instantiateVariableFont(font, limits)
+
+    options = subset.Options()
+    options.flavor = "woff2"
+    options.hinting = False          # Web ではヒンティングの効果が薄く、サイズを優先する
+    options.desubroutinize = True    # CFF は展開したほうが WOFF2 の圧縮が効く
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(text=text)
+    subsetter.subset(font)
+    buf = io.BytesIO()
+    font.flavor = "woff2"
+    font.save(buf)
+    return buf.getvalue()
+
+
+def face_slug(family: str, style: str, weight) -> str:
+    """("Noto Sans JP", "normal", 400) -> noto-sans-jp-400 / 範囲指定は 300-700 / イタリックは -italic"""
+    w = f"{weight[0]}-{weight[1]}" if isinstance(weight, tuple) else str(weight)
+    slug = re.sub(r"[^a-z0-9]+", "-", family.lower()).strip("-")
+    return f"{slug}-{w}" + ("-italic" if style == "italic" else "")
+
+
+def write_font(fonts_dir: Path, slug: str, data: bytes) -> Path:
+    """ハッシュ付きの名前で書き出し、同じ書体の古いファイルを削除する。"""
+    fonts_dir.mkdir(parents=True, exist_ok=True)
+    dst = fonts_dir / hashed_name(Path(f"{slug}.woff2"), content_hash(data))
+    if not dst.exists() or dst.read_bytes() != data:
+        tmp = dst.with_name(dst.name + ".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, dst)
+    for old in fonts_dir.glob(f"{slug}.*.woff2"):
+        if old != dst and HASHED_RE.search(old.name) and source_name(old.name) == f"{slug}.woff2":
+            old.unlink()
+    return dst
+
+
+def nearest_face(faces: list, family: str, style: str, weight: int):
+    """描画で使われた太さに最も近い書体（ブラウザのフォント選択と同じく近い太さを使う）"""
+    same = [f for f in faces if f[0] == family and f[1] == style] or [f for f in faces if f[0] == family]
+    if not same:
+        return None
+
+    def distance(face):
+        w = face[2]
+        lo, hi = w if isinstance(w, tuple) else (w, w)
+        return 0 if lo <= weight <= hi else min(abs(lo - weight), abs(hi - weight))
+
+    return min(same, key=distance)
+
+
+# ============================================================
+# HTML / CSS の書き換え
+# ============================================================
+
+def font_face_css(family: str, style: str, weight, url: str) -> str:
+    w = f"{weight[0]} {weight[1]}" if isinstance(weight, tuple) else weight
+    return (f'@font-face{{font-family:"{family}";font-style:{style};font-weight:{w};'
+            f'font-display:{FONT_DISPLAY};src:url({url}) format("woff2")}}')
+
+
+def rewrite_font_references(html: str, entries: list, preload: list) -> str:
+    """
+    Google Fonts の <link> と前回の埋め込みを外し、最初にあった位置へ
+    preload の <link> と @font-face の <style data-fonts> を入れる。
+    entries: [{"family", "style", "weight", "output"(HTML からの相対パス)}, ...]
+    """
+    head_end = html.lower().find("</head>")
+    if head_end < 0:
+        return html
+    head, rest = html[:head_end], html[head_end:]
+
+    # 前回の埋め込みの位置を覚えてから外す
+    insert_at = None
+    m = FONTS_BLOCK_RE.search(head)
+    if m:
+        insert_at = m.start()
+        indent = re.match(r"[ \t]*", head[insert_at:]).group(0)
+        head = FONTS_BLOCK_RE.sub("", head)
+
+    out: list = []
+    pos = 0
+    for m in TOKEN_RE.finditer(head):
+        tag = m.group("tag")
+        if not tag or not tag.lower().startswith("<link"):
+            continue
+        attrs = {a.group(2).lower(): (a.group(4) or "").strip("\"'") for a in TAG_ATTR_RE.finditer(tag)}
+        if not is_google_fonts(attrs.get("href", "")):
+            continue
+        # 行ごと外す（行にほかの内容があればタグだけ）
+        line_start = head.rfind("\n", 0, m.start()) + 1
+        line_end = head.find("\n", m.end())
+        line_end = len(head) if line_end < 0 else line_end + 1
+        whole_line = not head[line_start:m.start()].strip() and not head[m.end():line_end].strip()
+        start, end = (line_start, line_end) if whole_line else (m.start(), m.end())
+        out.append(head[pos:start])
+        if insert_at is None:
+            insert_at = len("".join(out))
+            indent = re.match(r"[ \t]*", head[line_start:]).group(0)
+        pos = end
+    out.append(head[pos:])
+    head = "".join(out)
+
+    if insert_at is None:
+        return EMPTY_NOSCRIPT_RE.sub("", head) + rest
+    lines = [
+        f'{indent}<link rel="preload" href="{url}" as="font" type="font/woff2" crossorigin data-fonts>'
+        for url in preload
+    ]
+    css = "".join(font_face_css(e["family"], e["style"], e["weight"], e["output"]) for e in entries)
+    lines.append(f"{indent}<style data-fonts>{css}</style>")
+    block = "\n".join(lines) + "\n"
+    # 外した <link> を包んでいた <noscript>（build_assets.py --critical のもの）は埋め込み後に片付ける
+    return head[:insert_at] + block + EMPTY_NOSCRIPT_RE.sub("", head[insert_at:]) + rest
+
+
+def remove_css_imports(assets_dir: Path) -> list:
+    """assets/css/*.css（ハッシュなし）の Google Fonts の @import を削除する。戻り値: 変更したファイル"""
+    changed = []
+    for css in find_sources(assets_dir):
+        if css.suffix != ".css":
+            continue
+        text = css.read_text(encoding="utf-8")
+        updated = IMPORT_RE.sub(lambda m: "" if is_google_fonts(m.group(2)) else m.group(0), text)
+        if updated != text:
+            shutil.copy2(css, css.with_suffix(".css.bak"))
+            css.write_text(updated, encoding="utf-8")
+            changed.append(css)
+    return changed
+
+
+def save_manifest(fonts_dir: Path, entries: list) -> Path:
+    """マニフェストを書き出す（一時ファイル経由で置き換え、途中終了でも壊さない）。"""
+    path = fonts_dir / MANIFEST_NAME
+    tmp  = path.with_name(path.name + ".tmp")
+    faces = [dict(e, weight=list(e["weight"]) if isinstance(e["weight"], tuple) else e["weight"]) for e in entries]
+    tmp.write_text(json.dumps({"version": 1, "faces": faces}, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+    return path
+
+
+def load_manifest_faces(fonts_dir: Path) -> list:
+    path = fonts_dir / MANIFEST_NAME
+    if not path.exists():
+        return []
+    try:
+        faces = json.loads(path.read_text(encoding="utf-8")).get("faces", [])
+    except (OSError, ValueError):
+        return []
+    return [(f["family"], f["style"], tuple(f["weight"]) if isinstance(f["weight"], list) else f["weight"])
+            for f in faces]
+
+
+# ============================================================
+# メイン
+# ============================================================
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Web フォントのサブセット化とセルフホスト化")
+    parser.add_argument(
+        "--all", action="store_true",
+        help=f"{OUTPUT_ROOT}/ 配下の全案件をまとめて処理する（PROJECT_NAME の設定は無視）",
+    )
+    parser.add_argument(
+        "--source", type=Path, default=FONT_SOURCE_DIR,
+        help=f"元フォント（.ttf / .otf / .woff / .woff2）の置き場所（既定: {FONT_SOURCE_DIR}/）",
+    )
+    return parser.parse_args()
+
+
+def build_project(project_dir: Path, sources: list) -> dict:
+    """
+    1案件分のフォントを作って参照を差し替える。元フォントが足りない場合は何も書き換えない。
+    戻り値: {"faces": [...], "kb": float, "missing": [...]}
+    """
+    html_path = project_dir / "index.html"
+    assets_dir = project_dir / "assets"
+    fonts_dir = assets_dir / FONT_DIR
+    results = {"faces": [], "kb": 0.0, "missing": []}
+    if not html_path.exists():
+        print(f"  HTML が見つかりません: {html_path}")
+        return results
+
+    html = html_path.read_text(encoding="utf-8")
+    faces, urls = find_requested_faces(html, assets_dir)
+    if not faces:
+        faces = load_manifest_faces(fonts_dir)
+    if not faces:
+        print("  Google Fonts の指定が見つかりません（対象なし）")
+        return results
+    for url in urls:
+        print(f"  読み込み元: {url}")
+
+    matched = {face: find_source(sources, *face) for face in faces}
+    results["missing"] = [face for face, info in matched.items() if info is None]
+    if results["missing"]:
+        for family, style, weight in results["missing"]:
+            print(f"  [NG] 元フォントがありません: {family} {style} {weight}")
+        print("  元フォントを置いてから再実行してください（HTML / CSS は変更していません）")
+        return results
+
+    families = list(dict.fromkeys(f[0] for f in faces))
+    text, above = collect_page_text(html_path, families)
+    if text is None:
+        print("  使用文字: HTML 全体から抽出（Playwright / Chromium がないため書体は区別しません）")
+        page = static_page_text(html)
+        text = {family: page for family in families}
+        above = {(family, "normal", 400) for family in families}
+    common = ALWAYS_TEXT + script_text(assets_dir) + EXTRA_TEXT
+
+    entries = []
+    for i, face in enumerate(faces, 1):
+        family, style, weight = face
+        info = matched[face]
+        chars = "".join(sorted(set(text.get(family, "") + common) - set("\n\r\t")))
+        data = subset_font(info, weight, chars)
+        dst = write_font(fonts_dir, face_slug(*face), data)
+        src_kb = info["path"].stat().st_size / 1024
+        print(f"[{i:02d}/{len(faces)}] {family} {style} {weight} <- {info['path'].name}")
+        print(f"    [OK] {src_kb:.0f} KB -> {len(data) / 1024:.1f} KB WOFF2（{len(chars)} 文字）  {dst.name}")
+        entries.append({
+            "family": family, "style": style, "weight": weight,
+            "source": info["path"].name,
+            "output": dst.relative_to(project_dir).as_posix(),
+            "size":   len(data),
+            "chars":  len(chars),
+        })
+        results["faces"].append(f"{family} {style} {weight}")
+        results["kb"] += len(data) / 1024
+    save_manifest(fonts_dir, entries)
+
+    # ファーストビューで使う書体だけ preload する（全部だと本当に先に必要なものが遅れる）
+    preload_faces = {nearest_face(faces, *used) for used in above} - {None}
+    preload = [e["output"] for e in entries if (e["family"], e["style"], e["weight"]) in preload_faces]
+
+    print("\n-- index.html 更新 --")
+    updated = rewrite_font_references(html, entries, preload)
+    for url in preload:
+        print(f"    preload: {url}")
+    if updated != html:
+        backup = html_path.with_suffix(".html.bak")
+        shutil.copy2(html_path, backup)
+        html_path.write_text(updated, encoding="utf-8")
+        print(f"  [OK] Google Fonts の参照を差し替えました（バックアップ: {backup.name}）")
+    else:
+        print("  変更なし（参照は最新）")
+
+    for css in remove_css_imports(assets_dir):
+        print(f"  [OK] {css.relative_to(project_dir).as_posix()} の @import を削除しました"
+              f"（build_assets.py を再実行してください）")
+    return results
+
+
+def main():
+    args = parse_args()
+    _require_fonttools()
+
+    if args.all:
+        projects = sorted(p.parent for p in OUTPUT_ROOT.glob("*/index.html"))
+    else:
+        if not PROJECT_DIR.exists():
+            print(f"エラー: 案件フォルダが見つかりません: {PROJECT_DIR}")
+            sys.exit(1)
+        projects = [PROJECT_DIR]
+    if not args.source.is_dir():
+        print(f"エラー: 元フォントのフォルダが見つかりません: {args.source}")
+        sys.exit(1)
+
+    sources = scan_sources(args.source)
+    print(f"\n{'='*50}")
+    print(f"  Web フォントのサブセット化（{len(projects)} 案件）")
+    print(f"  元フォント:   {args.source}（{len(sources)} ファイル）")
+    for info in sources:
+        w = info["weight"]
+        print(f"    {info['family']} {info['style']} {w[0]}" + (f"-{w[1]}（可変）" if w[0] != w[1] else "")
+              + f"  {info['path'].name}")
+    print(f"  font-display: {FONT_DISPLAY}")
+    print(f"{'='*50}")
+
+    summaries = []
+    for project_dir in projects:
+        print(f"\n-- {project_dir.name} --")
+        summaries.append((project_dir.name, build_project(project_dir, sources)))
+
+    print(f"\n{'='*50}")
+    print(f"  完了")
+    for name, results in summaries:
+        if results["missing"]:
+            print(f"  {name}: 元フォント不足のため未処理（{len(results['missing'])} 書体）")
+        elif results["faces"]:
+            print(f"  {name}: {len(results['faces'])} 書体  合計 {results['kb']:.1f} KB（WOFF2）")
+    print(f"{'='*50}\n")
+
+
+if __name__ == "__main__":
+    main()
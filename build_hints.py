@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+build_hints.py - 画像の読み込みヒントを実測から付け直す（loading / decoding / fetchpriority / preload）
+
+サイト完成後、convert_to_webp.py（srcset / <picture> の付与）の後に実行する。
+テストと同じ 3 画面サイズで index.html を Playwright で描画し、
+  - どの <img> がスクロール前の画面（ファーストビュー）に入っているか
+  - どの <img> が LCP（最大コンテンツの描画）要素か
+を記録して、手作業で付けていた読み込みヒントを計測結果どおりに書き直す。
+
+使い方:
+  python build_hints.py
+  python build_hints.py --all         # output/ 配下の全案件をまとめて処理
+  python build_hints.py --dry-run     # 計測結果と変更内容を表示するだけで書き換えない
+
+書き換えの内容:
+  - LCP 画像:           loading なし（即時）・fetchpriority="high"・decoding なし（最初の描画に間に合わせる）
+  - ファーストビューの画像: loading なし（即時）・decoding="async"
+  - それ以外の画像:       loading="lazy"・decoding="async"
+    （どれか 1 つの画面サイズでファーストビューに入れば即時読み込みにする）
+  - <head> に LCP 画像の <link rel="preload" as="image" imagesrcset=... imagesizes=... fetchpriority="high">
+    （<picture> の場合は先頭の <source>（AVIF）を type つきで先読みする。
+    手で入れていた画像の preload は外して作り直す。再実行しても同じ結果。
+    あとから convert_to_webp.py を実行した場合も、この preload は変換後の画像に合わせて作り直される）
+
+必要なもの:
+  pip install -r requirements_test.txt && playwright install chromium
+"""
+
+import argparse
+import io
+import re
+import shutil
+import sys
+from collections import Counter
+from pathlib import Path
+
+# Windows ターミナルの文字化け対策
+if sys.stdout.encoding.lower() != "utf-8":
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
+if sys.stderr.encoding.lower() != "utf-8":
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8")
+
+# HTML の解析と描画する画面サイズは画像変換・CSS ビルドと共通のものを使う
+from build_assets import CRITICAL_VIEWPORTS
+from convert_to_webp import TAG_ATTR_RE, TOKEN_RE, _remove_attr, _set_attr, find_images, preload_tag
+
+
+# ============================================================
+# 設定（案件ごとにここを変更する）
+# ============================================================
+
+PROJECT_NAME = "THE-CORNER-CAFE_v3"
+PROJECT_DIR  = Path(f"output/{PROJECT_NAME}")
+
+OUTPUT_ROOT  = Path("output")  # --all で案件を探すディレクトリ（{案件名}/index.html）
+
+LCP_SETTLE_MS = 500   # 読み込み完了後、最後の LCP 候補が届くまで待つ時間[ミリ秒]
+
+PRELOAD_RE = re.compile(r"^[ \t]*<link\b[^>]*\bdata-hints\b[^>]*>[ \t]*\n?", re.MULTILINE)
+COMMENT_LINES_RE = re.compile(r"(?:^[ \t]*<!--.*?-->[ \t]*\n)+\Z", re.MULTILINE)
+NON_FETCHING_RELS = {"canonical", "alternate", "author", "license", "me"}   # 何も読み込まない <link>
+
+
+# ============================================================
+# 計測
+# ============================================================
+
+# ページ内の全 <img>（文書順）について、ファーストビューに入っているかと LCP 要素かを返す
+MEASURE_JS = """
+async (settleMs) => {
+    let last = null;
+    new PerformanceObserver(list => {
+        const entries = list.getEntries();
+        last = entries[entries.length - 1];
+    }).observe({ type: "largest-contentful-paint", buffered: true });
+    await new Promise(resolve => setTimeout(resolve, settleMs));
+
+    const images = [...document.querySelectorAll("img")];
+    const lcp = last && last.element;
+    return {
+        lcp: lcp ? (lcp.tagName === "IMG" ? images.indexOf(lcp) : lcp.tagName.toLowerCase()) : null,
+        images: images.map(img => {
+            const r = img.getBoundingClientRect();
+            const visible = r.width > 0 && r.height > 0 && getComputedStyle(img).visibility !== "hidden";
+            return {
+                src: img.getAttribute("src") || "",
+                inView: visible && r.top < innerHeight && r.bottom > 0 && r.left < innerWidth && r.right > 0,
+            };
+        }),
+    };
+}
+"""
+
+
+def measure_layout(html_path: Path) -> dict:
+    """
+    画面サイズごとに描画して計測する。
+    戻り値: {画面サイズ名: {"lcp": <img> の番号 / タグ名 / None, "images": [{"src", "inView"}, ...]}}
+    """
+    try:
+        from playwright.sync_api import sync_playwright  # 計測に必須
+    except ImportError:
+        print("エラー: Playwright が必要です（pip install -r requirements_test.txt）")
+        sys.exit(1)
+
+    results = {}
+    with sync_playwright() as p:
+        browser = p.chromium.launch()
+        try:
+            for name, viewport in CRITICAL_VIEWPORTS.items():
+                page = browser.new_page(viewport=viewport)
+                # 外部リソース（Google Fonts・地図など）は読まない。配置は案件内の CSS / 画像で決まる
+                page.route("**/*", lambda route: route.continue_()
+                           if route.request.url.startswith("file:") else route.abort())
+                page.goto(html_path.resolve().as_uri(), wait_until="load")
+                results[name] = page.evaluate(MEASURE_JS, LCP_SETTLE_MS)
+                page.close()
+        finally:
+            browser.close()
+    return results
+
+
+# ============================================================
+# HTML の書き換え
+# ============================================================
+
+def _put_attr(tag: str, name: str, value: str) -> str:
+    """属性を書き換える（なければ最後に追加。改行区切りのタグは改行とインデントを揃える）"""
+    updated = _set_attr(tag, name, value)
+    if updated != tag:
+        return updated
+    sep = (re.search(r'(\s+)src\s*=', tag, re.IGNORECASE) or re.search(r"(\s+)", tag)).group(1)
+    end = -2 if tag.endswith("/>") else -1
+    body = tag[:end]
+    trailing = body[len(body.rstrip()):]
+    return f'{body.rstrip()}{sep}{name}="{value}"{trailing}{tag[end:]}'
+
+
+def hint_image(tag: str, role: str) -> str:
+    """role（"lcp" / "above" / "below"）に合わせて loading / decoding / fetchpriority を付け直す。"""
+    for name in ("loading", "decoding", "fetchpriority"):
+        tag = _remove_attr(tag, name)
+    if role == "lcp":
+        return _put_attr(tag, "fetchpriority", "high")
+    if role == "above":
+        return _put_attr(tag, "decoding", "async")
+    return _put_attr(_put_attr(tag, "loading", "lazy"), "decoding", "async")
+
+
+def _attrs(tag: str) -> dict:
+    return {a.group(2).lower(): (a.group(4) or "").strip("\"'").lower() for a in TAG_ATTR_RE.finditer(tag)}
+
+
+def _is_image_preload(tag: str) -> bool:
+    attrs = _attrs(tag)
+    return "preload" in attrs.get("rel", "").split() and attrs.get("as") == "image"
+
+
+def rewrite_preload(html: str, preload: str) -> tuple:
+    """
+    <head> の画像の preload（前回の生成分と手で入れたもの）を外し、
+    最初にリソースを読み込む <link> / <style> / <script> の前（見出しのコメントがあればその前）に
+    preload を入れる（preload が None なら外すだけ）。
+    戻り値: (更新後 HTML, 外した手書きの preload の一覧)
+    """
+    head_end = html.lower().find("</head>")
+    if head_end < 0:
+        return html, []
+    head, rest = html[:head_end], html[head_end:]
+    head = PRELOAD_RE.sub("", head)
+
+    removed = []
+    out: list = []
+    pos = 0
+    indent = None
+    for m in TOKEN_RE.finditer(head):
+        tag = m.group("tag") or m.group("style_open") or m.group("script")
+        if not tag or not re.match(r"<(link|style|script)\b", tag, re.IGNORECASE):
+            continue
+        rels = set(_attrs(tag).get("rel", "").split()) if m.group("tag") else set()
+        if rels and rels <= NON_FETCHING_RELS:
+            continue
+        line_start = head.rfind("\n", 0, m.start()) + 1
+        if m.group("tag") and _is_image_preload(tag):
+            line_end = head.find("\n", m.end()) + 1 or len(head)
+            whole_line = not head[line_start:m.start()].strip() and not head[m.end():line_end].strip()
+            start, end = (line_start, line_end) if whole_line else (m.start(), m.end())
+            out.append(head[pos:start])
+            pos = end
+            removed.append(tag)
+        elif indent is None and preload is not None:
+            at = line_start if line_start >= pos else m.start()
+            comment = COMMENT_LINES_RE.search(head, pos, at)
+            if comment and at == line_start:
+                at = comment.start()
+            indent = re.match(r"[ \t]*", head[at:]).group(0)
+            out += [head[pos:at], f"{indent}{preload}\n"]
+            pos = at
+    out.append(head[pos:])
+    return "".join(out) + rest, removed
+
+
+def decide_roles(measured: dict, count: int) -> tuple:
+    """
+    画面サイズごとの計測結果から <img> ごとの役割を決める。
+    戻り値: (["lcp" / "above" / "below", ...], 先読みする <img> の番号 or None)
+    """
+    roles = ["below"] * count
+    for result in measured.values():
+        for i, image in enumerate(result["images"]):
+            if image["inView"]:
+                roles[i] = "above"
+    lcp_votes = Counter(r["lcp"] for r in measured.values() if isinstance(r["lcp"], int) and r["lcp"] >= 0)
+    for i in lcp_votes:
+        roles[i] = "lcp"
+    preload = lcp_votes.most_common(1)[0][0] if lcp_votes else None
+    return roles, preload
+
+
+# ============================================================
+# メイン
+# ============================================================
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="画像の読み込みヒント（loading / fetchpriority / preload）を実測から付け直す")
+    parser.add_argument(
+        "--all", action="store_true",
+        help=f"{OUTPUT_ROOT}/ 配下の全案件をまとめて処理する（PROJECT_NAME の設定は無視）",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true",
+        help="計測結果と変更内容を表示するだけで index.html は書き換えない",
+    )
+    return parser.parse_args()
+
+
+def build_project(project_dir: Path, dry_run: bool = False) -> dict:
+    """
+    1案件分を計測して index.html のヒントを付け直す。
+    戻り値: {"images": int, "lcp": int, "above": int, "below": int, "preload": str or None, "changed": bool}
+    """
+    html_path = project_dir / "index.html"
+    results = {"images": 0, "lcp": 0, "above": 0, "below": 0, "preload": None, "changed": False}
+    if not html_path.exists():
+        print(f"  HTML が見つかりません: {html_path}")
+        return results
+
+    html = html_path.read_text(encoding="utf-8")
+    images = find_images(html)
+    measured = measure_layout(html_path)
+
+    # JS で追加・並べ替えられた <img> があると HTML と対応が取れないので、そのときは何もしない
+    for name, result in measured.items():
+        dom = [image["src"] for image in result["images"]]
+        if dom != [image["attrs"].get("src", "") for image in images]:
+            print(f"  [NG] {name}: HTML の <img>（{len(images)} 件）と描画後の <img>（{len(dom)} 件）が一致しません")
+            print("  JS で画像を追加・変更している場合は対象外です（index.html は変更していません）")
+            return results
+
+    roles, preload_index = decide_roles(measured, len(images))
+    lcp_srcs = {
+        name: images[r["lcp"]]["attrs"].get("src") if isinstance(r["lcp"], int) else f"<{r['lcp']}>（画像以外）"
+        for name, r in measured.items()
+    }
+    for name, viewport in CRITICAL_VIEWPORTS.items():
+        above = sum(image["inView"] for image in measured[name]["images"])
+        print(f"    {name:<8} {viewport['width']}x{viewport['height']}: "
+              f"ファーストビュー {above} 枚 / LCP: {lcp_srcs[name] or '-'}")
+    if len({src for src in lcp_srcs.values() if src}) > 1:
+        print("  [WARN] 画面サイズによって LCP 要素が異なります（preload は最も多い画面サイズの画像だけに付けます）")
+
+    print(f"\n  {'番号':<4} {'役割':<6} {'loading':<8} 画像")
+    updated = []
+    pos = 0
+    for i, (image, role) in enumerate(zip(images, roles)):
+        tag = hint_image(image["tag"], role)
+        updated += [html[pos:image["start"]], tag]
+        pos = image["end"]
+        before = image["attrs"].get("loading", "-")
+        after = "lazy" if role == "below" else "-"
+        mark = "" if before == after else f"（{before} から変更）"
+        print(f"  {i:>4} {role:<6} {after:<8} {image['attrs'].get('src', '')}{mark}")
+        results[role] += 1
+    updated.append(html[pos:])
+    updated = "".join(updated)
+
+    preload = preload_tag(images[preload_index]) if preload_index is not None else None
+    updated, removed = rewrite_preload(updated, preload)
+    for tag in removed:
+        print(f"  手書きの preload を置き換え: {tag}")
+    if preload:
+        print(f"  preload: {preload}")
+
+    results.update(images=len(images), preload=preload, changed=updated != html)
+    if dry_run:
+        print(f"  --dry-run のため書き換えません（{'変更あり' if updated != html else '変更なし'}）")
+    elif updated != html:
+        backup = html_path.with_suffix(".html.bak")
+        shutil.copy2(html_path, backup)
+        html_path.write_text(updated, encoding="utf-8")
+        print(f"  [OK] 読み込みヒントを更新しました（バックアップ: {backup.name}）")
+    else:
+        print("  変更なし（ヒントは最新）")
+    return results
+
+
+def main():
+    args = parse_args()
+
+    if args.all:
+        projects = sorted(p.parent for p in OUTPUT_ROOT.glob("*/index.html"))
+    else:
+        if not PROJECT_DIR.exists():
+            print(f"エラー: 案件フォルダが見つかりません: {PROJECT_DIR}")
+            sys.exit(1)
+        projects = [PROJECT_DIR]
+
+    print(f"\n{'='*50}")
+    print(f"  読み込みヒントの更新（{len(projects)} 案件）")
+    print(f"  画面サイズ:   " + " / ".join(f"{n} {v['width']}x{v['height']}" for n, v in CRITICAL_VIEWPORTS.items()))
+    print(f"{'='*50}")
+
+    summaries = []
+    for project_dir in projects:
+        print(f"\n-- {project_dir.name} --")
+        summaries.append((project_dir.name, build_project(project_dir, args.dry_run)))
+
+    print(f"\n{'='*50}")
+    print(f"  完了")
+    for name, r in summaries:
+        if r["images"]:
+            print(f"  {name}: {r['images']} 枚（LCP {r['lcp']} / ファーストビュー {r['above']} / lazy {r['below']}）"
+                  f"  preload {'あり' if r['preload'] else 'なし'}")
+    print(f"{'='*50}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+compress_assets.py - 事前圧縮（.gz / .br のサイドカーファイルの書き出し）
+
+サイト完成後、最後に（convert_to_webp.py / build_fonts.py / build_assets.py の後に）実行する。
+output/{案件名}/ 配下のテキスト系ファイル（HTML / CSS / JS / SVG / JSON など）を最高圧縮レベルで圧縮し、
+元ファイルの隣に index.html.gz / index.html.br のように書き出す。
+サーバーはリクエストのたびに圧縮せず、圧縮済みのファイルをそのまま返せる（CPU 負荷ゼロ・常に最高圧縮）。
+
+使い方:
+  python compress_assets.py
+  python compress_assets.py --all          # output/ 配下の全案件をまとめて処理
+  python compress_assets.py --force        # 内容が同じでも作り直す
+  python compress_assets.py --workers 4    # 並列プロセス数を指定
+
+機能:
+  - gzip（レベル 9）と brotli（品質 11 / テキストモード）で並列に圧縮
+    （brotli は pip install brotli がある場合のみ。ない場合は .gz だけ作る）
+  - 元ファイルの SHA-256 を {案件名}/.compress-manifest.json に記録し、
+    内容が変わっていないファイルはスキップ（サイドカーが消えていれば作り直す）
+  - 圧縮しても小さくならないファイルはサイドカーを作らない（古いサイドカーは削除）
+  - 元ファイルが消えたサイドカーを削除（このスクリプトが作ったものだけ）
+  - 圧縮結果の一覧表（元サイズ / gzip / brotli / 削減率）を表示
+  - {案件名}/.htaccess に圧縮済みファイルを返す設定を書き出す（Apache / XAMPP。
+    既存の .htaccess がこのスクリプトの生成物でなければ上書きせず、設定例を表示する）
+    nginx の場合は gzip_static on; / brotli_static on;（ngx_brotli）で同じ動きになる
+"""
+
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Windows ターミナルの文字化け対策
+if sys.stdout.encoding.lower() != "utf-8":
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
+if sys.stderr.encoding.lower() != "utf-8":
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8")
+
+
+# ============================================================
+# 設定（案件ごとにここを変更する）
+# ============================================================
+
+PROJECT_NAME = "THE-CORNER-CAFE_v3"
+PROJECT_DIR  = Path(f"output/{PROJECT_NAME}")
+
+OUTPUT_ROOT  = Path("output")  # --all で案件を探すディレクトリ（{案件名}/index.html）
+
+WORKERS = os.cpu_count() or 1  # 並列圧縮のプロセス数（1 で逐次実行）
+
+# 圧縮対象の拡張子（画像・フォントなど、元から圧縮されている形式は含めない）
+COMPRESS_EXTENSIONS = {
+    ".html", ".htm", ".css", ".js", ".mjs", ".json", ".map",
+    ".svg", ".xml", ".txt", ".webmanifest", ".ico",
+}
+EXCLUDE_DIRS  = {"logs"}   # 配信しないフォルダ
+MIN_SIZE      = 256        # これより小さいファイルは圧縮しない（ヘッダーのほうが大きくなる）
+GZIP_LEVEL    = 9
+BROTLI_QUALITY = 11
+MANIFEST_NAME = ".compress-manifest.json"   # 案件フォルダ直下に保存
+
+COMPRESS_PATTERN = "|".join(sorted(ext.lstrip(".") for ext in COMPRESS_EXTENSIONS))
+
+HTACCESS_MARKER = "# compress_assets.py が生成"
+HTACCESS = f"""{HTACCESS_MARKER}（圧縮済みの .br / .gz があれば、リクエストのたびに圧縮せずそのまま返す）
+<IfModule mod_mime.c>
+  AddEncoding br .br
+  AddEncoding gzip .gz
+</IfModule>
+<IfModule mod_rewrite.c>
+  RewriteEngine On
+  RewriteCond %{{HTTP:Accept-Encoding}} \\bbr\\b
+  RewriteCond %{{REQUEST_FILENAME}}.br -f
+  RewriteRule ^(.*)$ $1.br [QSA,L]
+  RewriteCond %{{HTTP:Accept-Encoding}} \\bgzip\\b
+  RewriteCond %{{REQUEST_FILENAME}}.gz -f
+  RewriteRule ^(.*)$ $1.gz [QSA,L]
+</IfModule>
+<IfModule mod_headers.c>
+  # 圧縮版だけでなく元ファイルの応答にも付ける（付けないと共有キャッシュが無圧縮版を誰にでも返す）
+  <FilesMatch "\\.({COMPRESS_PATTERN})(\\.br|\\.gz)?$">
+    Header merge Vary Accept-Encoding
+  </FilesMatch>
+</IfModule>
+# 圧縮済みファイルを mod_deflate で二重に圧縮しない
+SetEnvIfNoCase Request_URI "\\.(br|gz)$" no-gzip
+"""
+
+SIDECARS = {"gzip": ".gz", "br": ".br"}
+
+
+# ============================================================
+# 圧縮
+# ============================================================
+
+def find_targets(project_dir: Path) -> list:
+    """圧縮対象のファイルをパス順で返す（隠しファイル・バックアップ・配信しないフォルダは除く）。"""
+    targets = []
+    for path in sorted(project_dir.rglob("*")):
+        rel = path.relative_to(project_dir)
+        if not path.is_file() or path.suffix.lower() not in COMPRESS_EXTENSIONS:
+            continue
+        if any(part.startswith(".") or part in EXCLUDE_DIRS for part in rel.parts):
+            continue
+        targets.append(path)
+    return targets
+
+
+def sidecar_path(src: Path, encoding: str) -> Path:
+    return src.with_name(src.name + SIDECARS[encoding])
+
+
+def compress_data(data: bytes, encoding: str) -> bytes:
+    """最高圧縮レベルで圧縮する（gzip は時刻を埋め込まず、同じ内容なら同じ結果にする）"""
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    return brotli.compress(data, quality=BROTLI_QUALITY, mode=brotli.MODE_TEXT)
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+def available_encodings() -> list:
+    return ["gzip", "br"] if brotli else ["gzip"]
+
+
+def _is_up_to_date(src: Path, cached: dict, digest: str) -> bool:
+    """内容が前回と同じで、前回作ったサイドカーがすべて残っていれば True"""
+    if not cached or cached.get("sha256") != digest:
+        return False
+    for encoding in available_encodings():
+        if encoding in cached.get("skipped", []):
+            continue
+        sidecar = sidecar_path(src, encoding)
+        if cached.get(encoding) is None or not sidecar.exists() or sidecar.stat().st_size != cached[encoding]:
+            return False
+    return True
+
+
+def _compress_task(src: Path, cached: dict = None, force: bool = False) -> dict:
+    """
+    1 ファイルを圧縮してサイドカーを書き出す（ワーカープロセスで実行）。
+    戻り値: マニフェストの記録 {"sha256", "size", "gzip", "br", "skipped", "cached"}
+    """
+    data = src.read_bytes()
+    digest = hashlib.sha256(data).hexdigest()
+    if not force and _is_up_to_date(src, cached, digest):
+        return dict(cached, cached=True)
+
+    entry = {"sha256": digest, "size": len(data), "skipped": [], "cached": False}
+    for encoding in available_encodings():
+        dst = sidecar_path(src, encoding)
+        compressed = compress_data(data, encoding) if len(data) >= MIN_SIZE else None
+        if compressed is None or len(compressed) >= len(data):
+            # 小さくならないなら元ファイルを返したほうがよい（サーバーが古いサイドカーを選ばないよう削除）
+            dst.unlink(missing_ok=True)
+            entry["skipped"].append(encoding)
+            continue
+        if not dst.exists() or dst.read_bytes() != compressed:
+            _write_atomic(dst, compressed)
+        entry[encoding] = len(compressed)
+    return entry
+
+
+def compress_many(targets: list, cache: dict, workers: int = WORKERS, force: bool = False) -> dict:
+    """
+    複数のファイルを並列に圧縮する。cache は {元ファイル: 前回の記録}。
+    戻り値: {元ファイル: _compress_task() の戻り値}
+    """
+    if workers <= 1 or len(targets) <= 1:
+        return {src: _compress_task(src, cache.get(src), force) for src in targets}
+    with ProcessPoolExecutor(max_workers=min(workers, len(targets))) as pool:
+        futures = {src: pool.submit(_compress_task, src, cache.get(src), force) for src in targets}
+        return {src: future.result() for src, future in futures.items()}
+
+
+# ============================================================
+# マニフェスト・配信設定
+# ============================================================
+
+def load_manifest(project_dir: Path) -> dict:
+    path = project_dir / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding="utf-8")).get("files", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(project_dir: Path, entries: dict) -> Path:
+    """マニフェストを書き出す（一時ファイル経由で置き換え、途中終了でも壊さない）。"""
+    path = project_dir / MANIFEST_NAME
+    data = {
+        "version": 1,
+        "gzip_level": GZIP_LEVEL,
+        "brotli_quality": BROTLI_QUALITY if brotli else None,
+        "files": dict(sorted(entries.items())),
+    }
+    _write_atomic(path, json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8"))
+    return path
+
+
+def remove_stale_sidecars(project_dir: Path, old: dict, current: dict) -> list:
+    """前回の記録にあって今回の対象にない（元ファイルが消えた）ファイルのサイドカーを削除する。"""
+    removed = []
+    for rel in sorted(set(old) - set(current)):
+        for encoding in SIDECARS:
+            sidecar = sidecar_path(project_dir / rel, encoding)
+            if sidecar.exists():
+                sidecar.unlink()
+                removed.append(sidecar)
+    return removed
+
+
+def write_htaccess(project_dir: Path) -> bool:
+    """配信設定を書き出す。既存の .htaccess が生成物でなければ上書きしない（戻り値: 書き出したか）"""
+    path = project_dir / ".htaccess"
+    if path.exists() and not path.read_text(encoding="utf-8").startswith(HTACCESS_MARKER):
+        return False
+    path.write_text(HTACCESS, encoding="utf-8")
+    return True
+
+
+# ============================================================
+# メイン
+# ============================================================
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="テキスト系ファイルの事前圧縮（.gz / .br の書き出し）")
+    parser.add_argument(
+        "--all", action="store_true",
+        help=f"{OUTPUT_ROOT}/ 配下の全案件をまとめて処理する（PROJECT_NAME の設定は無視）",
+    )
+    parser.add_argument(
+        "--force", action="store_true",
+        help="内容が変わっていないファイルも圧縮し直す",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=WORKERS,
+        help=f"並列圧縮のプロセス数（既定: {WORKERS} / 1 で逐次実行）",
+    )
+    return parser.parse_args()
+
+
+def _kb(size) -> str:
+    return f"{size / 1024:8.1f} KB" if size is not None else f"{'-':>11}"
+
+
+def print_table(project_dir: Path, results: dict) -> None:
+    """圧縮結果の一覧表（元サイズ / gzip / brotli と削減率）"""
+    width = max([len(src.relative_to(project_dir).as_posix()) for src in results] + [8])
+    print(f"  {'ファイル':<{width - 4}}  {'元サイズ':>9}  {'gzip':>11}  {'brotli':>11}  削減率")
+    totals = {"size": 0, "served": 0}
+    for src, entry in results.items():
+        rel = src.relative_to(project_dir).as_posix()
+        smallest = min(v for v in (entry["size"], entry.get("gzip"), entry.get("br")) if v is not None)
+        ratio = (1 - smallest / entry["size"]) * 100 if entry["size"] else 0
+        mark = "（変更なし）" if entry["cached"] else ""
+        print(f"  {rel:<{width}}  {_kb(entry['size'])}  {_kb(entry.get('gzip'))}  {_kb(entry.get('br'))}"
+              f"  {ratio:5.1f}% {mark}")
+        totals["size"] += entry["size"]
+        totals["served"] += smallest
+    ratio = (1 - totals["served"] / totals["size"]) * 100 if totals["size"] else 0
+    print(f"  {'合計':<{width - 2}}  {_kb(totals['size'])}  → 配信 {totals['served'] / 1024:.1f} KB（{ratio:.0f}% 削減）")
+
+
+def run_project(project_dir: Path, workers: int, force: bool) -> dict:
+    """
+    1案件分を圧縮する（サイドカー・マニフェスト・.htaccess）。
+    戻り値: {"files": int, "compressed": int, "size_kb": float, "served_kb": float}
+    """
+    targets = find_targets(project_dir)
+    summary = {"files": len(targets), "compressed": 0, "size_kb": 0.0, "served_kb": 0.0}
+    if not targets:
+        print("  圧縮対象が見つかりません")
+        return summary
+
+    old = load_manifest(project_dir)
+    cache = {src: old.get(src.relative_to(project_dir).as_posix()) for src in targets}
+    results = compress_many(targets, cache, workers, force)
+
+    entries = {}
+    for src, entry in results.items():
+        entries[src.relative_to(project_dir).as_posix()] = {k: v for k, v in entry.items() if k != "cached"}
+        summary["compressed"] += not entry["cached"]
+        summary["size_kb"] += entry["size"] / 1024
+        summary["served_kb"] += min(v for v in (entry["size"], entry.get("gzip"), entry.get("br"))
+                                    if v is not None) / 1024
+    save_manifest(project_dir, entries)
+    print_table(project_dir, results)
+
+    for sidecar in remove_stale_sidecars(project_dir, old, entries):
+        print(f"  古いサイドカーを削除: {sidecar.relative_to(project_dir).as_posix()}")
+    if write_htaccess(project_dir):
+        print("  [OK] .htaccess に圧縮済みファイルの配信設定を書き出しました")
+    else:
+        print("  [WARN] 既存の .htaccess があるため配信設定は書き出していません。次の設定を追記してください:")
+        print("\n".join("    " + line for line in HTACCESS.splitlines()))
+    return summary
+
+
+def main():
+    args = parse_args()
+
+    if args.all:
+        projects = sorted(p.parent for p in OUTPUT_ROOT.glob("*/index.html"))
+    else:
+        if not PROJECT_DIR.exists():
+            print(f"エラー: 案件フォルダが見つかりません: {PROJECT_DIR}")
+            sys.exit(1)
+        projects = [PROJECT_DIR]
+
+    print(f"\n{'='*50}")
+    print(f"  事前圧縮（{len(projects)} 案件）")
+    print(f"  gzip:         レベル {GZIP_LEVEL}")
+    if brotli:
+        print(f"  brotli:       品質 {BROTLI_QUALITY}")
+    else:
+        print(f"  brotli:       なし（pip install brotli で .br も作成）")
+    print(f"  並列数:       {args.workers}")
+    print(f"  キャッシュ:   {'無効（--force）' if args.force else '有効'}")
+    print(f"{'='*50}")
+
+    summaries = []
+    for project_dir in projects:
+        print(f"\n-- {project_dir.name} --")
+        summaries.append((project_dir.name, run_project(project_dir, args.workers, args.force)))
+
+    print(f"\n{'='*50}")
+    print(f"  完了")
+    for name, s in summaries:
+        ratio = (1 - s["served_kb"] / s["size_kb"]) * 100 if s["size_kb"] else 0
+        print(f"  {name}: {s['files']} ファイル（圧縮 {s['compressed']} / スキップ {s['files'] - s['compressed']}）"
+              f"  {s['size_kb']:.1f} KB -> {s['served_kb']:.1f} KB ({ratio:.0f}% 削減)")
+    print(f"{'='*50}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,34 +5,78 @@ convert_to_webp.py - Webサイト用画像一括WebP変換スクリプト
 
 サイト完成後に実行する。
 output/{案件名}/assets/images/ 内の JPG/PNG を WebP に変換し、
-index.html の拡張子参照も一括置換する。
+index.html の画像参照（src / srcset / og:image 等）も変換後のファイルに書き換える。
+あわせて幅違いのレスポンシブ画像（例: hero-480w.webp）を書き出し、
+<img> に srcset / sizes を付与する。
+AVIF のほうが小さくなる画像は AVIF も書き出し、<picture> で配信する。
 
 使い方:
   python convert_to_webp.py
+  python convert_to_webp.py --workers 4   # 並列数を指定（1 で逐次実行）
+  python convert_to_webp.py --force       # キャッシュを無視して全画像を再変換
+  python convert_to_webp.py --all         # output/ 配下の全案件をまとめて変換
+  python convert_to_webp.py --auto-quality          # 画像ごとに品質を自動調整（SSIM 目標値まで下げる）
+  python convert_to_webp.py --auto-quality --target-ssim 0.99
+  python convert_to_webp.py --low-memory            # 高解像度の元画像向けの省メモリ変換
+  python convert_to_webp.py --low-memory --memory-limit 256
 
 機能:
   - JPG / PNG -> WebP 変換（元ファイルは残す or 削除を選択）
+  - 複数プロセスによる並列変換（1枚の失敗が他の変換を止めない）
+  - 全案件一括モード（全案件の画像を 1 つのプロセスプールで変換し、案件ごとに集計）
+  - 変換マニフェストによる差分変換（内容と設定が同じ画像は再エンコードしない）
+  - 幅違いバリアントの生成（1回のデコードで全サイズを書き出す）と srcset / sizes の付与
+  - 品質の自動調整（--auto-quality）: 画像ごとに SSIM が目標値を下回らない最小の品質を二分探索し、
+    採用した品質をマニフェストに記録する（なめらかな画像ほど小さくなる）
+  - AVIF / WebP を両方エンコードし、小さいほうを画像ごとに採用
+    （AVIF 採用時は <picture data-converted><source type="image/avif"> + WebP の <img>。
+    手書きの <picture> は要素と media 付きの <source> を残し、URL の差し替えと AVIF の <source> の追加だけを行う）
+  - 省メモリ変換（--low-memory）: 大きな JPEG は縮小デコード（draft）し、原寸ファイルも
+    LOW_MEMORY_MAX_WIDTH に縮小する。デコード前の見積もりがメモリ上限を超える画像は変換しない
+  - 出力は一時ファイルに直接エンコードしてから置き換える（途中終了でも壊れたファイルを残さない）
   - index.html の .jpg / .png 参照を .webp に自動置換
+    （属性値と CSS url() だけを対象に、.webp が実在する参照のみ書き換える）
+  - build_hints.py が付けた LCP 画像の preload（data-hints）を、変換後の srcset / AVIF に合わせて作り直す
   - 変換結果レポートを表示
 """
 
+import argparse
+import hashlib
+import html as html_lib
 import io
+import json
+import os
+import re
 import shutil
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from io import BytesIO
 from pathlib import Path
+from urllib.parse import unquote, urlsplit
 
 # Windows ターミナルの文字化け対策
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
-sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8")
+# （generate_images.py から import された場合など、UTF-8 化済みなら二重に包まない）
+if sys.stdout.encoding.lower() != "utf-8":
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
+if sys.stderr.encoding.lower() != "utf-8":
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8")
 
 try:
-    from PIL import Image
+    from PIL import Image, ImageMath, features
 except ImportError:
     print("エラー: Pillow がインストールされていません")
     print("実行してください: pip install Pillow")
     sys.exit(1)
 
+try:
+    import resource  # ワーカーのピークメモリの取得（Windows にはないので、その場合は表示しない）
+except ImportError:
+    resource = None
+
+# AVIF は Pillow 11.2 以降の公式ホイールなら標準で使える（なければ WebP のみで続行）
+AVIF_AVAILABLE = features.check("avif")
+
 
 # ============================================================
 # 設定（案件ごとにここを変更する）
@@ -42,9 +86,42 @@ PROJECT_NAME = "THE-CORNER-CAFE_v3"
 IMAGES_DIR   = Path(f"output/{PROJECT_NAME}/assets/images")
 HTML_PATH    = Path(f"output/{PROJECT_NAME}/index.html")
 
+OUTPUT_ROOT  = Path("output")  # --all で案件を探すディレクトリ（{案件名}/assets/images）
+
 WEBP_QUALITY    = 85    # 1~100（85 が品質・サイズのバランス推奨）
+WEBP_METHOD     = 6     # 0~6（6 が最高圧縮・最も低速）
+
+AVIF_ENABLED    = True          # False で AVIF の比較エンコードを行わない
+AVIF_QUALITY    = 60            # 0~100（AVIF は数値の尺度が違う。WebP 85 と同程度の見た目になる目安）
+AVIF_SPEED      = 6             # 0~10（小さいほど高圧縮・低速）
 DELETE_ORIGINALS = False  # True にすると変換後に元ファイルを削除
 
+# 品質の自動調整（True または --auto-quality で有効）
+# 画像ごとに、元画像との SSIM が TARGET_SSIM 以上になる最小の品質を探す。
+# 上限は通常の品質（WEBP_QUALITY / AVIF_QUALITY）なので、固定品質のときより大きくなることはない。
+AUTO_QUALITY      = False
+TARGET_SSIM       = 0.95          # 0~1（1 で元画像と同一。写真素材は WebP 85 でおよそ 0.95~0.97）
+AUTO_QUALITY_MIN  = {"webp": 50, "avif": 30}   # 探索する品質の下限
+
+# 省メモリ変換（True または --low-memory で有効。クライアント支給の高解像度写真向け）
+LOW_MEMORY           = False
+LOW_MEMORY_MAX_WIDTH = 2560   # これより幅の大きい元画像は、原寸ファイルもこの幅に縮小して書き出す
+MEMORY_LIMIT_MB      = 512    # 1ワーカーが画像データに使ってよいメモリ[MB]（デコード前に見積もって判定）
+
+WORKERS = os.cpu_count() or 1  # 並列変換のプロセス数（1 で逐次実行）
+
+# 変換マニフェスト（画像ディレクトリ内に保存。元画像のハッシュと変換設定を記録する）
+MANIFEST_NAME = ".convert-manifest.json"
+
+# レスポンシブ画像（元画像より小さい幅だけ {名前}-{幅}w.webp として書き出す）
+VARIANT_WIDTHS  = (480, 768, 1280, 1920)
+VARIANT_EXCLUDE = {"og-image"}  # バリアント不要な画像（拡張子なしのファイル名）
+
+# <img> の sizes 属性（拡張子なしのファイル名で指定。未指定は width 属性から自動算出）
+IMAGE_SIZES = {
+    "hero": "100vw",
+}
+
 
 # ============================================================
 # 変換対象の拡張子
@@ -57,129 +134,1212 @@ SOURCE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
 # 変換処理
 # ============================================================
 
-def convert_image(src: Path, quality: int) -> tuple:
+def encoder_params(quality: int, target: float = None, memory_limit: int = None) -> dict:
     """
-    1枚の画像を WebP に変換する。
-    戻り値: (成功フラグ, 元ファイルサイズ[KB], 変換後サイズ[KB])
+    キャッシュ判定に使う変換設定。ここが変わると全画像が再変換される。
+    target（品質自動調整の SSIM 目標値）を指定した場合、quality は探索の上限になる。
+    memory_limit（省メモリ変換のメモリ上限[MB]）を指定した場合は、原寸ファイルの最大幅も設定に含める。
+    """
+    return {
+        "format":  "webp",
+        "quality": quality,
+        "method":  WEBP_METHOD,
+        "mode":    "RGBA,P->RGBA;*->RGB",
+        "widths":  sorted(VARIANT_WIDTHS),
+        "exclude": sorted(VARIANT_EXCLUDE),
+        "avif":    {"quality": AVIF_QUALITY, "speed": AVIF_SPEED} if avif_enabled() else None,
+        "auto":    {"ssim": target, "min": AUTO_QUALITY_MIN} if target else None,
+        "max_width": LOW_MEMORY_MAX_WIDTH if memory_limit else None,
+    }
+
+
+def avif_enabled() -> bool:
+    return AVIF_ENABLED and AVIF_AVAILABLE
+
+
+def variant_path(dst: Path, width: int) -> Path:
+    """幅違いバリアントのパス（hero.webp -> hero-480w.webp）。"""
+    return dst.with_name(f"{dst.stem}-{width}w{dst.suffix}")
+
+
+def variant_widths(src: Path, width: int) -> list:
+    """書き出すバリアント幅の一覧（元画像以上の幅は拡大になるので作らない）。"""
+    if src.stem in VARIANT_EXCLUDE:
+        return []
+    return [w for w in sorted(VARIANT_WIDTHS) if w < width]
+
+
+def file_sha256(path: Path) -> str:
+    """ファイル内容の SHA-256 を返す。"""
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_manifest(images_dir: Path) -> dict:
+    """変換マニフェストを読み込む。存在しない・壊れている場合は空として扱う。"""
+    path = images_dir / MANIFEST_NAME
+    if not path.exists():
+        return {}
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        print(f"  [WARN] マニフェストを読み込めません（全画像を再変換します）: {e}")
+        return {}
+    return data.get("images", {}) if isinstance(data, dict) else {}
+
+
+def save_manifest(images_dir: Path, entries: dict) -> Path:
+    """変換マニフェストを書き出す（一時ファイル経由で置き換え、途中終了でも壊さない）。"""
+    path = images_dir / MANIFEST_NAME
+    tmp  = path.with_name(path.name + ".tmp")
+    data = {"version": 1, "images": dict(sorted(entries.items()))}
+    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+    return path
+
+
+def _stat_unchanged(src: Path, cached: dict) -> bool:
+    """サイズと更新時刻がマニフェストの記録どおりか（一致すればハッシュ計算を省略できる）。"""
+    if not cached:
+        return False
+    st = src.stat()
+    return cached.get("size") == st.st_size and cached.get("mtime_ns") == st.st_mtime_ns
+
+
+def _is_cache_hit(src: Path, dst: Path, cached: dict, params: dict) -> tuple:
+    """
+    マニフェストの記録と照合する。
+    戻り値: (一致フラグ, 元ファイルの SHA-256)
+    """
+    digest = cached["sha256"] if _stat_unchanged(src, cached) else file_sha256(src)
+
+    hit = (
+        bool(cached)
+        and cached.get("sha256") == digest
+        and cached.get("params") == params
+        and all(
+            path.exists() and path.stat().st_size == size
+            for path, size in _expected_outputs(dst, cached)
+        )
+    )
+    return hit, digest
+
+
+def _expected_outputs(dst: Path, entry: dict) -> list:
+    """マニフェストの記録から、ディスク上にあるはずの出力ファイルと サイズの一覧を作る。"""
+    outputs = [(dst, entry.get("output_size"))]
+    outputs += [(variant_path(dst, int(w)), size) for w, size in entry.get("variants", {}).items()]
+
+    avif = entry.get("avif")
+    if avif:
+        avif_dst = dst.with_suffix(".avif")
+        outputs.append((avif_dst, avif["output_size"]))
+        outputs += [(variant_path(avif_dst, int(w)), size) for w, size in avif["variants"].items()]
+    return outputs
+
+
+def _remove_avif(dst: Path) -> None:
+    """WebP を採用した画像について、以前の実行で書き出した AVIF を削除する。"""
+    avif_dst = dst.with_suffix(".avif")
+    for path in [avif_dst] + [variant_path(avif_dst, w) for w in VARIANT_WIDTHS]:
+        path.unlink(missing_ok=True)
+
+
+def _webp_options(quality: int) -> dict:
+    return {"format": "WEBP", "quality": quality, "method": WEBP_METHOD}
+
+
+def _avif_options(quality: int = AVIF_QUALITY) -> dict:
+    return {"format": "AVIF", "quality": quality, "speed": AVIF_SPEED}
+
+
+def _encode_webp(img: "Image.Image", quality: int) -> bytes:
+    buf = BytesIO()
+    img.save(buf, **_webp_options(quality))
+    return buf.getvalue()
+
+
+def _encode_avif(img: "Image.Image", quality: int = AVIF_QUALITY) -> bytes:
+    buf = BytesIO()
+    img.save(buf, **_avif_options(quality))
+    return buf.getvalue()
+
+
+def _tmp_path(path: Path) -> Path:
+    return path.with_name(f"{path.name}.{os.getpid()}.tmp")
+
+
+def _save_tmp(img: "Image.Image", path: Path, options: dict) -> Path:
+    """
+    path の隣の一時ファイルへ直接エンコードする（BytesIO を経由しないので出力のコピーがメモリに残らない）。
+    置き換え（os.replace）は呼び出し側で行う。
+    """
+    tmp = _tmp_path(path)
+    try:
+        img.save(tmp, **options)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return tmp
+
+
+def _save_atomic(img: "Image.Image", path: Path, options: dict) -> int:
+    """一時ファイルへエンコードしてから置き換え、書き出したバイト数を返す。"""
+    tmp = _save_tmp(img, path, options)
+    size = tmp.stat().st_size
+    os.replace(tmp, path)
+    return size
+
+
+def _write_atomic(path: Path, data: bytes) -> int:
+    tmp = _tmp_path(path)
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return len(data)
+
+
+# ============================================================
+# デコード・メモリ管理
+# ============================================================
+
+def peak_rss_mb():
+    """このプロセスのピークメモリ（RSS）[MB]。取得できない環境では None。"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux は KB、macOS はバイト単位
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def estimate_memory_mb(size: tuple) -> float:
+    """
+    変換中に画像データが使うメモリの見積もり[MB]。
+    デコード結果・モード変換や縮小のコピー・エンコーダの作業領域で、RGBA 画像およそ 3 枚分とみなす。
+    """
+    width, height = size
+    return width * height * 4 * 3 / (1024 * 1024)
+
+
+def _decode(source: "Image.Image", memory_limit: int = None) -> "Image.Image":
+    """
+    元画像をデコードし、エンコードに使うモード（RGBA / RGB）の画像を返す。
+    モードが最初から同じ（JPEG の RGB など）なら変換のコピーを作らず、変換した場合は元の画像をすぐ解放する。
+    memory_limit を指定すると省メモリ変換になる:
+      - LOW_MEMORY_MAX_WIDTH より大きい JPEG は縮小デコード（draft: 1/2・1/4・1/8）してから縮小する
+      - デコード前の見積もりが memory_limit[MB] を超える画像は MemoryError にする
+    """
+    # RGBA / P -> RGBA、それ以外 -> RGB（JPEG などアルファなし形式への対応）
+    mode = "RGBA" if source.mode in ("RGBA", "P") else "RGB"
+
+    max_size = None
+    if memory_limit:
+        width, height = source.size
+        if width > LOW_MEMORY_MAX_WIDTH:
+            max_size = (LOW_MEMORY_MAX_WIDTH, max(1, round(height * LOW_MEMORY_MAX_WIDTH / width)))
+            source.draft(mode if source.mode == mode else None, max_size)
+        estimated = estimate_memory_mb(source.size)
+        if estimated > memory_limit:
+            raise MemoryError(
+                f"メモリ上限 {memory_limit} MB を超えるため変換しません"
+                f"（{source.size[0]}x{source.size[1]} / 見積もり {estimated:.0f} MB）"
+            )
+
+    source.load()
+    img = source
+    if img.mode != mode:
+        img = source.convert(mode)
+        source.close()
+    if max_size and img.width > max_size[0]:
+        resized = img.resize(max_size, Image.LANCZOS)
+        img.close()
+        img = resized
+    return img
+
+
+# ============================================================
+# 品質の自動調整（SSIM）
+# ============================================================
+
+SSIM_WINDOW = 8                       # SSIM を計算するブロックの大きさ [px]
+SSIM_C1 = (0.01 * 255) ** 2
+SSIM_C2 = (0.03 * 255) ** 2
+
+
+def _luma(img: "Image.Image") -> "Image.Image":
+    """SSIM 用の輝度画像（32bit 浮動小数）。透過部分は白背景に合成して比べる。"""
+    if img.mode == "RGBA":
+        img = Image.alpha_composite(Image.new("RGBA", img.size, (255, 255, 255, 255)), img)
+    return img.convert("L").convert("F")
+
+
+class SsimReference:
+    """
+    元画像側の SSIM 計算結果（平均・二乗平均）を保持し、エンコード結果と繰り返し比べる。
+    SSIM は SSIM_WINDOW px 四方のブロックごとに求めて平均する（Pillow だけで計算できる範囲に留める）。
+    """
+
+    def __init__(self, img: "Image.Image"):
+        self.x   = _luma(img)
+        self.mu  = self.x.reduce(SSIM_WINDOW)
+        self.sq  = ImageMath.lambda_eval(lambda a: a["x"] * a["x"], x=self.x).reduce(SSIM_WINDOW)
+
+    def score(self, encoded: bytes) -> float:
+        """エンコード結果（WebP / AVIF のバイト列）をデコードして SSIM を返す。"""
+        with Image.open(BytesIO(encoded)) as decoded:
+            y = _luma(decoded.convert("RGBA" if decoded.mode in ("RGBA", "LA", "P") else "RGB"))
+        mu_y = y.reduce(SSIM_WINDOW)
+        sq_y = ImageMath.lambda_eval(lambda a: a["y"] * a["y"], y=y).reduce(SSIM_WINDOW)
+        xy   = ImageMath.lambda_eval(lambda a: a["x"] * a["y"], x=self.x, y=y).reduce(SSIM_WINDOW)
+        ssim_map = ImageMath.lambda_eval(
+            lambda a: (
+                (2 * a["mx"] * a["my"] + SSIM_C1) * (2 * (a["xy"] - a["mx"] * a["my"]) + SSIM_C2)
+            ) / (
+                (a["mx"] * a["mx"] + a["my"] * a["my"] + SSIM_C1)
+                * (a["xx"] - a["mx"] * a["mx"] + a["yy"] - a["my"] * a["my"] + SSIM_C2)
+            ),
+            mx=self.mu, my=mu_y, xx=self.sq, yy=sq_y, xy=xy,
+        )
+        # ImageStat は F 画像をヒストグラムで集計して値が丸まるので、1px への縮小で平均を取る
+        return ssim_map.resize((1, 1), Image.BOX).getpixel((0, 0))
+
+
+def search_quality(encode, reference: SsimReference, low: int, high: int, target: float) -> tuple:
+    """
+    SSIM が target 以上になる最小の品質を二分探索する（品質が上がるほど SSIM も上がる前提）。
+    上限 high でも届かない場合は high を採用する。
+    戻り値: (品質, エンコード結果, SSIM)
+    """
+    tried = {}
+
+    def attempt(q):
+        if q not in tried:
+            data = encode(q)
+            tried[q] = (data, reference.score(data))
+        return tried[q]
+
+    while low < high:
+        mid = (low + high) // 2
+        if attempt(mid)[1] >= target:
+            high = mid
+        else:
+            low = mid + 1
+    data, score = attempt(high)
+    return high, data, score
+
+
+def served_size(entry: dict) -> int:
+    """実際に配信される原寸ファイルのバイト数（AVIF 採用時は AVIF のサイズ）。"""
+    avif = entry.get("avif")
+    return avif["output_size"] if avif else entry["output_size"]
+
+
+def _convert_task(
+    src: Path, quality: int, cached: dict = None, data: bytes = None, target: float = None,
+    memory_limit: int = None,
+) -> tuple:
     """
-    dst = src.with_suffix(".webp")
+    1枚の画像を WebP に変換する（ワーカープロセスからも呼ばれる）。
+    デコードは 1 回だけ行い、同じ画像から幅違いバリアントも書き出す。
+    AVIF が有効なら原寸で AVIF も試し、WebP より小さければ AVIF 版（バリアント含む）も書き出す。
+    cached にマニフェストの記録を渡すと、内容と設定が一致する場合は再エンコードしない。
+    data に src の中身（生成直後のバイト列など）を渡すと、src を読み直さずにそこからデコードする。
+    target に SSIM の目標値を渡すと、WebP / AVIF それぞれ目標を満たす最小の品質（上限は quality /
+    AVIF_QUALITY）を探し、その品質でバリアントも書き出す。デコード済みの元画像は探索中も使い回す。
+    memory_limit に MB を渡すと省メモリ変換になる（_decode() を参照）。
+    出力は一時ファイルへ直接エンコードしてから置き換え、マニフェスト記録にはワーカーのピークメモリも残す。
+    例外は外へ出さず、エラーメッセージとして返す。
+    戻り値: (成功フラグ, 元ファイルサイズ[KB], 変換後サイズ[KB], エラーメッセージ or None,
+             キャッシュ一致フラグ, マニフェスト記録 or None)
+    変換後サイズは採用したフォーマット（AVIF / WebP の小さいほう）の原寸ファイルのサイズ。
+    """
+    dst    = src.with_suffix(".webp")
+    params = encoder_params(quality, target, memory_limit)
 
     try:
-        with Image.open(src) as img:
-            # RGBA / P -> RGB 変換（JPEG などアルファなし形式への対応）
-            if img.mode in ("RGBA", "P"):
-                img = img.convert("RGBA")
+        if data is not None:
+            hit, digest = False, hashlib.sha256(data).hexdigest()
+        else:
+            hit, digest = _is_cache_hit(src, dst, cached, params)
+        if hit:
+            # 内容は同じで更新時刻だけ変わった場合に備え、stat 情報を更新しておく
+            st = src.stat()
+            entry = {**cached, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+            return True, st.st_size // 1024, served_size(entry) // 1024, None, True, entry
+
+        variants = {}
+        avif = None
+        tuned = {}
+        avif_quality = AVIF_QUALITY
+        avif_dst = dst.with_suffix(".avif")
+        with Image.open(BytesIO(data) if data is not None else src) as source:
+            img = _decode(source, memory_limit)
+            data = None  # 元のバイト列はもう使わない
+
+            reference = SsimReference(img) if target else None
+            if reference:
+                quality, webp_bytes, score = search_quality(
+                    lambda q: _encode_webp(img, q), reference,
+                    min(AUTO_QUALITY_MIN["webp"], quality), quality, target,
+                )
+                tuned = {"quality": quality, "ssim": round(score, 5)}
+                webp_size = _write_atomic(dst, webp_bytes)
             else:
-                img = img.convert("RGB")
+                webp_size = _save_atomic(img, dst, _webp_options(quality))
 
-            buf = BytesIO()
-            img.save(buf, format="WEBP", quality=quality, method=6)
-            webp_bytes = buf.getvalue()
+            if avif_enabled():
+                if reference:
+                    avif_quality, avif_bytes, avif_score = search_quality(
+                        lambda q: _encode_avif(img, q), reference,
+                        min(AUTO_QUALITY_MIN["avif"], AVIF_QUALITY), AVIF_QUALITY, target,
+                    )
+                    if len(avif_bytes) < webp_size:
+                        avif = {"output_size": _write_atomic(avif_dst, avif_bytes), "variants": {}}
+                        avif.update(quality=avif_quality, ssim=round(avif_score, 5))
+                else:
+                    tmp = _save_tmp(img, avif_dst, _avif_options())
+                    avif_size = tmp.stat().st_size
+                    if avif_size < webp_size:
+                        os.replace(tmp, avif_dst)
+                        avif = {"output_size": avif_size, "variants": {}}
+                    else:
+                        tmp.unlink()
+            if avif is None:
+                _remove_avif(dst)
 
-        dst.write_bytes(webp_bytes)
+            for w in variant_widths(src, img.width):
+                h = max(1, round(img.height * w / img.width))
+                resized = img.resize((w, h), Image.LANCZOS)
+                variants[str(w)] = _save_atomic(resized, variant_path(dst, w), _webp_options(quality))
+                if avif is not None:
+                    avif["variants"][str(w)] = _save_atomic(
+                        resized, variant_path(avif_dst, w), _avif_options(avif_quality),
+                    )
+                resized.close()
+            width = img.width
+            img.close()
 
-        src_kb = src.stat().st_size // 1024
-        dst_kb = len(webp_bytes) // 1024
-        return True, src_kb, dst_kb
+        st = src.stat()
+        entry = {
+            "sha256":      digest,
+            "size":        st.st_size,
+            "mtime_ns":    st.st_mtime_ns,
+            "params":      params,
+            "output":      dst.name,
+            "output_size": webp_size,
+            "width":       width,
+            "variants":    variants,
+            "avif":        avif,
+            **tuned,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+        return True, st.st_size // 1024, served_size(entry) // 1024, None, False, entry
 
     except Exception as e:
-        print(f"    [NG] エラー: {e}")
-        return False, 0, 0
+        return False, 0, 0, str(e), False, None
+
+
+def convert_image(
+    src: Path, quality: int, manifest: dict = None, target: float = None, memory_limit: int = None,
+) -> tuple:
+    """
+    1枚の画像を WebP に変換する。
+    manifest（load_manifest() の戻り値）を渡すと、変更のない画像はスキップし、
+    変換結果をその dict に記録する。
+    戻り値: (成功フラグ, 元ファイルサイズ[KB], 変換後サイズ[KB])
+    """
+    cached = manifest.get(src.name) if manifest is not None else None
+    ok, src_kb, dst_kb, error, _, entry = _convert_task(src, quality, cached, None, target, memory_limit)
+    if error:
+        print(f"    [NG] エラー: {error}")
+    if manifest is not None and entry:
+        manifest[src.name] = entry
+    return ok, src_kb, dst_kb
+
+
+def convert_many(
+    targets: list,
+    quality: int,
+    workers: int = WORKERS,
+    cache: dict = None,
+    target: float = None,
+    memory_limit: int = None,
+) -> list:
+    """
+    複数の画像を並列に WebP 変換する（複数案件の画像が混在していてもよい）。
+    戻り値は targets と同じ順序の _convert_task() の戻り値のリスト。
+    cache に {元画像パス: マニフェストの記録} を渡すとキャッシュ一致の画像はスキップされる
+    （マニフェストの更新は呼び出し側で行う）。
+    target / memory_limit は _convert_task() と同じ（品質自動調整の SSIM 目標値 / 省メモリ変換の上限[MB]）。
+
+    ワーカープロセスが異常終了（デコーダのクラッシュ等）してプール全体が壊れた場合は、
+    巻き込まれた画像だけを 1 枚ずつ専用プロセスで再変換し、原因の画像のみを失敗扱いにする。
+    """
+    cache = cache or {}
+
+    if workers <= 1 or len(targets) <= 1:
+        return [_convert_task(src, quality, cache.get(src), None, target, memory_limit) for src in targets]
+
+    results: dict = {}
+    broken = []
+
+    # サイズ・更新時刻だけで一致が確定する画像はプロセスを起こさずその場で判定する
+    params = encoder_params(quality, target, memory_limit)
+    pending = []
+    for src in targets:
+        cached = cache.get(src)
+        if _stat_unchanged(src, cached) and _is_cache_hit(src, src.with_suffix(".webp"), cached, params)[0]:
+            results[src] = (True, cached["size"] // 1024, served_size(cached) // 1024, None, True, cached)
+        else:
+            pending.append(src)
+
+    if not pending:
+        return [results[src] for src in targets]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as pool:
+        futures = {
+            pool.submit(_convert_task, src, quality, cache.get(src), None, target, memory_limit): src
+            for src in pending
+        }
+        for future in as_completed(futures):
+            src = futures[future]
+            try:
+                results[src] = future.result()
+            except BrokenProcessPool:
+                broken.append(src)
+            except Exception as e:
+                results[src] = (False, 0, 0, str(e), False, None)
+
+    # 壊れたプールに巻き込まれた画像を 1 枚ずつ隔離して再実行
+    for src in sorted(broken):
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            try:
+                future = pool.submit(_convert_task, src, quality, cache.get(src), None, target, memory_limit)
+                results[src] = future.result()
+            except BrokenProcessPool:
+                results[src] = (False, 0, 0, "ワーカープロセスが異常終了しました", False, None)
+            except Exception as e:
+                results[src] = (False, 0, 0, str(e), False, None)
+
+    return [results[src] for src in targets]
 
 
 # ============================================================
 # HTML 置換処理
 # ============================================================
 
+IMG_TAG_RE  = re.compile(r"<img\b[^>]*>", re.IGNORECASE)
+ATTR_RE     = r'(\s+){name}\s*=\s*"([^"]*)"'
+IMAGE_EXTENSIONS = (".webp", ".avif", ".jpg", ".jpeg", ".png")
+GENERATED_ATTR   = "data-converted"   # このスクリプトが生成した <picture> / <source> の目印
+HINTS_ATTR       = "data-hints"       # build_hints.py が生成した LCP 画像の preload の目印
+VARIANT_SUFFIX_RE = re.compile(r"-\d+w$")
+
+
+def _get_attr(tag: str, name: str):
+    m = re.search(ATTR_RE.format(name=name), tag, re.IGNORECASE)
+    return m.group(2) if m else None
+
+
+def _set_attr(tag: str, name: str, value: str) -> str:
+    return re.sub(
+        ATTR_RE.format(name=name),
+        lambda m: f'{m.group(1)}{name}="{value}"',
+        tag, count=1, flags=re.IGNORECASE,
+    )
+
+
+def _remove_attr(tag: str, name: str) -> str:
+    return re.sub(ATTR_RE.format(name=name), "", tag, flags=re.IGNORECASE)
+
+
+def _split_image_url(src: str) -> tuple:
+    """
+    画像の URL を (拡張子なしの URL, 拡張子) に分ける。画像の拡張子でなければ (None, None)。
+    自サイトの画像かどうかは _local_path() で判定する。
+    """
+    if not src:
+        return None, None
+    for ext in IMAGE_EXTENSIONS:
+        if src.lower().endswith(ext):
+            return src[: -len(ext)], ext
+    return None, None
+
+
+def build_srcset(html_dir: Path, base: str, ext: str = ".webp", site_origins: set = frozenset()) -> str:
+    """
+    {base}{ext} に対応するバリアントがあれば srcset 文字列を返す（なければ None）。
+    幅はディスク上のファイルから判定するので、マニフェストがなくても動く。
+    base は HTML に書かれた URL のまま（ルート相対・自サイトの絶対 URL も可。site_origins は _local_path() と同じ）。
+    """
+    full = _local_path(html_dir, f"{base}{ext}", site_origins)
+    if full is None or not full.exists():
+        return None
+
+    candidates = [
+        (w, f"{base}-{w}w{ext}")
+        for w in sorted(VARIANT_WIDTHS)
+        if variant_path(full, w).exists()
+    ]
+    if not candidates:
+        return None
+
+    with Image.open(full) as img:
+        candidates.append((img.width, f"{base}{ext}"))
+    return ", ".join(f"{url} {w}w" for w, url in candidates)
+
+
+def build_sizes(src: str, width_attr: str) -> str:
+    """sizes 属性を決める（IMAGE_SIZES の指定 > width 属性から算出 > 100vw）。"""
+    stem = Path(src).stem
+    if stem in IMAGE_SIZES:
+        return IMAGE_SIZES[stem]
+    if width_attr and width_attr.isdigit():
+        return f"(max-width: {width_attr}px) 100vw, {width_attr}px"
+    return "100vw"
+
+
+def _with_srcset(img: str, srcset: str, sizes: str) -> str:
+    """src 属性の直後に srcset / sizes を入れる（改行区切りのタグは改行とインデントを揃える）。"""
+    img = _remove_attr(_remove_attr(img, "srcset"), "sizes")
+    if not srcset:
+        return img
+    src_m = re.search(ATTR_RE.format(name="src"), img, re.IGNORECASE)
+    sep = src_m.group(1)
+    return img[: src_m.end()] + f'{sep}srcset="{srcset}"{sep}sizes="{sizes}"' + img[src_m.end():]
+
+
+def _line_indent(html: str, pos: int) -> str:
+    """pos の行頭インデント（pos より前が空白だけの場合）。"""
+    line_start = html.rfind("\n", 0, pos) + 1
+    prefix = html[line_start:pos]
+    return prefix if not prefix.strip() else ""
+
+
+def _tag_name(tag: str) -> str:
+    """タグ名（小文字。閉じタグは "/picture" のように / 付き）"""
+    return tag[1:].split(None, 1)[0].rstrip("/>").lower()
+
+
+def _is_generated(tag: str) -> bool:
+    """このスクリプトが生成したタグか（data-converted 属性の有無）"""
+    return any(m.group(2).lower() == GENERATED_ATTR for m in TAG_ATTR_RE.finditer(tag))
+
+
+def _webp_img(html_dir: Path, img: str, site_origins: set) -> tuple:
+    """
+    <img> の src を WebP にし、WebP のバリアントの srcset / sizes を付ける。
+    戻り値: (更新後の <img>, 拡張子なしの URL, sizes, WebP のパス)。WebP がなければ None
+    """
+    base, _ = _split_image_url(_get_attr(img, "src"))
+    local = _local_path(html_dir, f"{base}.webp", site_origins) if base is not None else None
+    if local is None or not local.exists():
+        return None
+
+    sizes = build_sizes(f"{base}.webp", _get_attr(img, "width"))
+    webp_srcset = build_srcset(html_dir, base, ".webp", site_origins)
+    # <img> は WebP のバリアントから選ばせる（AVIF 非対応のブラウザに原寸の JPEG を送らない）
+    img = _with_srcset(_set_attr(img, "src", f"{base}.webp"), webp_srcset, sizes)
+    return img, base, sizes, local
+
+
+def _avif_source(html_dir: Path, base: str, sizes: str, local: Path, site_origins: set, marker: str = "") -> str:
+    """AVIF がある画像の <source type="image/avif">（なければ None）。marker は末尾に付ける属性。"""
+    if not local.with_suffix(".avif").exists():
+        return None
+    avif_srcset = build_srcset(html_dir, base, ".avif", site_origins) or f"{base}.avif"
+    return f'<source type="image/avif" srcset="{avif_srcset}" sizes="{sizes}"{marker}>'
+
+
+def rewrite_image_block(html_dir: Path, block: str, indent: str, site_origins: set = frozenset()) -> str:
+    """
+    <img>（または以前生成した <picture data-converted>）1つ分を、ディスク上の画像に合わせて作り直す。
+      - AVIF あり: <picture data-converted> に AVIF の <source> を置き、<img> は WebP（srcset / sizes 付き）
+      - AVIF なし: <img> に WebP の srcset / sizes を付与（生成した <picture> だったものは <img> に戻す）
+    画像の URL は _local_path() でファイルに対応付ける（ルート相対の /assets/... も対象）。
+    """
+    img_m = IMG_TAG_RE.search(block)
+    if not img_m:
+        return block
+    img = img_m.group(0)
+
+    # 改行区切りの <img> は、<picture> の内側かどうかに合わせて継続行のインデントを揃え直す
+    img_indent = _line_indent(block, img_m.start()) if img_m.start() else indent
+    img = img.replace("\n" + img_indent, "\n" + indent)
+
+    converted = _webp_img(html_dir, img, site_origins)
+    if converted is None:
+        return block
+    img, base, sizes, local = converted
+
+    source = _avif_source(html_dir, base, sizes, local, site_origins)
+    if source is None:
+        return img
+
+    inner = indent + "  "
+    img = img.replace("\n" + indent, "\n" + inner)
+    return "\n".join([f"<picture {GENERATED_ATTR}>", inner + source, inner + img, indent + "</picture>"])
+
+
+def _rewrite_authored_picture(html_dir: Path, block: str, site_origins: set) -> str:
+    """
+    手書きの <picture>（目印なし）は要素・属性・media 付きの <source> をそのまま残し、
+    中の <img> を WebP（srcset / sizes 付き）にして、AVIF があれば <img> の直前に
+    目印付きの AVIF の <source> を足す（前回足した分は作り直す。手書きの AVIF の <source> があれば足さない）。
+    """
+    out: list = []
+    pos = 0
+    avif_authored = False
+    for m in TOKEN_RE.finditer(block):
+        tag = m.group("tag")
+        if not tag:
+            continue
+        name = _tag_name(tag)
+        if name == "source" and _is_generated(tag):
+            start = block.rfind("\n", 0, m.start()) + 1
+            if block[start:m.start()].strip() or block[m.end():m.end() + 1] != "\n":
+                start = m.start()
+            out.append(block[pos:start])
+            pos = m.end() + (1 if start != m.start() else 0)
+        elif name == "source":
+            avif_authored |= (_get_attr(tag, "type") or "").lower() == "image/avif"
+        elif name == "img":
+            converted = _webp_img(html_dir, tag, site_origins)
+            if converted is None:
+                continue
+            img, base, sizes, local = converted
+            source = None if avif_authored else _avif_source(
+                html_dir, base, sizes, local, site_origins, f" {GENERATED_ATTR}")
+            indent = _line_indent(block, m.start())
+            out.append(block[pos:m.start()])
+            if source:
+                out.append(f"{source}\n{indent}" if indent else source)
+            out.append(img)
+            pos = m.end()
+    out.append(block[pos:])
+    return "".join(out)
+
+
+def add_srcset(html: str, html_dir: Path) -> tuple:
+    """
+    ページ内の全 <img> について srcset / sizes / <picture> を作り直す。
+    TOKEN_RE で走査するので、コメントや <script> の中の <img> の文字列には触れない。
+    このスクリプトが生成した <picture data-converted> は丸ごと作り直し、
+    手書きの <picture> は _rewrite_authored_picture() で URL の差し替えと AVIF の追加だけを行う。
+    戻り値: (更新後 HTML, 変更した <img> の数)
+    """
+    count = 0
+    site_origins = _site_origins(html)
+    out: list = []
+    pos = 0
+    picture = None   # 処理中の <picture> の (開始位置, 生成したものか)
+
+    for m in TOKEN_RE.finditer(html):
+        tag = m.group("tag")
+        if not tag:
+            continue
+        name = _tag_name(tag)
+        if name == "picture" and picture is None:
+            picture = (m.start(), _is_generated(tag))
+            continue
+        if name == "/picture" and picture is not None:
+            start, generated = picture
+            picture = None
+            block = html[start:m.end()]
+            if generated:
+                updated = rewrite_image_block(html_dir, block, _line_indent(html, start), site_origins)
+            else:
+                updated = _rewrite_authored_picture(html_dir, block, site_origins)
+        elif name == "img" and picture is None:
+            start, block = m.start(), tag
+            updated = rewrite_image_block(html_dir, block, _line_indent(html, start), site_origins)
+        else:
+            continue
+
+        out.append(html[pos:start])
+        out.append(updated)
+        pos = m.end()
+        if updated != block:
+            count += 1
+
+    out.append(html[pos:])
+    return "".join(out), count
+
+
+def find_images(html: str) -> list:
+    """
+    <img> を文書順に返す（DOM の document.querySelectorAll("img") と同じ順序・同じ数になる）。
+    戻り値: [{"start", "end", "tag", "attrs", "sources"(<picture> 内の <source> の属性一覧)}, ...]
+    """
+    images = []
+    sources = None
+    skip = 0   # <noscript> / <template> の中の <img> は DOM に入らない
+    for m in TOKEN_RE.finditer(html):
+        tag = m.group("tag")
+        if not tag:
+            continue
+        closing = tag.startswith("</")
+        name = _tag_name(tag).lstrip("/")
+        if name in ("noscript", "template"):
+            skip += -1 if closing else 1
+        if skip:
+            continue
+        attrs = {a.group(2).lower(): html_lib.unescape((a.group(4) or "").strip("\"'"))
+                 for a in TAG_ATTR_RE.finditer(tag)}
+        if name == "picture":
+            sources = None if closing else []
+        elif name == "source" and sources is not None:
+            sources.append(attrs)
+        elif name == "img":
+            images.append({"start": m.start(), "end": m.end(), "tag": tag, "attrs": attrs,
+                           "sources": list(sources or [])})
+    return images
+
+
+def preload_tag(image: dict) -> str:
+    """LCP 画像の <link rel="preload">（<picture> なら media のない先頭の <source> を type つきで先読みする）"""
+    attrs = image["attrs"]
+    source = next((s for s in image["sources"] if s.get("srcset") and not s.get("media")), None)
+    if source:
+        parts = [f'imagesrcset="{html_lib.escape(source["srcset"])}"']
+        if source.get("sizes"):
+            parts.append(f'imagesizes="{html_lib.escape(source["sizes"])}"')
+        if source.get("type"):
+            parts.append(f'type="{source["type"]}"')
+    else:
+        parts = [f'href="{html_lib.escape(attrs.get("src", ""))}"']
+        if attrs.get("srcset"):
+            parts.append(f'imagesrcset="{html_lib.escape(attrs["srcset"])}"')
+            if attrs.get("sizes"):
+                parts.append(f'imagesizes="{html_lib.escape(attrs["sizes"])}"')
+    return f'<link rel="preload" as="image" {" ".join(parts)} fetchpriority="high" {HINTS_ATTR}>'
+
+
+def _image_key(url: str) -> str:
+    """拡張子と幅の接尾辞（-480w）を除いた画像の URL（同じ画像の WebP / AVIF / バリアントは同じ値になる）"""
+    fields = url.split()
+    base, _ = _split_image_url(fields[0]) if fields else (None, None)
+    return VARIANT_SUFFIX_RE.sub("", base) if base is not None else None
+
+
+def _image_urls(attrs: dict) -> set:
+    """src / srcset / imagesrcset / href に書かれた画像の _image_key() の集合"""
+    urls = [attrs.get("src", ""), attrs.get("href", "")]
+    for name in ("srcset", "imagesrcset"):
+        urls += attrs.get(name, "").split(",")
+    return {key for key in map(_image_key, urls) if key}
+
+
+def refresh_hints_preload(html: str) -> tuple:
+    """
+    build_hints.py が生成した <link rel="preload" data-hints> を、書き換え後の <img> / <picture> に
+    合わせて preload_tag() で作り直す（AVIF の <source> や srcset を先読みし、同じ画像を二重に読ませない）。
+    先読みしていた画像がページから見つからなければ preload を外す（build_hints.py を再実行する）。
+    戻り値: (更新後 HTML, 作り直した preload / 外した場合は "" / data-hints の preload がなければ None)
+    """
+    head_end = html.lower().find("</head>")
+    for m in TOKEN_RE.finditer(html, 0, max(head_end, 0)):
+        tag = m.group("tag")
+        if not tag or _tag_name(tag) != "link" or not any(
+                a.group(2).lower() == HINTS_ATTR for a in TAG_ATTR_RE.finditer(tag)):
+            continue
+        attrs = {a.group(2).lower(): html_lib.unescape((a.group(4) or "").strip("\"'"))
+                 for a in TAG_ATTR_RE.finditer(tag)}
+        targets = _image_urls(attrs)
+        image = next((image for image in find_images(html)
+                      if any(targets & _image_urls(a) for a in [image["attrs"], *image["sources"]])), None)
+        if image is not None:
+            preload = preload_tag(image)
+            return html[:m.start()] + preload + html[m.end():], preload
+
+        # 行ごと外す（前後が空白だけの行なら改行とインデントも消す）
+        start, end = m.start(), m.end()
+        line_start = html.rfind("\n", 0, start) + 1
+        if not html[line_start:start].strip() and html[end:end + 1] == "\n":
+            start, end = line_start, end + 1
+        return html[:start] + html[end:], ""
+    return html, None
+
+
+# ── 参照書き換え（1パスのトークナイザ）───────────────────────
+# コメント / <script> / <style> / タグを順に拾い、その間のテキストはそのままコピーする。
+# 書き換え対象は属性値と CSS の url() だけなので、本文中の「.jpg」や外部サイトの URL には触れない。
+TOKEN_RE = re.compile(
+    r"""
+      (?P<comment><!--.*?-->)
+    | (?P<script><script\b(?:[^>"']|"[^"]*"|'[^']*')*>.*?</script\s*>)
+    | (?P<style_open><style\b(?:[^>"']|"[^"]*"|'[^']*')*>)(?P<style_body>.*?)(?P<style_close></style\s*>)
+    | (?P<tag></?[a-zA-Z][^\s/>]*(?:[^>"']|"[^"]*"|'[^']*')*>)
+    """,
+    re.IGNORECASE | re.DOTALL | re.VERBOSE,
+)
+TAG_ATTR_RE = re.compile(r"""(\s+)([^\s=>/"']+)(?:(\s*=\s*)("[^"]*"|'[^']*'|[^\s"'>]+))?""")
+CSS_URL_RE  = re.compile(r"""url\(\s*(['"]?)([^'")]*)\1\s*\)""", re.IGNORECASE)
+CANONICAL_RE = re.compile(
+    r"""<(?:link\b[^>]*\brel=["']canonical["'][^>]*\bhref|meta\b[^>]*\bproperty=["']og:url["'][^>]*\bcontent)=["']([^"']+)""",
+    re.IGNORECASE,
+)
+
+REWRITE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+IMAGE_META_KEYS    = {"og:image", "og:image:url", "og:image:secure_url", "twitter:image"}
+
+
+def _site_origins(html: str) -> set:
+    """canonical / og:url に書かれたオリジン（この URL で始まる絶対 URL は自サイトの画像として扱う）。"""
+    origins = set()
+    for url in CANONICAL_RE.findall(html):
+        parts = urlsplit(url)
+        origins.add(f"{parts.scheme}://{parts.netloc}".lower())
+    return origins
+
+
+def _local_path(html_dir: Path, url: str, site_origins: set):
+    """URL をプロジェクト内のファイルパスに変換する（自サイト以外の URL は None）。"""
+    parts = urlsplit(url)
+    if parts.scheme or parts.netloc:
+        if f"{parts.scheme}://{parts.netloc}".lower() not in site_origins:
+            return None
+        return html_dir / unquote(parts.path).lstrip("/")
+    if parts.path.startswith("/"):
+        return html_dir / unquote(parts.path).lstrip("/")
+    return html_dir / unquote(parts.path)
+
+
+def _rewrite_url(url: str, where: str, line: int, state: dict) -> str:
+    """
+    .jpg / .jpeg / .png の URL を、対応する .webp が実在する場合だけ .webp に差し替える。
+    クエリ・フラグメントは保持する。書き換えた場合は state["changes"] に記録する。
+    """
+    parts = urlsplit(url)
+    lower = parts.path.lower()
+    ext = next((e for e in REWRITE_EXTENSIONS if lower.endswith(e)), None)
+    if ext is None:
+        return url
+
+    local = _local_path(state["html_dir"], url, state["site_origins"])
+    if local is None:
+        return url
+    if not local.with_suffix(".webp").exists():
+        state["missing"].append(url)
+        return url
+
+    new_url = parts._replace(path=parts.path[: -len(ext)] + ".webp").geturl()
+    state["changes"].append((line, where, url, new_url))
+    return new_url
+
+
+def _rewrite_srcset(value: str, where: str, line: int, state: dict) -> str:
+    candidates = []
+    for candidate in value.split(","):
+        fields = candidate.strip().split(None, 1)
+        if not fields:
+            continue
+        fields[0] = _rewrite_url(fields[0], where, line, state)
+        candidates.append(" ".join(fields))
+    return ", ".join(candidates)
+
+
+def _rewrite_css(css: str, where: str, line: int, state: dict) -> str:
+    def _sub(m: re.Match) -> str:
+        quote, url = m.group(1), m.group(2)
+        url_line = line + css.count("\n", 0, m.start())
+        return f"url({quote}{_rewrite_url(url, where, url_line, state)}{quote})"
+    return CSS_URL_RE.sub(_sub, css)
+
+
+def _rewrite_tag(tag: str, line: int, in_picture: bool, state: dict) -> str:
+    """タグ 1 つの対象属性を書き換える（in_picture: 生成した <picture> の中か）。"""
+    if tag.startswith("</"):
+        return tag
+
+    name = _tag_name(tag)
+    attrs = {
+        m.group(2).lower(): (m.group(4) or "").strip("\"'")
+        for m in TAG_ATTR_RE.finditer(tag)
+    }
+
+    def _becomes_picture() -> bool:
+        # AVIF がある <img> は add_srcset() が <picture> に作り直すので、ここでは触らない
+        local = _local_path(state["html_dir"], attrs.get("src", ""), state["site_origins"])
+        return name == "img" and local is not None and local.with_suffix(".avif").exists()
+
+    def _targets(attr: str) -> bool:
+        if attr in ("src", "srcset"):
+            return not in_picture and not _becomes_picture()
+        if attr == "style":
+            return True
+        if attr == "href":
+            return name == "link" and "preload" in attrs.get("rel", "").lower().split()
+        if attr == "content":
+            key = attrs.get("property") or attrs.get("name") or ""
+            return name == "meta" and key.lower() in IMAGE_META_KEYS
+        return False
+
+    def _sub(m: re.Match) -> str:
+        attr, raw = m.group(2).lower(), m.group(4)
+        if raw is None or not _targets(attr):
+            return m.group(0)
+
+        quote = raw[0] if raw[0] in "\"'" else ""
+        value = raw[1:-1] if quote else raw
+        where = f"<{name} {attr}>"
+        attr_line = line + tag.count("\n", 0, m.start(4))
+        if attr == "srcset":
+            new = _rewrite_srcset(value, where, attr_line, state)
+        elif attr == "style":
+            new = _rewrite_css(value, where, attr_line, state)
+        else:
+            new = _rewrite_url(value, where, attr_line, state)
+
+        if new == value:
+            return m.group(0)
+        return f"{m.group(1)}{m.group(2)}{m.group(3)}{quote}{new}{quote}"
+
+    return TAG_ATTR_RE.sub(_sub, tag)
+
+
+def rewrite_references(html: str, html_dir: Path) -> tuple:
+    """
+    HTML 内の画像参照を 1 パスで .webp に書き換える。
+    対象: src / srcset / style 属性と <style> 内の url() /
+          <link rel="preload"> の href / og:image・twitter:image の content
+    生成した <picture data-converted> の中身（と <picture> 化される <img>）は add_srcset() が作り直すので触らない
+    （手書きの <picture> の <source> / <img> は通常どおり書き換える）。
+    戻り値: (更新後 HTML, 変更一覧 [(行番号, 箇所, 旧URL, 新URL)], .webp がなく書き換えなかった URL)
+    """
+    state = {
+        "html_dir":     html_dir,
+        "site_origins": _site_origins(html),
+        "changes":      [],
+        "missing":      [],
+    }
+    out: list = []
+    pos = 0
+    line = 1
+    pictures: list = []   # 開いている <picture> ごとに、このスクリプトが生成したものか
+
+    for m in TOKEN_RE.finditer(html):
+        out.append(html[pos:m.start()])
+        line += html.count("\n", pos, m.start())
+        pos = m.end()
+
+        if m.group("style_open"):
+            open_tag = m.group("style_open")
+            body_line = line + open_tag.count("\n")
+            body = _rewrite_css(m.group("style_body"), "<style>", body_line, state)
+            out.append(open_tag + body + m.group("style_close"))
+        elif m.group("tag"):
+            tag = m.group("tag")
+            out.append(_rewrite_tag(tag, line, bool(pictures) and pictures[-1], state))
+            name = _tag_name(tag)
+            if name == "picture":
+                pictures.append(_is_generated(tag))
+            elif name == "/picture" and pictures:
+                pictures.pop()
+        else:
+            out.append(m.group(0))
+
+        line += m.group(0).count("\n")
+
+    out.append(html[pos:])
+    return "".join(out), state["changes"], state["missing"]
+
+
 def update_html(html_path: Path) -> int:
     """
-    HTML 内の .jpg / .jpeg / .png を .webp に置換する。
-    戻り値: 置換件数
+    HTML 内の画像参照（.jpg / .jpeg / .png）を、.webp が実在するものだけ .webp に書き換え、
+    バリアントのある <img> に srcset / sizes を付与する（AVIF があれば <picture> 化）。
+    build_hints.py の preload（data-hints）は、書き換え後の LCP 画像に合わせて作り直す。
+    戻り値: 書き換えた参照の数 + 書き換えた <img> の数
     """
     if not html_path.exists():
         print(f"  HTML が見つかりません: {html_path}")
         return 0
 
     original = html_path.read_text(encoding="utf-8")
-    updated  = original
-
-    for ext in (".jpg", ".jpeg", ".png"):
-        updated = updated.replace(ext, ".webp")
+    updated, changes, missing = rewrite_references(original, html_path.parent)
+    updated, srcset_count = add_srcset(updated, html_path.parent)
+    updated, preload = refresh_hints_preload(updated)
 
-    count = updated.count(".webp") - original.count(".webp")
+    for line, where, old, new in changes:
+        print(f"    L{line:<5} {where:<22} {old} -> {new}")
+    for url in missing:
+        print(f"    [WARN] .webp がないため未変更: {url}")
+    if preload == "":
+        print("    [WARN] preload していた LCP 画像が見つからないため preload を外しました"
+              "（python build_hints.py で付け直してください）")
+    elif preload:
+        print(f"    preload: {preload}")
 
-    if count > 0:
+    if updated != original:
         # バックアップを作成してから書き込む
         backup = html_path.with_suffix(".html.bak")
         shutil.copy2(html_path, backup)
         html_path.write_text(updated, encoding="utf-8")
-        print(f"  [OK] {count} 箇所を置換しました（バックアップ: {backup.name}）")
+        print(f"  [OK] {len(changes)} 箇所を置換、{srcset_count} 件の <img> を srcset / <picture> 化しました"
+              f"（バックアップ: {backup.name}）")
     else:
         print("  変更なし（すでに .webp 参照済み、または画像参照なし）")
 
-    return count
+    return len(changes) + srcset_count
 
 
 # ============================================================
 # メイン
 # ============================================================
 
-def main():
-    if not IMAGES_DIR.exists():
-        print(f"エラー: 画像ディレクトリが見つかりません: {IMAGES_DIR}")
-        sys.exit(1)
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="画像一括 WebP 変換")
+    parser.add_argument(
+        "--workers", type=int, default=WORKERS,
+        help=f"並列変換のプロセス数（既定: {WORKERS} / 1 で逐次実行）",
+    )
+    parser.add_argument(
+        "--force", action="store_true",
+        help="変換マニフェストを無視して全画像を再変換する",
+    )
+    parser.add_argument(
+        "--all", action="store_true",
+        help=f"{OUTPUT_ROOT}/ 配下の全案件をまとめて変換する（PROJECT_NAME の設定は無視）",
+    )
+    parser.add_argument(
+        "--auto-quality", action="store_true", default=AUTO_QUALITY,
+        help="画像ごとに SSIM が目標値を下回らない最小の品質を探して変換する",
+    )
+    parser.add_argument(
+        "--target-ssim", type=float, default=TARGET_SSIM,
+        help=f"--auto-quality の SSIM 目標値（0~1。既定: {TARGET_SSIM}）",
+    )
+    parser.add_argument(
+        "--low-memory", action="store_true", default=LOW_MEMORY,
+        help=f"省メモリ変換（大きな JPEG は縮小デコードし、原寸ファイルも幅 {LOW_MEMORY_MAX_WIDTH}px までにする）",
+    )
+    parser.add_argument(
+        "--memory-limit", type=int, default=MEMORY_LIMIT_MB,
+        help=f"--low-memory で 1ワーカーが画像データに使ってよいメモリ[MB]（既定: {MEMORY_LIMIT_MB}）",
+    )
+    return parser.parse_args()
+
 
-    targets = sorted(
-        p for p in IMAGES_DIR.iterdir()
+def find_targets(images_dir: Path) -> list:
+    """変換対象（JPG/PNG）をファイル名順で返す。"""
+    return sorted(
+        p for p in images_dir.iterdir()
         if p.suffix.lower() in SOURCE_EXTENSIONS
     )
 
-    if not targets:
-        print("変換対象の画像が見つかりません（JPG/PNG）")
-        sys.exit(0)
 
-    total = len(targets)
+def find_projects(output_root: Path) -> list:
+    """output/{案件名}/assets/images を持つ案件の画像ディレクトリを案件名順で返す。"""
+    return sorted(p for p in output_root.glob("*/assets/images") if p.is_dir())
+
+
+def print_settings(
+    title: str, total: int, workers: int, force: bool, target: float = None, memory_limit: int = None,
+) -> None:
     print(f"\n{'='*50}")
-    print(f"  {PROJECT_NAME} - WebP 変換")
-    print(f"  品質:         {WEBP_QUALITY}")
+    print(f"  {title}")
+    if target:
+        print(f"  品質:         自動（SSIM {target} 以上で最小 / 上限 {WEBP_QUALITY}）")
+    else:
+        print(f"  品質:         {WEBP_QUALITY}")
+    if AVIF_ENABLED and not AVIF_AVAILABLE:
+        print("  AVIF:         無効（この Pillow は AVIF 非対応。pip install -U Pillow）")
+    else:
+        print(f"  AVIF:         {f'比較する（品質 {AVIF_QUALITY}）' if avif_enabled() else '使わない'}")
     print(f"  対象:         {total} 枚")
+    print(f"  バリアント:   {' / '.join(f'{w}w' for w in sorted(VARIANT_WIDTHS))}")
+    print(f"  並列数:       {min(workers, total)}")
+    if memory_limit:
+        print(f"  省メモリ:     有効（1ワーカー {memory_limit} MB まで / 最大幅 {LOW_MEMORY_MAX_WIDTH}px）")
+    print(f"  キャッシュ:   {'無視（全画像を再変換）' if force else '有効'}")
     print(f"  元ファイル削除: {'する' if DELETE_ORIGINALS else 'しない'}")
     print(f"{'='*50}\n")
 
-    results = {"success": [], "fail": []}
-    total_src_kb = 0
-    total_dst_kb = 0
 
-    for i, src in enumerate(targets, 1):
+def _max_peak(a, b):
+    """ピークメモリの最大値（取得できなかった値 None は無視する）。"""
+    return max((x for x in (a, b) if x is not None), default=None)
+
+
+def apply_results(
+    images_dir: Path, targets: list, converted: list, manifest: dict, partial: bool = False,
+) -> dict:
+    """
+    1案件分の変換結果を表示し、マニフェストを保存する（DELETE_ORIGINALS なら元画像も削除）。
+    partial は案件の一部の画像だけを変換したとき用（対象外の画像の記録も残す）。
+    戻り値: {"success": [...], "cached": [...], "fail": [...], "src_kb": int, "dst_kb": int,
+             "peak_rss_mb": 今回変換したワーカーのピークメモリの最大値[MB] or None}
+    """
+    results = {"success": [], "cached": [], "fail": [], "src_kb": 0, "dst_kb": 0, "peak_rss_mb": None}
+    total = len(targets)
+
+    # マニフェストは今回の対象画像の記録だけで作り直す（削除された画像の記録は残さない）。
+    # partial なら対象外の画像の記録も、元画像が残っている限り引き継ぐ
+    new_manifest = {}
+    if partial:
+        names = {src.name for src in targets}
+        new_manifest = {
+            name: entry for name, entry in manifest.items()
+            if name not in names and (images_dir / name).exists()
+        }
+
+    # 結果は並列数によらず常にファイル名順で表示する
+    for i, (src, result) in enumerate(zip(targets, converted), 1):
+        ok, src_kb, dst_kb, error, cached, entry = result
         print(f"[{i:02d}/{total}] {src.name}")
-        ok, src_kb, dst_kb = convert_image(src, WEBP_QUALITY)
 
         if ok:
             saved_kb = src_kb - dst_kb
             ratio    = (1 - dst_kb / src_kb) * 100 if src_kb else 0
-            print(f"    [OK] {src_kb} KB -> {dst_kb} KB  (-{saved_kb} KB / {ratio:.0f}% 削減)")
-            results["success"].append(src.name)
-            total_src_kb += src_kb
-            total_dst_kb += dst_kb
+            fmt = "AVIF" if entry.get("avif") else "WebP"
+            tuned = entry.get("avif") or entry
+            if "quality" in tuned:
+                fmt += f" q{tuned['quality']} SSIM {tuned['ssim']:.4f}"
+            if cached:
+                print(f"    [SKIP] 変更なし {src_kb} KB -> {dst_kb} KB {fmt}  (キャッシュ一致)")
+                results["cached"].append(src.name)
+            else:
+                print(f"    [OK] {src_kb} KB -> {dst_kb} KB {fmt}  (-{saved_kb} KB / {ratio:.0f}% 削減)")
+                results["success"].append(src.name)
+                results["peak_rss_mb"] = _max_peak(results["peak_rss_mb"], entry.get("peak_rss_mb"))
+            variants = (entry.get("avif") or entry).get("variants")
+            if variants:
+                sizes = " / ".join(f"{w}w {size // 1024} KB" for w, size in variants.items())
+                print(f"         バリアント: {sizes}")
+            new_manifest[src.name] = entry
+            results["src_kb"] += src_kb
+            results["dst_kb"] += dst_kb
 
             if DELETE_ORIGINALS:
                 src.unlink()
         else:
+            print(f"    [NG] エラー: {error}")
             results["fail"].append(src.name)
+            # 失敗した画像の古い記録は残しておく（次回の照合に使う）
+            if src.name in manifest:
+                new_manifest[src.name] = manifest[src.name]
+
+    save_manifest(images_dir, new_manifest)
+    return results
 
-    # HTML 置換
-    print("\n-- index.html 更新 --")
-    update_html(HTML_PATH)
 
-    # サマリー
+def print_summary(results: dict) -> None:
+    total_src_kb = results["src_kb"]
+    total_dst_kb = results["dst_kb"]
     saved_total = total_src_kb - total_dst_kb
     ratio_total = (1 - total_dst_kb / total_src_kb) * 100 if total_src_kb else 0
 
     print(f"\n{'='*50}")
     print(f"  完了")
     print(f"  成功: {len(results['success'])} 枚")
+    print(f"  スキップ: {len(results['cached'])} 枚（変更なし）")
     print(f"  失敗: {len(results['fail'])} 枚")
     print(f"  合計削減: {total_src_kb} KB -> {total_dst_kb} KB  (-{saved_total} KB / {ratio_total:.0f}%)")
+    if results.get("peak_rss_mb") is not None:
+        print(f"  ピークメモリ: {results['peak_rss_mb']} MB（変換ワーカーの最大）")
     print(f"{'='*50}\n")
 
     if results["fail"]:
@@ -188,5 +1348,106 @@ def main():
             print(f"    - {fn}")
 
 
+def run_project(workers: int, force: bool, target: float = None, memory_limit: int = None) -> None:
+    """設定欄の PROJECT_NAME 1案件を変換する。"""
+    if not IMAGES_DIR.exists():
+        print(f"エラー: 画像ディレクトリが見つかりません: {IMAGES_DIR}")
+        sys.exit(1)
+
+    targets = find_targets(IMAGES_DIR)
+
+    if not targets:
+        print("変換対象の画像が見つかりません（JPG/PNG）")
+        sys.exit(0)
+
+    print_settings(f"{PROJECT_NAME} - WebP 変換", len(targets), workers, force, target, memory_limit)
+
+    manifest = {} if force else load_manifest(IMAGES_DIR)
+    cache = {src: manifest.get(src.name) for src in targets}
+    converted = convert_many(targets, WEBP_QUALITY, workers, cache, target, memory_limit)
+    results = apply_results(IMAGES_DIR, targets, converted, manifest)
+
+    # HTML 置換
+    print("\n-- index.html 更新 --")
+    update_html(HTML_PATH)
+
+    print_summary(results)
+
+
+def run_all_projects(workers: int, force: bool, target: float = None, memory_limit: int = None) -> None:
+    """
+    output/ 配下の全案件を変換する。
+    全案件の画像を 1 回の convert_many() にまとめて渡し、プロセスプールを遊ばせない。
+    表示・マニフェスト保存・HTML 更新は案件ごとに行う。
+    """
+    projects = [
+        (images_dir, targets)
+        for images_dir in find_projects(OUTPUT_ROOT)
+        if (targets := find_targets(images_dir))
+    ]
+
+    if not projects:
+        print(f"変換対象の画像が見つかりません（{OUTPUT_ROOT}/*/assets/images）")
+        sys.exit(0)
+
+    all_targets = [src for _, targets in projects for src in targets]
+    print_settings(f"全案件 ({len(projects)} 件) - WebP 変換", len(all_targets), workers, force, target, memory_limit)
+
+    manifests = {
+        images_dir: ({} if force else load_manifest(images_dir))
+        for images_dir, _ in projects
+    }
+    cache = {
+        src: manifests[images_dir].get(src.name)
+        for images_dir, targets in projects
+        for src in targets
+    }
+    converted = dict(zip(all_targets, convert_many(all_targets, WEBP_QUALITY, workers, cache, target, memory_limit)))
+
+    summaries = []
+    for images_dir, targets in projects:
+        project_dir = images_dir.parent.parent
+        print(f"\n-- {project_dir.name} --")
+        results = apply_results(
+            images_dir, targets, [converted[src] for src in targets], manifests[images_dir],
+        )
+        print("  index.html 更新:")
+        update_html(project_dir / "index.html")
+        summaries.append((project_dir.name, results))
+
+    # 案件ごとのサマリー
+    print(f"\n{'='*50}")
+    print(f"  完了（案件別）")
+    for name, results in summaries:
+        src_kb, dst_kb = results["src_kb"], results["dst_kb"]
+        ratio = (1 - dst_kb / src_kb) * 100 if src_kb else 0
+        print(f"  {name}")
+        print(f"    成功 {len(results['success'])} / スキップ {len(results['cached'])} / "
+              f"失敗 {len(results['fail'])}   {src_kb} KB -> {dst_kb} KB ({ratio:.0f}% 削減)")
+        for fn in results["fail"]:
+            print(f"    - 失敗: {fn}")
+
+    total = {"success": [], "cached": [], "fail": [], "src_kb": 0, "dst_kb": 0, "peak_rss_mb": None}
+    for name, results in summaries:
+        for key in ("success", "cached", "fail"):
+            total[key] += [f"{name}/{fn}" for fn in results[key]]
+        total["src_kb"] += results["src_kb"]
+        total["dst_kb"] += results["dst_kb"]
+        total["peak_rss_mb"] = _max_peak(total["peak_rss_mb"], results["peak_rss_mb"])
+    print_summary(total)
+
+
+def main():
+    args = parse_args()
+    workers = max(1, args.workers)
+    target = args.target_ssim if args.auto_quality else None
+    memory_limit = max(1, args.memory_limit) if args.low_memory else None
+
+    if args.all:
+        run_all_projects(workers, args.force, target, memory_limit)
+    else:
+        run_project(workers, args.force, target, memory_limit)
+
+
 if __name__ == "__main__":
     main()
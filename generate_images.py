@@ -13,25 +13,59 @@ Gemini Imagen 3 API を使用して、Webサイトに必要な画像を一括生
   export GEMINI_API_KEY=your_api_key
   python generate_images.py
 
+  # 1リクエストで4候補を生成し、ローカルで採点して最良の1枚を採用
+  python generate_images.py --candidates 4
+
+  # 生成と並行して WebP / AVIF / 幅違いバリアントへ変換し、index.html も更新
+  python generate_images.py --convert
+
+  # API を呼ばずにスケジューラの動作確認（擬似クライアント・一時ディレクトリに出力）
+  python generate_images.py --fake --fake-latency 2.0 --fake-error-rate 0.3
+
 機能:
   - 既存の画像はスキップ（途中から再開可能）
+    ただしプロンプト等を変更した画像は作り直す（.generate-manifest.json で判定）
+  - 生成済み画像をプロンプト単位でグローバルキャッシュし、同じ指定なら API を呼ばない
+    （キャッシュから案件フォルダへハードリンク or コピー。容量上限を超えたら古い順に削除）
+  - 複数候補モード: number_of_images で K 枚を1回のリクエストで受け取り、
+    シャープネス・露出・アスペクト比・ファイルサイズで採点して最良の1枚を採用
+    （採用した1枚を候補数ごとにキャッシュに保存。採点には Pillow が必要。なければ先頭の候補を採用）
+  - 複数リクエストを並列実行（トークンバケットでレート制限を守る）
+  - レート制限エラーは指数バックオフ＋ジッターでリトライし、同時実行数を自動で絞る
   - 失敗時は自動リトライ（最大3回）
+  - --convert: 生成できた画像から順に convert_to_webp.py の変換処理へ直接渡す
+    （受け取ったバイト列をそのままデコードし、書き出した JPEG を読み直さない。
+     生成待ちの間も別プロセスで変換が進むので、合計時間は「生成」と「変換」の長いほう程度）
   - 生成結果を 画像プレースホルダー一覧.md に記録
 
 依存:
   pip install google-genai
+  pip install Pillow   # 任意（複数候補モードの採点・--convert に使用）
 """
 
+import argparse
+import hashlib
 import io
+import json
 import os
+import random
+import shutil
 import sys
+import tempfile
+import threading
 import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
+from types import SimpleNamespace
 
-# Windows ターミナルの文字化け対策
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
-sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8")
+# Windows ターミナルの文字化け対策（UTF-8 化済みなら二重に包まない）
+if sys.stdout.encoding.lower() != "utf-8":
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
+if sys.stderr.encoding.lower() != "utf-8":
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8")
 
 # ── 依存チェック ──────────────────────────────────────────────
 try:
@@ -42,6 +76,12 @@ except ImportError:
     print("実行してください: pip install google-genai")
     sys.exit(1)
 
+# Pillow は複数候補の採点（と擬似クライアントの画像生成）にだけ使う任意依存
+try:
+    from PIL import Image, ImageFilter, ImageStat
+except ImportError:
+    Image = None
+
 
 # ============================================================
 # 設定（案件ごとにここを変更する）
@@ -52,8 +92,25 @@ OUTPUT_DIR   = Path(f"output/{PROJECT_NAME}/assets/images")
 
 MODEL       = "imagen-4.0-generate-001"
 MAX_RETRIES = 3
-RETRY_WAIT  = 15   # リトライまでの待機秒数
-API_WAIT    = 3    # 連続生成時のインターバル（レート制限対策）
+
+CONCURRENCY     = 4     # 同時に投げるリクエスト数の上限（レート制限エラーが出ると自動で下がる）
+REQUESTS_PER_MIN = 20   # トークンバケットの補充レート（API のクォータに合わせる）
+BURST           = 2     # トークンバケットの容量（一度に連続で投げてよい数）
+RETRY_BASE_WAIT = 2     # リトライ待機の基準秒数（試行ごとに倍、ジッター付き）
+RETRY_MAX_WAIT  = 60    # リトライ待機の上限秒数
+
+SAFETY_FILTER_LEVEL = "block_low_and_above"
+
+# 生成画像キャッシュ（全案件共通。同じモデル・プロンプト・設定なら API を呼ばずに再利用）
+CACHE_DIR    = Path(os.environ.get("IMAGE_CACHE_DIR", Path.home() / ".cache" / "claude-code-website" / "images"))
+CACHE_MAX_MB = 2048  # キャッシュの容量上限（超えたら最終利用が古い順に削除）
+CACHE_INDEX  = "index.json"  # キャッシュ直下の索引（キーごとのサイズと最終利用時刻）
+
+# 案件フォルダ内の生成記録（ファイル名 -> キャッシュキー。プロンプト変更の検知に使う）
+GENERATED_LOG = ".generate-manifest.json"
+
+CANDIDATES     = 1      # 1リクエストあたりの候補数（1~4。2以上で採点して最良の1枚を採用）
+SIZE_BUDGET_KB = 2048   # 採点用: この容量に近いほど「ファイルサイズ」の点が下がる
 
 
 # ============================================================
@@ -337,6 +394,426 @@ IMAGES = [
 ]
 
 
+# ============================================================
+# レート制御
+# ============================================================
+
+class TokenBucket:
+    """
+    リクエスト間隔を平準化するトークンバケット（スレッドセーフ）。
+    pause() で全スレッドの送信を一定時間止められる（レート制限エラーを受けたとき用）。
+    """
+
+    def __init__(self, rate_per_sec: float, capacity: int):
+        self.rate = rate_per_sec
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+
+
+class AdaptiveConcurrency:
+    """
+    同時実行数を観測したエラー率に合わせて調整する（AIMD）。
+    レート制限エラーで上限を半分にし、連続成功が続くと 1 ずつ戻す。
+    """
+
+    def __init__(self, maximum: int, recover_after: int = 3):
+        self.maximum = maximum
+        self.limit = maximum
+        self.recover_after = recover_after
+        self.active = 0
+        self.streak = 0
+        self.cond = threading.Condition()
+
+    @contextmanager
+    def slot(self):
+        with self.cond:
+            while self.active >= self.limit:
+                self.cond.wait()
+            self.active += 1
+        try:
+            yield
+        finally:
+            with self.cond:
+                self.active -= 1
+                self.cond.notify_all()
+
+    def on_success(self) -> None:
+        with self.cond:
+            self.streak += 1
+            if self.streak >= self.recover_after and self.limit < self.maximum:
+                self.limit += 1
+                self.streak = 0
+                self.cond.notify_all()
+
+    def on_rate_limit(self) -> None:
+        with self.cond:
+            self.limit = max(1, self.limit // 2)
+            self.streak = 0
+
+
+def is_rate_limit_error(e: Exception) -> bool:
+    """429 / RESOURCE_EXHAUSTED をレート制限エラーとみなす。"""
+    return getattr(e, "code", None) == 429 or "429" in str(e) or "RESOURCE_EXHAUSTED" in str(e)
+
+
+def backoff_wait(attempt: int) -> float:
+    """指数バックオフ（試行ごとに倍）に ±50% のジッターを加えた待機秒数。"""
+    base = min(RETRY_MAX_WAIT, RETRY_BASE_WAIT * 2 ** (attempt - 1))
+    return base * random.uniform(0.5, 1.5)
+
+
+# ============================================================
+# 擬似クライアント（--fake。API を呼ばずにスケジューラを検証する）
+# ============================================================
+
+class FakeRateLimitError(Exception):
+    code = 429
+
+
+class FakeClient:
+    """
+    client.models.generate_images() と同じ形で応答する擬似クライアント。
+    latency 秒（±50%）待ってから、error_rate の確率でレート制限エラーを返す。
+    """
+
+    def __init__(self, latency: float = 1.0, error_rate: float = 0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.calls = 0
+        self.lock = threading.Lock()
+        self.models = self
+
+    def generate_images(self, model: str, prompt: str, config=None):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.latency * random.uniform(0.5, 1.5))
+        if random.random() < self.error_rate:
+            raise FakeRateLimitError("429 RESOURCE_EXHAUSTED (fake)")
+        count = getattr(config, "number_of_images", None) or 1
+        aspect_ratio = getattr(config, "aspect_ratio", None) or "4:3"
+        images = [
+            SimpleNamespace(image=SimpleNamespace(image_bytes=_fake_image_bytes(prompt, aspect_ratio)))
+            for _ in range(count)
+        ]
+        return SimpleNamespace(generated_images=images)
+
+
+def _fake_image_bytes(prompt: str, aspect_ratio: str) -> bytes:
+    """擬似画像。Pillow があれば指定アスペクト比のノイズ入り JPEG、なければテキスト。"""
+    if Image is None:
+        return f"fake image: {prompt[:40]}".encode("utf-8")
+    w, h = (int(x) for x in aspect_ratio.split(":"))
+    size = (64 * w, 64 * h) if max(w, h) <= 4 else (32 * w, 32 * h)
+    noise = Image.effect_noise(size, random.uniform(5, 80)).convert("RGB")
+    base = Image.new("RGB", size, tuple(random.randint(40, 220) for _ in range(3)))
+    buf = io.BytesIO()
+    Image.blend(base, noise, 0.5).save(buf, format="JPEG", quality=85)
+    return buf.getvalue()
+
+
+# ============================================================
+# 生成画像キャッシュ
+# ============================================================
+
+def request_params(image_spec: dict) -> dict:
+    """API に送る内容のうち、生成結果を左右するもの（キャッシュキーの元）。"""
+    return {
+        "model":               MODEL,
+        "prompt":              image_spec["prompt"],
+        "aspect_ratio":        image_spec.get("aspect_ratio", "4:3"),
+        "safety_filter_level": SAFETY_FILTER_LEVEL,
+        "negative_prompt":     image_spec.get("negative_prompt"),
+    }
+
+
+def cache_key(image_spec: dict, candidates: int = 1) -> str:
+    """
+    キャッシュキー。複数候補モードは採点で選んだ1枚を保存するので、候補数もキーに含める
+    （1枚モードのキーは候補数なしのまま。生成記録のプロンプト変更の判定にもこちらを使う）。
+    """
+    params = request_params(image_spec)
+    if candidates > 1:
+        params["number_of_images"] = candidates
+    payload = json.dumps(params, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ImageCache:
+    """
+    キャッシュキー（sha256）-> 画像バイト列のディスクキャッシュ。
+    サイズと最終利用時刻は索引（CACHE_INDEX）に記録し、容量超過時は古い順に削除する（LRU）。
+    キャッシュファイルは案件フォルダへハードリンクされるので、ファイル自体の更新時刻は変えない
+    （変えると案件側の画像の更新時刻も変わり、ETag や変換の鮮度判定がずれる）。
+    """
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = self._load_index()  # {キー: {"size": バイト数, "used": 最終利用時刻}}
+        self.total = sum(e["size"] for e in self.entries.values())
+
+    def path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.img"
+
+    def _load_index(self) -> dict:
+        """索引を読む。ない・壊れている場合はキャッシュフォルダを 1 回走査して作り直す。"""
+        try:
+            data = json.loads((self.root / CACHE_INDEX).read_text(encoding="utf-8"))
+            return {key: {"size": int(e["size"]), "used": float(e["used"])} for key, e in data.items()}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            pass
+        entries = {}
+        for p in self.root.glob("*/*.img"):
+            st = p.stat()
+            entries[p.stem] = {"size": st.st_size, "used": st.st_mtime}
+        return entries
+
+    def _save_index(self) -> None:
+        """索引を書き出す（lock を取った状態で呼ぶ。一時ファイル経由で置き換える）。"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self.root / CACHE_INDEX
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(json.dumps(self.entries, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def get(self, key: str):
+        """ヒットすればキャッシュファイルのパスを返す（索引の最終利用時刻も更新）。"""
+        path = self.path(key)
+        with self.lock:
+            if not path.exists():
+                if self.entries.pop(key, None) is not None:
+                    self.total = sum(e["size"] for e in self.entries.values())
+                    self._save_index()
+                return None
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = self.entries[key] = {"size": path.stat().st_size}
+                self.total += entry["size"]
+            entry["used"] = time.time()
+            self._save_index()
+        return path
+
+    def put(self, key: str, data: bytes) -> Path:
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        with self.lock:
+            old = self.entries.get(key)
+            self.total += len(data) - (old["size"] if old else 0)
+            self.entries[key] = {"size": len(data), "used": time.time()}
+        self.evict()
+        return path
+
+    def evict(self) -> list:
+        """容量上限を超えていれば最終利用が古いものから削除する。戻り値: 削除したパス"""
+        with self.lock:
+            removed = []
+            if self.total > self.max_bytes:
+                for key, entry in sorted(self.entries.items(), key=lambda kv: kv[1]["used"]):
+                    if self.total <= self.max_bytes:
+                        break
+                    path = self.path(key)
+                    path.unlink(missing_ok=True)
+                    del self.entries[key]
+                    self.total -= entry["size"]
+                    removed.append(path)
+            self._save_index()
+            return removed
+
+
+def place_from_cache(cached: Path, output_path: Path) -> None:
+    """キャッシュファイルを案件フォルダに置く（同一ドライブならハードリンク、無理ならコピー）。"""
+    output_path.unlink(missing_ok=True)
+    try:
+        os.link(cached, output_path)
+    except OSError:
+        shutil.copy2(cached, output_path)
+
+
+def load_generated_log(output_dir: Path) -> dict:
+    path = output_dir / GENERATED_LOG
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_generated_log(output_dir: Path, log: dict) -> None:
+    path = output_dir / GENERATED_LOG
+    path.write_text(json.dumps(dict(sorted(log.items())), ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+# ============================================================
+# 候補の採点（複数候補モード）
+# ============================================================
+# 各採点関数は (画像, バイト列, 画像定義) を受け取り 0.0~1.0 を返す。
+# SCORERS に (名前, 重み, 関数) を追加・差し替えすれば採点基準を変えられる。
+
+def score_sharpness(img, data: bytes, image_spec: dict) -> float:
+    """エッジの強さ（ピンぼけほど低い）。"""
+    gray = img.convert("L")
+    gray.thumbnail((512, 512))
+    edges = gray.filter(ImageFilter.FIND_EDGES)
+    return min(1.0, ImageStat.Stat(edges).stddev[0] / 40)
+
+
+def score_exposure(img, data: bytes, image_spec: dict) -> float:
+    """明るさが中間に近く、白飛び・黒つぶれが少ないほど高い。"""
+    gray = img.convert("L")
+    hist = gray.histogram()
+    total = sum(hist) or 1
+    clipped = (sum(hist[:5]) + sum(hist[-5:])) / total
+    mean = ImageStat.Stat(gray).mean[0]
+    return max(0.0, 1 - abs(mean - 128) / 128 - clipped * 2)
+
+
+def score_aspect(img, data: bytes, image_spec: dict) -> float:
+    """指定したアスペクト比にどれだけ近いか。"""
+    w, h = (int(x) for x in image_spec.get("aspect_ratio", "4:3").split(":"))
+    ratio = (img.width / img.height) / (w / h)
+    return max(0.0, 1 - abs(ratio - 1) * 5)
+
+
+def score_file_size(img, data: bytes, image_spec: dict) -> float:
+    """ファイルが小さいほど高い（Web 配信の重さ）。"""
+    return max(0.0, 1 - len(data) / (SIZE_BUDGET_KB * 1024))
+
+
+SCORERS = [
+    ("sharpness", 0.4, score_sharpness),
+    ("exposure",  0.3, score_exposure),
+    ("aspect",    0.2, score_aspect),
+    ("file_size", 0.1, score_file_size),
+]
+
+
+def score_candidate(data: bytes, image_spec: dict) -> tuple:
+    """
+    候補1枚を採点する。
+    戻り値: (総合点, {採点名: 点}) ※デコードできない画像は (-1.0, {})
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img.load()
+            breakdown = {name: fn(img, data, image_spec) for name, _, fn in SCORERS}
+    except Exception:
+        return -1.0, {}
+    total_weight = sum(weight for _, weight, _ in SCORERS) or 1
+    total = sum(weight * breakdown[name] for name, weight, _ in SCORERS) / total_weight
+    return total, breakdown
+
+
+def select_candidate(candidates: list, image_spec: dict) -> tuple:
+    """
+    候補の中から最良の1枚を選ぶ（Pillow がなければ先頭）。
+    戻り値: (採用した候補の番号, [(総合点, 内訳), ...])
+    """
+    if len(candidates) == 1 or Image is None:
+        return 0, []
+    scores = [score_candidate(data, image_spec) for data in candidates]
+    best = max(range(len(candidates)), key=lambda i: scores[i][0])
+    return best, scores
+
+
+# ============================================================
+# 生成と並行した WebP 変換（--convert）
+# ============================================================
+
+class ConvertPipeline:
+    """
+    生成できた画像を順に convert_to_webp.py の変換処理（別プロセス）へ渡す。
+    生成スレッドから submit() を呼べば、他の画像の生成を待たずに変換が始まる。
+    受け取ったバイト列をそのまま渡すので、書き出した JPEG を読み直してデコードし直すことはない。
+    """
+
+    def __init__(self, images_dir: Path, workers: int = None):
+        import convert_to_webp  # Pillow が必要なので --convert のときだけ読み込む
+
+        self.cw = convert_to_webp
+        self.images_dir = images_dir
+        self.quality = convert_to_webp.WEBP_QUALITY
+        # 品質自動調整・省メモリ変換は convert_to_webp.py の設定欄に従う（単独で実行したときと同じ結果にする）
+        self.target = convert_to_webp.TARGET_SSIM if convert_to_webp.AUTO_QUALITY else None
+        self.memory_limit = convert_to_webp.MEMORY_LIMIT_MB if convert_to_webp.LOW_MEMORY else None
+        self.manifest = convert_to_webp.load_manifest(images_dir)
+        self.pool = ProcessPoolExecutor(max_workers=workers or convert_to_webp.WORKERS)
+        self.futures: dict = {}
+        self.lock = threading.Lock()
+
+    def submit(self, path: Path, data: bytes = None) -> None:
+        """path の変換を予約する。data（生成直後の中身）がなければ path から読む。"""
+        if path.suffix.lower() not in self.cw.SOURCE_EXTENSIONS:
+            return
+        cached = self.manifest.get(path.name) if data is None else None
+        with self.lock:
+            try:
+                self.futures[path] = self.pool.submit(
+                    self.cw._convert_task, path, self.quality, cached, data, self.target, self.memory_limit,
+                )
+            except BrokenProcessPool:
+                self.futures[path] = None  # finish() で 1 枚ずつやり直す
+
+    def finish(self, update_html: bool = True) -> dict:
+        """
+        全ての変換を待ち、結果表示・マニフェスト保存（・index.html 更新）を行う。
+        戻り値: convert_to_webp.apply_results() と同じ dict
+        """
+        targets = sorted(self.futures)
+        converted = {}
+        retry = []
+        for path in targets:
+            future = self.futures[path]
+            try:
+                converted[path] = future.result() if future else None
+            except BrokenProcessPool:
+                converted[path] = None
+            except Exception as e:
+                converted[path] = (False, 0, 0, str(e), False, None)
+            if converted[path] is None:
+                retry.append(path)
+        self.pool.shutdown()
+
+        # プロセスが異常終了した画像は convert_many() でファイルから変換し直す（原因の画像だけ失敗になる）
+        if retry:
+            cache = {path: self.manifest.get(path.name) for path in retry}
+            converted.update(zip(retry, self.cw.convert_many(
+                retry, self.quality, 1, cache, self.target, self.memory_limit,
+            )))
+
+        # 今回生成しなかった画像の記録も残す（消すと次回の convert_to_webp.py で全て再変換になる）
+        results = self.cw.apply_results(
+            self.images_dir, targets, [converted[path] for path in targets], self.manifest, partial=True,
+        )
+        html_path = self.images_dir.parent.parent / "index.html"
+        if update_html and html_path.exists():
+            print("\n-- index.html 更新 --")
+            self.cw.update_html(html_path)
+        return results
+
+
 # ============================================================
 # 生成処理
 # ============================================================
@@ -345,44 +822,170 @@ def generate_image(
     client: "genai.Client",
     image_spec: dict,
     output_path: Path,
+    bucket: TokenBucket = None,
+    limiter: AdaptiveConcurrency = None,
+    cache: ImageCache = None,
+    candidates: int = CANDIDATES,
+    converter: ConvertPipeline = None,
 ) -> bool:
-    """1枚の画像を生成して保存する。成功したら True を返す。"""
+    """
+    1枚の画像を生成して保存する。成功したら True を返す。
+    bucket / limiter を渡すと、並列実行時のレート制御に従う。
+    cache を渡すと、生成した画像をキャッシュに入れてから案件フォルダに配置する。
+    candidates が 2 以上なら 1 回のリクエストで複数候補を受け取り、採点して最良の1枚を採用する。
+    converter を渡すと、保存と同時に受け取ったバイト列を WebP 変換へ回す。
+    """
+    name = image_spec["filename"]
+
     for attempt in range(1, MAX_RETRIES + 1):
         try:
-            print(f"    生成中 (試行 {attempt}/{MAX_RETRIES})...", end=" ", flush=True)
-
-            response = client.models.generate_images(
-                model=MODEL,
-                prompt=image_spec["prompt"],
-                config=types.GenerateImagesConfig(
-                    number_of_images=1,
-                    aspect_ratio=image_spec.get("aspect_ratio", "4:3"),
-                    safety_filter_level="block_low_and_above",
-                ),
-            )
+            with (limiter.slot() if limiter else _no_limit()):
+                # 同時実行枠を確保してからトークンを取る（枠待ちの間にトークンを浪費しない）
+                if bucket:
+                    bucket.acquire()
+                params = request_params(image_spec)
+                response = client.models.generate_images(
+                    model=params["model"],
+                    prompt=params["prompt"],
+                    config=types.GenerateImagesConfig(
+                        number_of_images=candidates,
+                        aspect_ratio=params["aspect_ratio"],
+                        safety_filter_level=params["safety_filter_level"],
+                        negative_prompt=params["negative_prompt"],
+                    ),
+                )
 
             if not response.generated_images:
                 raise ValueError("画像が返されませんでした（空レスポンス）")
 
-            image_bytes = response.generated_images[0].image.image_bytes
-            output_path.write_bytes(image_bytes)
+            if limiter:
+                limiter.on_success()
+
+            # 採点と保存はレート制御の枠の外で行う（API を待たせない）
+            blobs = [g.image.image_bytes for g in response.generated_images]
+            best, scores = select_candidate(blobs, image_spec)
+            image_bytes = blobs[best]
+
+            if cache:
+                place_from_cache(cache.put(cache_key(image_spec, candidates), image_bytes), output_path)
+            else:
+                output_path.write_bytes(image_bytes)
+            if converter:
+                converter.submit(output_path, image_bytes)
 
             size_kb = len(image_bytes) // 1024
-            print(f"✅  {size_kb} KB")
+            print(f"    {name}: ✅  {size_kb} KB (試行 {attempt}/{MAX_RETRIES})")
+            for i, (total, breakdown) in enumerate(scores):
+                mark = "★" if i == best else " "
+                detail = " ".join(f"{k}={v:.2f}" for k, v in breakdown.items()) or "デコード不可"
+                print(f"      {mark} 候補{i + 1}: {total:.3f}  ({detail})")
             return True
 
         except Exception as e:
-            print(f"❌  {e}")
+            rate_limited = is_rate_limit_error(e)
+            print(f"    {name}: ❌  {e} (試行 {attempt}/{MAX_RETRIES})")
             if attempt < MAX_RETRIES:
-                print(f"    {RETRY_WAIT}秒後にリトライします...")
-                time.sleep(RETRY_WAIT)
+                wait = backoff_wait(attempt)
+                if rate_limited:
+                    # レート制限は全体の問題なので、全スレッドの送信を止めて同時実行数も絞る
+                    if limiter:
+                        limiter.on_rate_limit()
+                    if bucket:
+                        bucket.pause(wait)
+                    print(f"    {name}: レート制限のため {wait:.1f}秒後にリトライします...")
+                else:
+                    print(f"    {name}: {wait:.1f}秒後にリトライします...")
+                time.sleep(wait)
 
     return False
 
 
-def write_manifest(results: dict) -> Path:
+@contextmanager
+def _no_limit():
+    yield
+
+
+def generate_all(
+    client,
+    specs: list,
+    output_dir: Path,
+    concurrency: int = CONCURRENCY,
+    requests_per_min: float = REQUESTS_PER_MIN,
+    cache: ImageCache = None,
+    candidates: int = CANDIDATES,
+    converter: ConvertPipeline = None,
+) -> dict:
+    """
+    specs の画像を並列に生成する。
+    既存ファイルはスキップするが、前回の生成記録とキャッシュキーが違う（プロンプト等を
+    変更した）画像は作り直す。キャッシュにある画像は API を呼ばずに配置する。
+    converter を渡すと、スキップ・キャッシュ配置した画像はすぐに、生成した画像はでき次第
+    WebP 変換へ回す（結果の取りまとめは呼び出し側で converter.finish() を呼ぶ）。
+    戻り値: {"success": [...], "cached": [...], "skip": [...], "fail": [...]}（各リストは IMAGES の順）
+    """
+    results: dict[str, list[str]] = {"success": [], "cached": [], "skip": [], "fail": []}
+    bucket  = TokenBucket(requests_per_min / 60, BURST)
+    limiter = AdaptiveConcurrency(concurrency)
+    log     = load_generated_log(output_dir)
+
+    todo = []
+    total = len(specs)
+    for i, img in enumerate(specs, 1):
+        fn = img["filename"]
+        output_path = output_dir / fn
+        key = cache_key(img)
+        hit = cache.get(cache_key(img, candidates)) if cache else None
+
+        # 既存ファイルはスキップ（再開対応）。記録のない既存ファイルも従来どおり残す
+        if output_path.exists() and log.get(fn, key) == key:
+            print(f"[{i:02d}/{total}] {fn}  ⏭️  スキップ（既存: {output_path.stat().st_size // 1024} KB）")
+            results["skip"].append(fn)
+            if converter:
+                converter.submit(output_path)
+        elif hit:
+            place_from_cache(hit, output_path)
+            log[fn] = key
+            print(f"[{i:02d}/{total}] {fn}  ♻️  キャッシュから配置（{hit.stat().st_size // 1024} KB）")
+            results["cached"].append(fn)
+            if converter:
+                converter.submit(output_path)
+        else:
+            reason = "プロンプト変更のため再生成" if output_path.exists() else "生成待ち"
+            print(f"[{i:02d}/{total}] {fn}  {reason}")
+            todo.append((img, output_path))
+
+    outcome: dict[str, bool] = {}
+    # スレッド数は上限まで用意し、実際の同時実行数は limiter が絞る
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {
+            pool.submit(
+                generate_image, client, img, path, bucket, limiter, cache, candidates, converter,
+            ): img["filename"]
+            for img, path in todo
+        }
+        for future, fn in futures.items():
+            try:
+                outcome[fn] = future.result()
+            except Exception as e:
+                print(f"    {fn}: ❌  {e}")
+                outcome[fn] = False
+
+    for img, _ in todo:
+        fn = img["filename"]
+        (results["success"] if outcome[fn] else results["fail"]).append(fn)
+        if outcome[fn]:
+            log[fn] = cache_key(img)
+
+    save_generated_log(output_dir, log)
+
+    if limiter.limit < concurrency:
+        print(f"\n  ℹ️  レート制限により同時実行数を {concurrency} → {limiter.limit} に下げました")
+    return results
+
+
+def write_manifest(results: dict, output_dir: Path = OUTPUT_DIR) -> Path:
     """生成結果の一覧 Markdown を書き出す。"""
-    manifest_path = OUTPUT_DIR / "画像プレースホルダー一覧.md"
+    manifest_path = output_dir / "画像プレースホルダー一覧.md"
     with manifest_path.open("w", encoding="utf-8") as f:
         f.write(f"# {PROJECT_NAME} — 画像一覧\n\n")
         f.write(f"生成日: {datetime.now().strftime('%Y-%m-%d %H:%M')}\n\n")
@@ -393,6 +996,8 @@ def write_manifest(results: dict) -> Path:
             ar = img.get("aspect_ratio", "4:3")
             if fn in results["success"]:
                 status = "✅ 生成済み"
+            elif fn in results.get("cached", []):
+                status = "♻️ キャッシュから配置"
             elif fn in results["skip"]:
                 status = "⏭️  既存スキップ"
             else:
@@ -401,61 +1006,120 @@ def write_manifest(results: dict) -> Path:
     return manifest_path
 
 
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Webサイト用画像一括生成")
+    parser.add_argument(
+        "--concurrency", type=int, default=CONCURRENCY,
+        help=f"同時リクエスト数の上限（既定: {CONCURRENCY}）",
+    )
+    parser.add_argument(
+        "--rpm", type=float, default=REQUESTS_PER_MIN,
+        help=f"1分あたりのリクエスト数の上限（既定: {REQUESTS_PER_MIN}）",
+    )
+    parser.add_argument(
+        "--candidates", type=int, default=CANDIDATES, choices=range(1, 5), metavar="K",
+        help=f"1リクエストで生成する候補数 1~4（既定: {CANDIDATES}。2以上で採点して最良を採用）",
+    )
+    parser.add_argument(
+        "--convert", action="store_true",
+        help="生成と並行して WebP / AVIF / バリアントに変換し、index.html も更新する（Pillow が必要）",
+    )
+    parser.add_argument(
+        "--convert-workers", type=int, default=None,
+        help="--convert の変換プロセス数（既定: CPU コア数）",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="生成画像キャッシュを使わない（必ず API を呼ぶ）",
+    )
+    parser.add_argument(
+        "--fake", action="store_true",
+        help="API を呼ばず擬似クライアントで動作確認する（出力・キャッシュは一時ディレクトリ）",
+    )
+    parser.add_argument("--fake-latency", type=float, default=1.0, help="擬似クライアントの応答秒数")
+    parser.add_argument("--fake-error-rate", type=float, default=0.0, help="擬似クライアントのレート制限エラー率")
+    return parser.parse_args()
+
+
 def main():
-    # ── API キー確認 ────────────────────────────────────────
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if not api_key:
-        print("\nエラー: GEMINI_API_KEY が設定されていません")
-        print("  Windows: set GEMINI_API_KEY=your_key")
-        print("  Mac/Linux: export GEMINI_API_KEY=your_key\n")
-        sys.exit(1)
+    args = parse_args()
+
+    if args.fake:
+        client = FakeClient(args.fake_latency, args.fake_error_rate)
+        fake_root = Path(tempfile.mkdtemp(prefix="generate_images_fake_"))
+        output_dir = fake_root / "images"
+        cache_dir = fake_root / "cache"
+    else:
+        # ── API キー確認 ────────────────────────────────────
+        api_key = os.environ.get("GEMINI_API_KEY")
+        if not api_key:
+            print("\nエラー: GEMINI_API_KEY が設定されていません")
+            print("  Windows: set GEMINI_API_KEY=your_key")
+            print("  Mac/Linux: export GEMINI_API_KEY=your_key\n")
+            sys.exit(1)
+        client = genai.Client(api_key=api_key)
+        output_dir = OUTPUT_DIR
+        cache_dir = CACHE_DIR
+
+    cache = None if args.no_cache else ImageCache(cache_dir, CACHE_MAX_MB * 1024 * 1024)
 
     # ── 準備 ────────────────────────────────────────────────
-    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-    client = genai.Client(api_key=api_key)
+    output_dir.mkdir(parents=True, exist_ok=True)
 
     total = len(IMAGES)
     print(f"\n{'='*50}")
-    print(f"  {PROJECT_NAME} — 画像生成")
+    print(f"  {PROJECT_NAME} — 画像生成{'（擬似クライアント）' if args.fake else ''}")
     print(f"  モデル: {MODEL}")
     print(f"  合計:   {total} 枚")
-    print(f"  出力先: {OUTPUT_DIR.resolve()}")
+    print(f"  並列:   最大 {args.concurrency} / {args.rpm:g} 件/分")
+    print(f"  出力先: {output_dir.resolve()}")
+    print(f"  キャッシュ: {cache.root if cache else '使わない'}")
+    if args.convert:
+        print(f"  変換:   生成と並行して WebP / AVIF（convert_to_webp.py の設定）")
+    if args.candidates > 1:
+        scoring = "採点して最良を採用" if Image is not None else "Pillow がないため先頭を採用"
+        print(f"  候補数: {args.candidates} 枚/リクエスト（{scoring}）")
     print(f"{'='*50}\n")
 
-    # ── 生成ループ ──────────────────────────────────────────
-    results: dict[str, list[str]] = {"success": [], "skip": [], "fail": []}
-
-    for i, img in enumerate(IMAGES, 1):
-        output_path = OUTPUT_DIR / img["filename"]
-        print(f"[{i:02d}/{total}] {img['filename']}")
-
-        # 既存ファイルはスキップ（再開対応）
-        if output_path.exists():
-            print(f"    ⏭️  スキップ（既存: {output_path.stat().st_size // 1024} KB）")
-            results["skip"].append(img["filename"])
-        else:
-            ok = generate_image(client, img, output_path)
-            (results["success"] if ok else results["fail"]).append(img["filename"])
+    converter = None
+    if args.convert:
+        if Image is None:
+            print("エラー: --convert には Pillow が必要です（pip install Pillow）")
+            sys.exit(1)
+        converter = ConvertPipeline(output_dir, args.convert_workers)
 
-        # インターバル（最後の1枚以外）
-        if i < total:
-            time.sleep(API_WAIT)
+    # ── 生成 ────────────────────────────────────────────────
+    started = time.monotonic()
+    results = generate_all(
+        client, IMAGES, output_dir, args.concurrency, args.rpm, cache, args.candidates, converter,
+    )
+    if converter:
+        print(f"\n-- WebP 変換（生成完了: 開始から {time.monotonic() - started:.1f}秒） --")
+        converted = converter.finish()
+    elapsed = time.monotonic() - started
 
     # ── サマリー ────────────────────────────────────────────
     print(f"\n{'='*50}")
-    print(f"  完了")
+    print(f"  完了（{elapsed:.1f}秒）")
     print(f"  ✅ 成功:      {len(results['success'])} 枚")
+    print(f"  ♻️  キャッシュ: {len(results['cached'])} 枚")
     print(f"  ⏭️  スキップ:  {len(results['skip'])} 枚")
     print(f"  ❌ 失敗:      {len(results['fail'])} 枚")
+    if converter:
+        print(f"  🖼️  変換:      成功 {len(converted['success'])} / 変更なし {len(converted['cached'])} / "
+              f"失敗 {len(converted['fail'])}  {converted['src_kb']} KB -> {converted['dst_kb']} KB")
 
     if results["fail"]:
         print(f"\n  失敗ファイル（再実行すれば再試行されます）:")
         for fn in results["fail"]:
             print(f"    - {fn}")
 
-    manifest = write_manifest(results)
+    manifest = write_manifest(results, output_dir)
     print(f"\n  📄 一覧: {manifest}")
-    print(f"  🌐 確認: http://localhost/claude-code-website/output/{PROJECT_NAME}/")
+    if args.fake:
+        print(f"  🧪 API 呼び出し回数（擬似）: {client.calls}")
+    else:
+        print(f"  🌐 確認: http://localhost/claude-code-website/output/{PROJECT_NAME}/")
     print(f"{'='*50}\n")
 
 
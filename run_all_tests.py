@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+run_all_tests.py - output/ 配下の全案件にブラウザテストを並列実行するスクリプト
+
+テンプレート変更後などに、全案件をまとめて検証するときに使う。
+Apache / XAMPP は不要（output/ を内蔵のローカルサーバーで配信する）。
+
+使い方:
+  python run_all_tests.py
+  python run_all_tests.py --workers 8                  # 同時に動かす pytest プロセス数
+  python run_all_tests.py --tests tests/test_basics.py  # 対象テストを変更
+  python run_all_tests.py --report all_sites.html       # レポートの出力先
+
+機能:
+  - output/*/index.html を持つ案件を自動検出
+  - 内蔵の静的ファイルサーバーで output/ を配信（案件ごとに TEST_BASE_URL を切り替え）
+  - 案件 × シャード（テストの分割）を複数の pytest プロセスに割り振って並列実行
+    （案件数が並列数より少なければ、1案件のテストを複数プロセスに分割する）
+  - 各プロセスの JUnit XML を集約し、案件ごとのセクションを持つ 1 つの HTML レポートを出力
+
+依存:
+  pip install -r requirements_test.txt
+  playwright install chromium
+"""
+
+import argparse
+import html
+import io
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import quote
+
+# Windows ターミナルの文字化け対策
+if sys.stdout.encoding.lower() != "utf-8":
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
+if sys.stderr.encoding.lower() != "utf-8":
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding="utf-8")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent / "tests"))
+from static_server import StaticServer  # noqa: E402
+
+
+# ============================================================
+# 設定
+# ============================================================
+
+OUTPUT_ROOT = Path("output")                # 案件を探すディレクトリ（{案件名}/index.html）
+TESTS       = ["tests/test_generic.py"]     # 全案件共通で実行するテスト（サイト固有のテストは含めない）
+REPORT_PATH = Path("test_report_all.html")
+WORKERS     = os.cpu_count() or 1           # 同時に動かす pytest プロセス数
+
+
+# ============================================================
+# 案件・テストの検出
+# ============================================================
+
+def find_sites(output_root: Path) -> list:
+    """index.html を持つ案件ディレクトリの一覧（名前順）"""
+    return sorted(p.parent for p in output_root.glob("*/index.html"))
+
+
+def collect_tests(tests: list) -> list:
+    """pytest --collect-only でテストのノード ID 一覧を取る（シャード分割用）"""
+    proc = subprocess.run(
+        [sys.executable, "-m", "pytest", "--collect-only", "-q", "-p", "no:cacheprovider", *tests],
+        capture_output=True, text=True, encoding="utf-8",
+    )
+    node_ids = [line.strip() for line in proc.stdout.splitlines() if "::" in line]
+    if not node_ids:
+        print("エラー: テストを収集できませんでした")
+        print(proc.stdout[-2000:] + proc.stderr[-2000:])
+        sys.exit(1)
+    return node_ids
+
+
+def make_jobs(sites: list, node_ids: list, workers: int) -> list:
+    """
+    (案件, シャード番号, シャード数, ノード ID 一覧) のジョブ一覧を作る。
+    案件数が並列数より少ないときは、各案件のテストを複数シャードに分けてプロセスを遊ばせない。
+    """
+    shards = max(1, min(len(node_ids), math.ceil(workers / len(sites))))
+    return [
+        (site, i, shards, node_ids[i::shards])
+        for site in sites
+        for i in range(shards)
+    ]
+
+
+# ============================================================
+# 実行
+# ============================================================
+
+def run_job(job: tuple, base_url: str, junit_dir: Path) -> dict:
+    """1ジョブ分の pytest を子プロセスで実行し、JUnit XML を読んだ結果を返す。"""
+    site, shard, shards, node_ids = job
+    junit_path = junit_dir / f"{site.name}-{shard}.xml"
+    env = {**os.environ, "TEST_BASE_URL": base_url}
+
+    started = time.monotonic()
+    proc = subprocess.run(
+        [
+            sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider",
+            f"--junitxml={junit_path}", *node_ids,
+        ],
+        env=env, capture_output=True, text=True, encoding="utf-8",
+    )
+    elapsed = time.monotonic() - started
+
+    cases = parse_junit(junit_path) if junit_path.exists() else []
+    if not cases:
+        # 収集エラーなどで XML が出なかった場合は、出力をそのまま失敗として記録する
+        cases = [{
+            "name": f"shard {shard + 1}/{shards}", "status": "error", "time": elapsed,
+            "message": (proc.stdout + proc.stderr)[-4000:],
+        }]
+    return {"site": site, "shard": shard, "shards": shards, "cases": cases, "time": elapsed}
+
+
+def parse_junit(path: Path) -> list:
+    """JUnit XML からテストケースの一覧を取り出す。"""
+    cases = []
+    for case in ET.parse(path).getroot().iter("testcase"):
+        status, message = "passed", ""
+        for tag in ("failure", "error", "skipped"):
+            el = case.find(tag)
+            if el is not None:
+                status = "failed" if tag == "failure" else tag
+                message = (el.get("message") or "") + "\n" + (el.text or "")
+                break
+        cases.append({
+            "name": case.get("name"),
+            "status": status,
+            "time": float(case.get("time") or 0),
+            "message": message.strip(),
+        })
+    return cases
+
+
+def count_status(cases: list) -> dict:
+    counts = {"passed": 0, "failed": 0, "error": 0, "skipped": 0}
+    for case in cases:
+        counts[case["status"]] += 1
+    return counts
+
+
+# ============================================================
+# レポート
+# ============================================================
+
+REPORT_STYLE = """
+body { font-family: sans-serif; margin: 2em; color: #222; }
+table { border-collapse: collapse; margin: 1em 0; }
+th, td { border: 1px solid #ccc; padding: 4px 10px; text-align: left; vertical-align: top; }
+.passed { color: #1a7f37; } .failed, .error { color: #cf222e; } .skipped { color: #9a6700; }
+pre { white-space: pre-wrap; margin: 0; font-size: 12px; max-width: 80em; }
+"""
+
+
+def write_report(path: Path, sites: dict, elapsed: float) -> Path:
+    """案件ごとのセクションを持つ HTML レポートを書き出す。"""
+    e = html.escape
+    out = [
+        "<!DOCTYPE html>", '<html lang="ja"><head><meta charset="utf-8">',
+        "<title>全案件テストレポート</title>", f"<style>{REPORT_STYLE}</style></head><body>",
+        "<h1>全案件テストレポート</h1>",
+        f"<p>実行日: {datetime.now().strftime('%Y-%m-%d %H:%M')} / 所要時間: {elapsed:.1f}秒</p>",
+        "<table><tr><th>案件</th><th>成功</th><th>失敗</th><th>エラー</th><th>スキップ</th></tr>",
+    ]
+    for name, cases in sites.items():
+        c = count_status(cases)
+        out.append(
+            f'<tr><td><a href="#{e(name)}">{e(name)}</a></td><td class="passed">{c["passed"]}</td>'
+            f'<td class="failed">{c["failed"]}</td><td class="error">{c["error"]}</td>'
+            f'<td class="skipped">{c["skipped"]}</td></tr>'
+        )
+    out.append("</table>")
+
+    for name, cases in sites.items():
+        out.append(f'<h2 id="{e(name)}">{e(name)}</h2>')
+        out.append("<table><tr><th>テスト</th><th>結果</th><th>秒</th><th>詳細</th></tr>")
+        for case in sorted(cases, key=lambda c: c["name"]):
+            detail = f"<pre>{e(case['message'])}</pre>" if case["message"] else ""
+            out.append(
+                f'<tr><td>{e(case["name"])}</td><td class="{case["status"]}">{case["status"]}</td>'
+                f'<td>{case["time"]:.2f}</td><td>{detail}</td></tr>'
+            )
+        out.append("</table>")
+    out.append("</body></html>")
+
+    path.write_text("\n".join(out), encoding="utf-8")
+    return path
+
+
+# ============================================================
+# メイン処理
+# ============================================================
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="output/ 配下の全案件にブラウザテストを並列実行")
+    parser.add_argument(
+        "--workers", type=int, default=WORKERS,
+        help=f"同時に動かす pytest プロセス数（既定: CPU コア数 = {WORKERS}）",
+    )
+    parser.add_argument(
+        "--tests", nargs="+", default=TESTS,
+        help=f"実行するテストファイル（既定: {' '.join(TESTS)}）",
+    )
+    parser.add_argument(
+        "--report", type=Path, default=REPORT_PATH,
+        help=f"HTML レポートの出力先（既定: {REPORT_PATH}）",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    sites = find_sites(OUTPUT_ROOT)
+    if not sites:
+        print(f"テスト対象の案件が見つかりません（{OUTPUT_ROOT}/*/index.html）")
+        sys.exit(0)
+
+    node_ids = collect_tests(args.tests)
+    jobs = make_jobs(sites, node_ids, max(1, args.workers))
+
+    print(f"\n{'='*50}")
+    print(f"  全案件テスト")
+    print(f"  案件:   {len(sites)} 件")
+    print(f"  テスト: {len(node_ids)} 件 × {len(sites)} 案件（{jobs[0][2]} シャード/案件）")
+    print(f"  並列:   {args.workers} プロセス")
+    print(f"{'='*50}\n")
+
+    results = {site.name: [] for site in sites}
+    started = time.monotonic()
+    with StaticServer(OUTPUT_ROOT) as server, tempfile.TemporaryDirectory() as junit_dir:
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+            futures = [
+                pool.submit(run_job, job, f"{server.url}{quote(job[0].name)}/", Path(junit_dir))
+                for job in jobs
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                name = result["site"].name
+                results[name] += result["cases"]
+                c = count_status(result["cases"])
+                mark = "✅" if c["failed"] + c["error"] == 0 else "❌"
+                print(f"  {mark} {name} [{result['shard'] + 1}/{result['shards']}] "
+                      f"成功 {c['passed']} / 失敗 {c['failed'] + c['error']} / "
+                      f"スキップ {c['skipped']}  ({result['time']:.1f}秒)")
+    elapsed = time.monotonic() - started
+
+    report = write_report(args.report, results, elapsed)
+
+    total = count_status([case for cases in results.values() for case in cases])
+    failed_sites = [name for name, cases in results.items()
+                    if any(c["status"] in ("failed", "error") for c in cases)]
+
+    print(f"\n{'='*50}")
+    print(f"  完了（{elapsed:.1f}秒）")
+    print(f"  成功: {total['passed']} / 失敗: {total['failed'] + total['error']} / スキップ: {total['skipped']}")
+    for name in failed_sites:
+        print(f"    - 失敗あり: {name}")
+    print(f"  📄 レポート: {report.resolve()}")
+    print(f"{'='*50}\n")
+
+    sys.exit(1 if failed_sites else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,8 +6,12 @@ echo  対象: THE-CORNER-CAFE_v3
 echo ========================================
 echo.
 
-REM 別のサイトをテストする場合:
+REM 別のサイトをテストする場合（output/ を内蔵サーバーで配信するので Apache 不要）:
+REM set TEST_PROJECT=MY-SITE
+REM 既存のサーバーに対してテストする場合:
 REM set TEST_BASE_URL=http://localhost/claude-code-website/output/MY-SITE/
+REM output/ 配下の全案件をまとめてテストする場合（Apache 不要）:
+REM python run_all_tests.py
 
 python -m pytest tests/ ^
   --html=test_report.html ^
@@ -0,0 +1,177 @@
+"""
+アセット監査ユーティリティ
+
+ページが参照するリソース（img / srcset / link / script / og:image / CSS の url()）を
+1回の evaluate でまとめて集め、上限つきの並列 HTTP リクエストで一括確認する。
+要素ごとに get_attribute() → page.request.get() を繰り返すより往復がずっと少ない。
+
+    refs = collect_assets(page)
+    results = audit_assets(refs)
+    for r in results:
+        print(r.url, r.status, r.content_type, r.bytes, r.cache_control)
+
+HTTP は標準ライブラリで送る（Playwright の同期 API はスレッドから呼べないため）。
+HAR 再生中（replay に HarReplay を渡す）はネットワークに出ず、記録された応答で確認する
+（記録の本文は展開済みなので bytes は展開後のサイズになる）。
+"""
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
+AUDIT_WORKERS = 8    # 同時に送るリクエスト数の上限
+AUDIT_TIMEOUT = 15   # 1リクエストのタイムアウト[秒]
+
+# 参照を集めるスクリプト。URL は全てブラウザで絶対 URL に解決する。
+# 本番ドメインの絶対 URL（og:image など。canonical / og:url で判定）はテスト中のサイトの URL に読み替える
+COLLECT_ASSETS_JS = """
+() => {
+    const refs = [];
+    const siteBase = new URL(".", location.href).href;
+    const canonicals = Array.from(
+        document.querySelectorAll('link[rel="canonical"][href], meta[property="og:url"][content]')
+    ).map(el => {
+        try { return new URL(el.getAttribute("href") || el.getAttribute("content")); } catch (e) { return null; }
+    }).filter(Boolean);
+    const localize = (href) => {
+        const u = new URL(href);
+        for (const c of canonicals) {
+            const prefix = c.pathname.replace(/[^/]*$/, "");
+            if (u.origin === c.origin && u.pathname.startsWith(prefix)) {
+                return new URL(u.pathname.slice(prefix.length) + u.search, siteBase).href;
+            }
+        }
+        return u.href;
+    };
+    const add = (url, kind, source) => {
+        if (!url || url.startsWith("data:") || url.startsWith("blob:")) return;
+        try { refs.push({ url: localize(new URL(url, document.baseURI).href), kind, source }); } catch (e) {}
+    };
+    const addCss = (css, base, source) => {
+        for (const m of css.matchAll(/url\\(\\s*(['"]?)([^'")]*)\\1\\s*\\)/g)) {
+            try { add(new URL(m[2], base).href, "css-url", source); } catch (e) {}
+        }
+    };
+    const srcset = (value) => (value || "").split(",").map(c => c.trim().split(/\\s+/)[0]).filter(Boolean);
+
+    document.querySelectorAll("img").forEach(img => {
+        add(img.getAttribute("src"), "image", "img[src]");
+        srcset(img.getAttribute("srcset")).forEach(u => add(u, "image", "img[srcset]"));
+    });
+    document.querySelectorAll("picture source[srcset]").forEach(s => {
+        srcset(s.getAttribute("srcset")).forEach(u => add(u, "image", "source[srcset]"));
+    });
+    document.querySelectorAll("link[href]").forEach(l => {
+        const rel = (l.getAttribute("rel") || "").toLowerCase();
+        if (rel.includes("preconnect") || rel.includes("dns-prefetch") || rel.includes("canonical")
+            || rel.includes("alternate")) return;
+        const kind = rel.includes("stylesheet") ? "stylesheet"
+            : rel.includes("icon") ? "icon"
+            : rel.includes("preload") ? "preload" : "link";
+        add(l.getAttribute("href"), kind, `link[rel=${rel}]`);
+    });
+    document.querySelectorAll("script[src]").forEach(s => add(s.getAttribute("src"), "script", "script[src]"));
+    document.querySelectorAll(
+        'meta[property="og:image"], meta[property="og:image:secure_url"], meta[name="twitter:image"]'
+    ).forEach(m => add(m.getAttribute("content"), "og-image", `meta[${m.getAttribute("property") || m.getAttribute("name")}]`));
+
+    document.querySelectorAll("[style]").forEach(el => addCss(el.getAttribute("style"), document.baseURI, "style属性"));
+    document.querySelectorAll("style").forEach(el => addCss(el.textContent, document.baseURI, "<style>"));
+    for (const sheet of document.styleSheets) {
+        let rules;
+        try { rules = sheet.cssRules; } catch (e) { continue; }  // 別オリジンの CSS は読めない
+        const base = sheet.href || document.baseURI;
+        for (const rule of rules) addCss(rule.cssText, base, sheet.href || "<style>");
+    }
+    return refs;
+}
+"""
+
+
+@dataclass
+class AssetResult:
+    """1つの URL の確認結果（同じ URL を参照する箇所は sources にまとめる）"""
+    url: str
+    kinds: set = field(default_factory=set)
+    sources: set = field(default_factory=set)
+    status: int = 0
+    content_type: str = ""
+    bytes: int = 0
+    content_encoding: Optional[str] = None
+    cache_control: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == 200
+
+
+def collect_assets(page) -> list:
+    """ページが参照するリソースを1回の evaluate で集める [{"url", "kind", "source"}, ...]"""
+    return page.evaluate(COLLECT_ASSETS_JS)
+
+
+def fetch_asset(result: AssetResult) -> AssetResult:
+    """GET して状態・種類・サイズ（圧縮後）・キャッシュ関連ヘッダーを記録する"""
+    req = urllib.request.Request(result.url, headers={"Accept-Encoding": "gzip, br"})
+    try:
+        with urllib.request.urlopen(req, timeout=AUDIT_TIMEOUT) as resp:
+            body = resp.read()
+            headers, result.status = resp.headers, resp.status
+    except urllib.error.HTTPError as e:
+        body, headers, result.status = b"", e.headers, e.code
+    except (urllib.error.URLError, OSError) as e:
+        result.error = str(getattr(e, "reason", e))
+        return result
+
+    result.bytes = len(body)
+    result.content_type = (headers.get("Content-Type") or "").split(";")[0].strip()
+    result.content_encoding = headers.get("Content-Encoding")
+    result.cache_control = headers.get("Cache-Control")
+    result.etag = headers.get("ETag")
+    result.last_modified = headers.get("Last-Modified")
+    return result
+
+
+def replay_asset(result: AssetResult, replay) -> AssetResult:
+    """HAR の記録から確認結果を埋める（記録がなければエラー扱い）"""
+    found = replay.lookup(result.url)
+    if found is None:
+        result.error = "HAR に記録がありません"
+        return result
+    status, headers, body = found
+    headers = {name.lower(): value for name, value in headers.items()}
+    result.status = status
+    result.bytes = len(body)
+    result.content_type = headers.get("content-type", "").split(";")[0].strip()
+    result.cache_control = headers.get("cache-control")
+    result.etag = headers.get("etag")
+    result.last_modified = headers.get("last-modified")
+    return result
+
+
+def audit_assets(refs: list, workers: int = AUDIT_WORKERS, replay=None) -> list:
+    """参照一覧を URL ごとにまとめ、上限 workers 本の並列リクエストで確認する"""
+    by_url: dict = {}
+    for ref in refs:
+        url = ref["url"].split("#")[0]
+        result = by_url.setdefault(url, AssetResult(url))
+        result.kinds.add(ref["kind"])
+        result.sources.add(ref["source"])
+    if replay is not None:
+        return [replay_asset(result, replay) for result in by_url.values()]
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(by_url) or 1))) as pool:
+        return list(pool.map(fetch_asset, by_url.values()))
+
+
+def format_results(results: list) -> str:
+    """確認結果の一覧表（失敗の報告用）"""
+    return "\n".join(
+        f"  {r.status or 'ERR':>3}  {r.content_type or '-':<24} {r.bytes / 1024:8.1f} KB  "
+        f"cache={r.cache_control or '-'}  {r.url}"
+        + (f"  ({r.error})" if r.error else "")
+        for r in results
+    )
@@ -1,13 +1,75 @@
 """
 共通フィクスチャ定義
 
-環境変数 TEST_BASE_URL でテスト対象を切り替えられる:
+既定では output/{TEST_PROJECT}/ を内蔵のローカルサーバー（tests/static_server.py）で配信して
+テストする（Apache / XAMPP 不要）。対象案件は環境変数 TEST_PROJECT で切り替えられる:
+  set TEST_PROJECT=MY-SITE
+  python -m pytest tests/ -v
+
+既存のサーバーに対してテストする場合は TEST_BASE_URL（または --base-url）を指定する:
   set TEST_BASE_URL=http://localhost/claude-code-website/output/MY-SITE/
   python -m pytest tests/ -v
+
+内蔵サーバーの回線条件:
+  python -m pytest tests/ --network 3g                 # 3G 相当（遅延 150ms / 1.6 Mbps）
+  python -m pytest tests/ --latency-ms 100 --bandwidth-kbps 800
+
+オフライン実行（HAR の記録と再生。tests/har_replay.py）:
+  python -m pytest tests/ --har record    # 初回読み込みの通信を tests/har/{案件名}.har に記録してから実行
+  python -m pytest tests/ --har replay    # ブラウザの通信を全て HAR から返す（Google Fonts も含めオフライン）
+
+フィクスチャの使い分け:
+  page / mobile_page / tablet_page
+      テストごとに新しいページを開く。クリック・入力など状態を変えるテスト用
+  snapshot / mobile_snapshot / tablet_snapshot
+      セッション中に1回だけ読み込んだページの DOM 情報（PageSnapshot）。
+      title・meta・alt などを読むだけのテスト用（ページ読み込みの回数を減らす）
+  api_request
+      HTTP ステータスの確認用（ブラウザでページを開かない）
+  asset_audit
+      snapshot が参照する全リソースを並列に GET した結果（AssetResult の一覧。tests/asset_audit.py）
 """
 import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+from urllib.parse import quote, unquote, urlsplit
+
 import pytest
-from playwright.sync_api import Page, BrowserContext
+from playwright.sync_api import Page, BrowserContext, Browser, Playwright, APIRequestContext
+
+from asset_audit import AssetResult, audit_assets, collect_assets
+from har_replay import HarReplay, har_path, record_har
+from static_server import NETWORK_PROFILES, StaticServer
+from waits import load_all_images
+
+OUTPUT_ROOT     = Path(__file__).resolve().parent.parent / "output"
+DEFAULT_PROJECT = "THE-CORNER-CAFE_v3"
+
+# テストで使う画面サイズ（page / mobile_page / tablet_page とスナップショット・性能計測で共通）
+VIEWPORTS = {
+    "desktop": {"width": 1280, "height": 800},
+    "mobile":  {"width": 375, "height": 667},    # iPhone SE 相当
+    "tablet":  {"width": 768, "height": 1024},
+}
+
+
+def pytest_addoption(parser) -> None:
+    group = parser.getgroup("static-server", "内蔵ローカルサーバー")
+    group.addoption(
+        "--network", choices=sorted(NETWORK_PROFILES), default="none",
+        help="内蔵サーバーの回線プロファイル（既定: none = 制限なし）",
+    )
+    group.addoption("--latency-ms", type=float, default=None, help="1リクエストごとの遅延[ミリ秒]")
+    group.addoption("--bandwidth-kbps", type=float, default=None, help="帯域[kbps]（0 で無制限）")
+    parser.addoption(
+        "--har", choices=["off", "record", "replay"], default="off",
+        help="record: 初回読み込みを HAR に記録 / replay: ブラウザの通信を HAR から返す（オフライン実行）",
+    )
+    parser.addoption(
+        "--update-perf-baseline", action="store_true",
+        help="性能テストの計測結果で tests/budgets/ のベースラインを上書きする",
+    )
 
 
 def pytest_configure(config) -> None:
@@ -18,10 +80,88 @@ def pytest_configure(config) -> None:
         config.option.base_url = env_url
 
 
+def pytest_terminal_summary(terminalreporter, config) -> None:
+    """HAR 再生時、記録になかったリクエストを一覧表示する"""
+    replay = getattr(config, "_har_replay", None)
+    if replay is None:
+        return
+    terminalreporter.section("HAR 再生")
+    terminalreporter.write_line(f"{replay.path}: 記録から応答 {replay.hits} 件 / 記録なし {len(replay.misses)} 件")
+    for miss in sorted(set(replay.misses)):
+        terminalreporter.write_line(f"  記録なし（中断）: {miss}")
+
+
+def project_name(base_url: str) -> str:
+    """base_url の最後のディレクトリ名を案件名とする（内蔵サーバーでも XAMPP でも同じ名前になる）"""
+    return unquote(urlsplit(base_url).path.rstrip("/").split("/")[-1]) or "default"
+
+
+@pytest.fixture(scope="session")
+def static_server(request) -> StaticServer:
+    """output/ を配信する内蔵サーバー（セッション中ずっと起動しておく）"""
+    latency, bandwidth = NETWORK_PROFILES[request.config.getoption("network")]
+    if request.config.getoption("latency_ms") is not None:
+        latency = request.config.getoption("latency_ms") / 1000
+    if request.config.getoption("bandwidth_kbps") is not None:
+        bandwidth = int(request.config.getoption("bandwidth_kbps") * 1000 / 8)
+    server = StaticServer(OUTPUT_ROOT, latency=latency, bandwidth=bandwidth).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture(scope="session")
+def base_url(request) -> str:
+    """
+    テスト対象の URL（pytest-base-url の base_url を上書き）。
+    TEST_BASE_URL / --base-url があればそれを、なければ内蔵サーバー上の案件 URL を使う。
+    """
+    url = request.config.getoption("base_url")
+    if url:
+        return url
+    server = request.getfixturevalue("static_server")
+    project = os.environ.get("TEST_PROJECT", DEFAULT_PROJECT)
+    return f"{server.url}{quote(project)}/"
+
+
+@pytest.fixture(scope="session")
+def har(request, browser: Browser, browser_context_args: dict, base_url: str) -> Optional[HarReplay]:
+    """
+    --har に応じて HAR を記録・読み込みする。
+    replay のときは HarReplay を返し、ブラウザのコンテキストは全てこれを経由する（それ以外は None）。
+    """
+    mode = request.config.getoption("har")
+    path = har_path(project_name(base_url))
+    if mode == "record":
+        record_har(browser, browser_context_args, base_url, path, VIEWPORTS)
+    if mode != "replay":
+        return None
+    if not path.exists():
+        pytest.exit(f"HAR がありません: {path}（先に --har record で記録してください）", returncode=4)
+    replay = HarReplay(path, base_url)
+    request.config._har_replay = replay
+    return replay
+
+
+@pytest.fixture
+def context(context: BrowserContext, har: Optional[HarReplay]) -> BrowserContext:
+    """pytest-playwright の context（HAR 再生時は通信を HAR から返す）"""
+    if har:
+        har.attach(context)
+    return context
+
+
+def new_context(browser: Browser, context_args: dict, har: Optional[HarReplay], viewport: dict) -> BrowserContext:
+    """フィクスチャ以外でコンテキストを作るとき用（画面サイズの指定と HAR 再生の設定をまとめて行う）"""
+    context = browser.new_context(**{**context_args, "viewport": viewport})
+    if har:
+        har.attach(context)
+    return context
+
+
 @pytest.fixture
 def page(page: Page, base_url: str) -> Page:
     """デスクトップ (1280×800) で対象ページを開く"""
-    page.set_viewport_size({"width": 1280, "height": 800})
+    page.set_viewport_size(VIEWPORTS["desktop"])
     page.goto(base_url)
     return page
 
@@ -30,7 +170,7 @@ def page(page: Page, base_url: str) -> Page:
 def mobile_page(context: BrowserContext, base_url: str) -> Page:
     """モバイル (375×667 / iPhone SE 相当) で対象ページを開く"""
     page = context.new_page()
-    page.set_viewport_size({"width": 375, "height": 667})
+    page.set_viewport_size(VIEWPORTS["mobile"])
     page.goto(base_url)
     return page
 
@@ -39,6 +179,104 @@ def mobile_page(context: BrowserContext, base_url: str) -> Page:
 def tablet_page(context: BrowserContext, base_url: str) -> Page:
     """タブレット (768×1024) で対象ページを開く"""
     page = context.new_page()
-    page.set_viewport_size({"width": 768, "height": 1024})
+    page.set_viewport_size(VIEWPORTS["tablet"])
     page.goto(base_url)
     return page
+
+
+# ── 読み取り専用テスト用のスナップショット ─────────────────────
+
+# ページから読み取る情報（1回の evaluate でまとめて取得する）
+SNAPSHOT_JS = """() => {
+    const attr = (el, name) => el.getAttribute(name);
+    return {
+        url: location.href,
+        title: document.title,
+        lang: attr(document.documentElement, "lang"),
+        h1_count: document.querySelectorAll("h1").length,
+        metas: Array.from(document.querySelectorAll("meta")).map(m => ({
+            key: attr(m, "property") || attr(m, "name"),
+            content: attr(m, "content"),
+        })),
+        images: Array.from(document.images).map(img => ({
+            src: img.currentSrc || img.src,
+            has_alt: img.hasAttribute("alt"),
+            broken: !img.complete || img.naturalWidth === 0,
+        })),
+        ids: Array.from(document.querySelectorAll("[id]")).map(el => el.id),
+        skip_nav_count: document.querySelectorAll(
+            'a[href="#main"], a[href^="#skip"], .skip-nav, [class*="skip"]'
+        ).length,
+        horizontal_overflow:
+            document.documentElement.scrollWidth > document.documentElement.clientWidth,
+    };
+}"""
+
+
+@dataclass(frozen=True)
+class PageSnapshot:
+    """読み込み完了後（lazy-load 画像を含む）のページの DOM 情報"""
+    url: str
+    title: str
+    lang: Optional[str]
+    h1_count: int
+    metas: list
+    images: list
+    ids: list
+    skip_nav_count: int
+    horizontal_overflow: bool
+    assets: list            # collect_assets() の結果（img / srcset / link / script / og:image / CSS url()）
+
+    def meta(self, key: str) -> list[str]:
+        """name または property が key の meta の content 一覧"""
+        return [m["content"] for m in self.metas if m["key"] == key]
+
+    @property
+    def broken_images(self) -> list[str]:
+        return [img["src"] for img in self.images if img["broken"]]
+
+
+def _take_snapshot(browser: Browser, context_args: dict, har: Optional[HarReplay],
+                   base_url: str, viewport: dict) -> PageSnapshot:
+    """新しいコンテキストでページを1回開き、全画像の読み込みを待ってから DOM 情報を取る"""
+    context = new_context(browser, context_args, har, viewport)
+    try:
+        page = context.new_page()
+        page.goto(base_url)
+        # lazy-load 画像を全て読み込ませてから取得する
+        load_all_images(page)
+        return PageSnapshot(**page.evaluate(SNAPSHOT_JS), assets=collect_assets(page))
+    finally:
+        context.close()
+
+
+@pytest.fixture(scope="session")
+def snapshot(browser: Browser, browser_context_args: dict, har, base_url: str) -> PageSnapshot:
+    """デスクトップ (1280×800) のスナップショット（セッションで1回だけ読み込む）"""
+    return _take_snapshot(browser, browser_context_args, har, base_url, VIEWPORTS["desktop"])
+
+
+@pytest.fixture(scope="session")
+def mobile_snapshot(browser: Browser, browser_context_args: dict, har, base_url: str) -> PageSnapshot:
+    """モバイル (375×667) のスナップショット"""
+    return _take_snapshot(browser, browser_context_args, har, base_url, VIEWPORTS["mobile"])
+
+
+@pytest.fixture(scope="session")
+def tablet_snapshot(browser: Browser, browser_context_args: dict, har, base_url: str) -> PageSnapshot:
+    """タブレット (768×1024) のスナップショット"""
+    return _take_snapshot(browser, browser_context_args, har, base_url, VIEWPORTS["tablet"])
+
+
+@pytest.fixture(scope="session")
+def asset_audit(snapshot: PageSnapshot, har: Optional[HarReplay]) -> list[AssetResult]:
+    """snapshot が参照する全リソースの確認結果（セッションで1回だけ並列に取得する。HAR 再生時は記録から）"""
+    return audit_assets(snapshot.assets, replay=har)
+
+
+@pytest.fixture(scope="session")
+def api_request(playwright: Playwright) -> APIRequestContext:
+    """ブラウザを使わずに HTTP リクエストを送るためのコンテキスト"""
+    request = playwright.request.new_context()
+    yield request
+    request.dispose()
@@ -0,0 +1,112 @@
+"""
+HAR の記録と再生（オフライン・決定的なテスト実行用）
+
+記録: 案件ページの初回読み込み（全画面サイズ・lazy-load 画像・Google Fonts を含む）を
+      tests/har/{案件名}.har に保存する。
+再生: ブラウザの全リクエストを context.route() で横取りし、HAR の記録から応答する。
+      HAR にないリクエストはネットワークに出さずに中断し、セッション終了時に一覧を表示する。
+
+内蔵サーバーはセッションごとにポートが変わるので、記録時の base_url を HAR に残しておき、
+再生時は現在の base_url をその URL に読み替えて照合する。
+"""
+import base64
+import json
+import threading
+from pathlib import Path
+
+from playwright.sync_api import Browser, BrowserContext, Route
+
+from waits import load_all_images
+
+HAR_DIR = Path(__file__).resolve().parent / "har"
+
+# 再生時に付け直すと本文と食い違うヘッダー（HAR の本文は展開済み）
+DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive"}
+
+
+def har_path(project: str) -> Path:
+    return HAR_DIR / f"{project}.har"
+
+
+def record_har(browser: Browser, context_args: dict, base_url: str, path: Path, viewports: dict) -> Path:
+    """全画面サイズで1回ずつ読み込み、全画像を読ませた状態の通信を HAR に記録する"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    context = browser.new_context(
+        **context_args, record_har_path=str(path), record_har_content="embed",
+    )
+    try:
+        page = context.new_page()
+        for viewport in viewports.values():
+            page.set_viewport_size(viewport)
+            page.goto(base_url)
+            load_all_images(page)
+            # 非表示のタブ内などで読み込まれない lazy 画像も記録しておく
+            page.evaluate("""() => document.querySelectorAll('img[loading="lazy"]')
+                .forEach(img => { img.loading = "eager"; })""")
+            page.wait_for_load_state("networkidle")
+    finally:
+        context.close()  # ここで HAR が書き出される
+
+    data = json.loads(path.read_text(encoding="utf-8"))
+    data["log"]["_testBaseUrl"] = base_url
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    return path
+
+
+class HarReplay:
+    """HAR の記録からリクエストに応答する（記録にないものは中断して misses に残す）"""
+
+    def __init__(self, path: Path, base_url: str):
+        log = json.loads(Path(path).read_text(encoding="utf-8"))["log"]
+        self.path = Path(path)
+        self.base_url = base_url
+        self.recorded_base = log.get("_testBaseUrl", base_url)
+        self.entries: dict = {}
+        for entry in log["entries"]:
+            request, response = entry["request"], entry["response"]
+            if response.get("status", 0) <= 0:
+                continue
+            # 同じ URL が複数回あれば最後の応答を使う
+            self.entries[(request["method"], request["url"].split("#")[0])] = response
+        self.misses: list = []
+        self.hits = 0
+        self.lock = threading.Lock()
+
+    def _recorded_url(self, url: str) -> str:
+        url = url.split("#")[0]
+        if url.startswith(self.base_url):
+            return self.recorded_base + url[len(self.base_url):]
+        return url
+
+    def lookup(self, url: str, method: str = "GET"):
+        """記録された応答 (ステータス, ヘッダー dict, 本文) を返す。なければ None"""
+        response = self.entries.get((method, self._recorded_url(url)))
+        if response is None:
+            return None
+        content = response.get("content", {})
+        text = content.get("text") or ""
+        body = base64.b64decode(text) if content.get("encoding") == "base64" else text.encode("utf-8")
+        headers = {
+            h["name"]: h["value"] for h in response.get("headers", [])
+            if h["name"].lower() not in DROP_HEADERS
+        }
+        return response["status"], headers, body
+
+    def handle(self, route: Route) -> None:
+        request = route.request
+        found = self.lookup(request.url, request.method)
+        with self.lock:
+            if found is None:
+                self.misses.append(f"{request.method} {request.url}")
+            else:
+                self.hits += 1
+        if found is None:
+            route.abort("internetdisconnected")
+            return
+        status, headers, body = found
+        route.fulfill(status=status, headers=headers, body=body)
+
+    def attach(self, context: BrowserContext) -> BrowserContext:
+        """context の全リクエストをこの HAR から応答するようにする"""
+        context.route("**/*", self.handle)
+        return context
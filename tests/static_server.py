@@ -0,0 +1,327 @@
+"""
+テスト用のローカル静的ファイルサーバー
+
+Apache / XAMPP なしで output/ 配下のサイトを配信する。
+別スレッドで動くので、同じプロセスのテストや子プロセスの pytest から利用できる。
+
+    with StaticServer(Path("output")) as server:
+        print(server.url)   # http://127.0.0.1:{空きポート}/
+
+本番サーバーに近い挙動をひととおり再現する:
+  - ETag / Last-Modified による再検証（If-None-Match / If-Modified-Since → 304）
+  - gzip / brotli の圧縮ネゴシエーション（brotli は pip install brotli がある場合のみ。
+    compress_assets.py の .gz / .br があればそれを返す）
+  - Range リクエスト（206 / 416、If-Range）
+  - build_assets.py のハッシュ付きファイル（styles.3f2a9c1d.css など）は 1 年キャッシュ（immutable）
+  - 人工的な遅延と帯域制限（3G 回線などを決まった条件で再現する）
+  - リクエストログ（キャッシュや圧縮の効き具合をテストから確認できる）
+"""
+import email.utils
+import gzip
+import os
+import re
+import threading
+import time
+from functools import partial
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# 回線プロファイル: (片道の遅延[秒], 帯域[バイト/秒])。0 は制限なし
+NETWORK_PROFILES = {
+    "none":    (0.0, 0),
+    "4g":      (0.04, 1_125_000),    # 9 Mbps
+    "3g":      (0.15, 200_000),      # 1.6 Mbps（Lighthouse のモバイル計測と同等）
+    "slow-3g": (0.4, 50_000),        # 400 kbps
+}
+
+COMPRESSIBLE_TYPES = re.compile(
+    r"^(text/|application/(javascript|json|xml|manifest\+json)|image/svg\+xml)"
+)
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+# build_assets.py / build_fonts.py が書き出すハッシュ付きファイル（assets/.htaccess と同じ扱いにする）
+IMMUTABLE_RE = re.compile(r"\.[0-9a-f]{8}\.(css|js|woff2)$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+CHUNK_SIZE = 16 * 1024
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    """アクセスログを出さない静的ファイルハンドラ（テスト出力を汚さない）"""
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+class CachingHandler(QuietHandler):
+    """
+    再検証・圧縮・Range・遅延/帯域制限に対応した静的ファイルハンドラ。
+    ディレクトリ一覧だけは SimpleHTTPRequestHandler にそのまま任せる。
+    """
+
+    protocol_version = "HTTP/1.1"  # keep-alive（遅延を接続ごとではなくリクエストごとに再現する）
+
+    def __init__(self, *args, latency: float = 0.0, bandwidth: int = 0,
+                 compress: bool = True, cache_control: str = "no-cache", **kwargs):
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.compress = compress
+        self.cache_control = cache_control
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self) -> None:
+        self._serve(head=False)
+
+    def do_HEAD(self) -> None:
+        self._serve(head=True)
+
+    # ── 応答 ──────────────────────────────────────────────
+
+    def _serve(self, head: bool) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            url_path = urlsplit(self.path).path
+            if not url_path.endswith("/"):
+                self._send_empty(HTTPStatus.MOVED_PERMANENTLY, {"Location": url_path + "/"})
+                return
+            index = os.path.join(path, "index.html")
+            if not os.path.isfile(index):
+                super().do_HEAD() if head else super().do_GET()
+                return
+            path = index
+
+        if not os.path.isfile(path):
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            self._record(HTTPStatus.NOT_FOUND, 0, None)
+            return
+
+        st = os.stat(path)
+        ctype = self.guess_type(path)
+        etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+        headers = {
+            "Last-Modified": email.utils.formatdate(st.st_mtime, usegmt=True),
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL if IMMUTABLE_RE.search(path) else self.cache_control,
+            "Accept-Ranges": "bytes",
+        }
+
+        encoding = self._choose_encoding(ctype)
+        if encoding:
+            # 圧縮版は別の表現なので ETag も分ける
+            etag = f'{etag[:-1]}-{encoding}"'
+            headers["Content-Encoding"] = encoding
+        if self.compress and COMPRESSIBLE_TYPES.match(ctype):
+            headers["Vary"] = "Accept-Encoding"
+        headers["ETag"] = etag
+
+        if self._not_modified(etag, st.st_mtime):
+            self._send_empty(HTTPStatus.NOT_MODIFIED, headers)
+            return
+
+        body = self.server.encoded(path, st.st_mtime_ns, encoding)
+        status = HTTPStatus.OK
+
+        range_header = self.headers.get("Range")
+        if range_header and not encoding and self._if_range_matches(etag, st.st_mtime):
+            span = self._parse_range(range_header, len(body))
+            if span is None:
+                self._send_empty(
+                    HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE, {"Content-Range": f"bytes */{len(body)}"},
+                )
+                return
+            start, end = span
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(body)}"
+            body = body[start:end + 1]
+            status = HTTPStatus.PARTIAL_CONTENT
+
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        if not head:
+            self._write_throttled(body)
+        self._record(status, 0 if head else len(body), encoding)
+
+    def _send_empty(self, status: int, headers: dict) -> None:
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+        self._record(status, 0, None)
+
+    def _write_throttled(self, body: bytes) -> None:
+        """帯域制限つきで本文を送る（bandwidth=0 なら一括送信）"""
+        if not self.bandwidth:
+            self.wfile.write(body)
+            return
+        for i in range(0, len(body), CHUNK_SIZE):
+            chunk = body[i:i + CHUNK_SIZE]
+            self.wfile.write(chunk)
+            time.sleep(len(chunk) / self.bandwidth)
+
+    def _record(self, status: int, size: int, encoding) -> None:
+        self.server.record({
+            "path": urlsplit(self.path).path, "status": int(status),
+            "bytes": size, "encoding": encoding,
+        })
+
+    # ── ネゴシエーション ─────────────────────────────────
+
+    def _choose_encoding(self, ctype: str):
+        """Accept-Encoding と Content-Type から圧縮形式を選ぶ（br > gzip > なし）"""
+        if not self.compress or not COMPRESSIBLE_TYPES.match(ctype):
+            return None
+        accepted = {}
+        for item in self.headers.get("Accept-Encoding", "").split(","):
+            name, _, params = item.strip().partition(";")
+            q = 1.0
+            if params.strip().startswith("q="):
+                try:
+                    q = float(params.strip()[2:])
+                except ValueError:
+                    q = 0.0
+            if name:
+                accepted[name.lower()] = q
+        if brotli and accepted.get("br", 0) > 0:
+            return "br"
+        if accepted.get("gzip", 0) > 0:
+            return "gzip"
+        return None
+
+    def _not_modified(self, etag: str, mtime: float) -> bool:
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match:
+            tags = [t.strip() for t in if_none_match.split(",")]
+            return "*" in tags or etag in tags or f"W/{etag}" in tags
+        return self._not_modified_since(self.headers.get("If-Modified-Since"), mtime)
+
+    @staticmethod
+    def _not_modified_since(value, mtime: float) -> bool:
+        if not value:
+            return False
+        try:
+            since = email.utils.parsedate_to_datetime(value).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(mtime) <= since
+
+    def _if_range_matches(self, etag: str, mtime: float) -> bool:
+        """If-Range が現在の表現と一致しない場合は Range を無視して全体を返す"""
+        if_range = self.headers.get("If-Range")
+        if not if_range:
+            return True
+        if if_range.startswith('"') or if_range.startswith("W/"):
+            return if_range == etag
+        return self._not_modified_since(if_range, mtime)
+
+    @staticmethod
+    def _parse_range(value: str, size: int):
+        """単一の bytes レンジを (開始, 終了) に変換する。満たせない場合は None"""
+        m = RANGE_RE.match(value.strip())
+        if not m or not (m.group(1) or m.group(2)):
+            return None
+        if m.group(1):
+            start = int(m.group(1))
+            end = min(int(m.group(2)), size - 1) if m.group(2) else size - 1
+        else:
+            # bytes=-N は末尾 N バイト
+            start, end = max(0, size - int(m.group(2))), size - 1
+        if start >= size or start > end:
+            return None
+        return start, end
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lock = threading.Lock()
+        self.log = []
+        self._encoded = {}
+
+    def encoded(self, path: str, mtime_ns: int, encoding) -> bytes:
+        """ファイル内容（圧縮形式ごと）をキャッシュして返す。ファイルが更新されたら作り直す"""
+        key = (path, encoding)
+        with self.lock:
+            cached = self._encoded.get(key)
+        if cached and cached[0] == mtime_ns:
+            return cached[1]
+        # compress_assets.py の圧縮済みファイル（index.html.br など）が新しければそれを返す（本番の .htaccess と同じ）
+        sidecar = f"{path}.{'gz' if encoding == 'gzip' else encoding}" if encoding else None
+        if sidecar and os.path.isfile(sidecar) and os.stat(sidecar).st_mtime_ns >= mtime_ns:
+            data = Path(sidecar).read_bytes()
+        else:
+            data = Path(path).read_bytes()
+            if encoding == "gzip":
+                data = gzip.compress(data, compresslevel=6, mtime=0)
+            elif encoding == "br":
+                data = brotli.compress(data)
+        with self.lock:
+            self._encoded[key] = (mtime_ns, data)
+        return data
+
+    def record(self, entry: dict) -> None:
+        with self.lock:
+            self.log.append(entry)
+
+
+class StaticServer:
+    """
+    root ディレクトリを配信するスレッド型 HTTP サーバー（port=0 で空きポートを使う）。
+    latency は1リクエストごとの遅延[秒]、bandwidth は接続ごとの帯域[バイト/秒]（0 で無制限）。
+    network に NETWORK_PROFILES の名前を渡すと latency / bandwidth をまとめて指定できる。
+    """
+
+    def __init__(self, root: Path, host: str = "127.0.0.1", port: int = 0,
+                 latency: float = 0.0, bandwidth: int = 0, network: str = None,
+                 compress: bool = True, cache_control: str = "no-cache"):
+        if network:
+            latency, bandwidth = NETWORK_PROFILES[network]
+        self.root = Path(root).resolve()
+        handler = partial(
+            CachingHandler, directory=str(self.root), latency=latency, bandwidth=bandwidth,
+            compress=compress, cache_control=cache_control,
+        )
+        self.httpd = _Server((host, port), handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    @property
+    def log(self) -> list:
+        """これまでのリクエストの記録 [{"path", "status", "bytes", "encoding"}, ...]"""
+        with self.httpd.lock:
+            return list(self.httpd.log)
+
+    def reset_log(self) -> None:
+        with self.httpd.lock:
+            self.httpd.log.clear()
+
+    def start(self) -> "StaticServer":
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "StaticServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -0,0 +1,288 @@
+"""
+ビルドスクリプトの文字列処理のテスト（ブラウザ不要）
+
+build_assets.py / convert_to_webp.py / generate_images.py のうち、
+手書きのトークナイザ（CSS / JS の圧縮、HTML の参照書き換え）とキャッシュの動作を固定する。
+どれも純粋な文字列・ファイル処理なので、Chromium がなくても実行できる:
+    python -m pytest tests/test_build_tools.py -q
+"""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+# ビルドスクリプトはリポジトリ直下にある
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import build_assets as ba  # noqa: E402
+import convert_to_webp as cw  # noqa: E402
+
+
+# ── CSS の圧縮 ───────────────────────────────────────────────
+
+@pytest.mark.parametrize("css, expected", [
+    (".a { color : red ; }", ".a{color :red}"),
+    (".a{margin:0 auto;}", ".a{margin:0 auto}"),
+    (".a{b:c;;}", ".a{b:c}"),
+    (".a{width:calc(100% - 2px)}", ".a{width:calc(100% - 2px)}"),
+    ("a:hover , b  >  c{}", "a:hover,b>c{}"),
+    ("/*! license */\n.a{}", ".a{}"),
+])
+def test_minify_css(css: str, expected: str) -> None:
+    assert ba.minify_css(css) == expected
+
+
+@pytest.mark.parametrize("css, expected", [
+    ('.a{content:";}";}', '.a{content:";}"}'),
+    (".a{content:'a ; }'}", ".a{content:'a ; }'}"),
+    ('.a{background:url("x;}.png")}', '.a{background:url("x;}.png")}'),
+])
+def test_minify_css_keeps_strings(css: str, expected: str) -> None:
+    """文字列の中の ;} や空白は残す"""
+    assert ba.minify_css(css) == expected
+
+
+@pytest.mark.parametrize("css, expected", [
+    ("a/*x*/b{}", "a/**/b{}"),              # 消すと ab（別のセレクタ）になる
+    (".a{margin:0/*x*/auto}", ".a{margin:0/**/auto}"),
+    ("a /*x*/ b{}", "a b{}"),
+    (".a{color:red/*x*/;}", ".a{color:red}"),
+    ("a{}/*x*/b{}", "a{}b{}"),
+])
+def test_minify_css_comment_between_tokens(css: str, expected: str) -> None:
+    """コメントを消しても前後のトークンがつながらないこと"""
+    assert ba.minify_css(css) == expected
+
+
+# ── JS の圧縮 ────────────────────────────────────────────────
+
+@pytest.mark.parametrize("src, expected", [
+    ("a\n++b", "a\n++b\n"),                 # a; ++b のまま（a++ b にしない）
+    ("a\n--\nb", "a\n--\nb\n"),
+    ("return\nx", "return\nx\n"),           # return; x のまま
+    ("a = b\n(c)", "a=b\n(c)\n"),
+    ("f();\n\n  g()", "f();g()\n"),
+    ("{\n  a()\n}", "{a()}\n"),
+])
+def test_minify_js_asi(src: str, expected: str) -> None:
+    """改行を消すと ASI（自動セミコロン挿入）の結果が変わる箇所は改行を残す"""
+    assert ba.minify_js(src) == expected
+
+
+@pytest.mark.parametrize("src, expected", [
+    ("x = a / b / c", "x=a / b / c\n"),
+    ("x = (a) / 2 // c\nf()", "x=(a)/ 2\nf()\n"),
+    ("x = a++ / 2; // it's\nf()", "x=a++ / 2;f()\n"),
+    ("x = a.return / 2 // it's\nf()", "x=a.return / 2\nf()\n"),
+    ("x = /ab+c/g.test(s)", "x=/ab+c/g.test(s)\n"),
+    ("return /x/.test(a)", "return /x/.test(a)\n"),
+    ("if (x) /re/.test(y)", "if(x)/re/.test(y)\n"),
+    ("var re = /[/]/g; // c", "var re=/[/]/g;\n"),
+    ("x = /a\\/b/ // c", "x=/a\\/b/\n"),
+])
+def test_minify_js_regex_vs_division(src: str, expected: str) -> None:
+    """/ を割り算と正規表現リテラルで取り違えない（取り違えると後ろのコメントや文字列を壊す）"""
+    assert ba.minify_js(src) == expected
+
+
+@pytest.mark.parametrize("src, expected", [
+    ('let s = "a // b"; // c', 'let s="a // b";\n'),
+    ("let s = 'a /* b */ c'", "let s='a /* b */ c'\n"),
+    ("const t = `a${ {b: 1}.b }  c`", "const t=`a${ {b: 1}.b }  c`\n"),
+    ("a - -b + +c", "a - -b + +c\n"),
+    ("1 .toString()", "1 .toString()\n"),
+])
+def test_minify_js_keeps_literals(src: str, expected: str) -> None:
+    assert ba.minify_js(src) == expected
+
+
+# ── ハッシュ付きファイルへの参照書き換え ─────────────────────────
+
+ASSET_HTML = """<!DOCTYPE html>
+<html>
+<head>
+  <link rel="stylesheet" href="assets/css/styles.css">
+  <!-- <link rel="stylesheet" href="assets/css/styles.css"> -->
+  <link rel="canonical" href="https://example.com/">
+</head>
+<body>
+  <script src="assets/js/main.js?v=1" defer></script>
+  <script>const s = '<script src="assets/js/main.js">';</script>
+  <script src="https://cdn.example.net/assets/js/main.js"></script>
+</body>
+</html>
+"""
+
+
+@pytest.fixture()
+def asset_site(tmp_path: Path) -> tuple:
+    assets = tmp_path / "assets"
+    for rel in ("css/styles.css", "js/main.js"):
+        (assets / rel).parent.mkdir(parents=True, exist_ok=True)
+        (assets / rel).write_text("/* */", encoding="utf-8")
+    manifest = {
+        "css/styles.css": {"output": "css/styles.0123abcd.css"},
+        "js/main.js":     {"output": "js/main.89abcdef.js"},
+    }
+    return tmp_path, assets, manifest
+
+
+def test_rewrite_asset_references(asset_site: tuple) -> None:
+    site, assets, manifest = asset_site
+    html, changes = ba.rewrite_asset_references(ASSET_HTML, site, assets, manifest)
+    assert '<link rel="stylesheet" href="assets/css/styles.0123abcd.css">' in html
+    assert '<script src="assets/js/main.89abcdef.js?v=1" defer>' in html
+    # コメント・インライン <script> の中身・外部サイトの URL は変えない
+    assert '<!-- <link rel="stylesheet" href="assets/css/styles.css"> -->' in html
+    assert """'<script src="assets/js/main.js">'""" in html
+    assert "https://cdn.example.net/assets/js/main.js" in html
+    assert [(line, old) for line, _, old, _ in changes] == [
+        (4, "assets/css/styles.css"), (9, "assets/js/main.js?v=1"),
+    ]
+
+
+def test_rewrite_asset_references_idempotent(asset_site: tuple) -> None:
+    """再実行しても変わらず、ハッシュが変わったら新しい名前に付け直す"""
+    site, assets, manifest = asset_site
+    once, _ = ba.rewrite_asset_references(ASSET_HTML, site, assets, manifest)
+    twice, changes = ba.rewrite_asset_references(once, site, assets, manifest)
+    assert twice == once and changes == []
+
+    manifest["css/styles.css"] = {"output": "css/styles.fedcba98.css"}
+    rebuilt, _ = ba.rewrite_asset_references(once, site, assets, manifest)
+    assert 'href="assets/css/styles.fedcba98.css"' in rebuilt
+
+
+def test_inline_critical_css_roundtrip() -> None:
+    """critical CSS の埋め込みは strip_critical() で元に戻り、再実行しても同じ結果になる"""
+    critical = {"assets/css/styles.css": ".a{b:c}"}
+    once, deferred = ba.inline_critical_css(ASSET_HTML, critical)
+    assert deferred == ["assets/css/styles.css"]
+    assert '<style data-critical>.a{b:c}</style>\n  <link rel="stylesheet" href="assets/css/styles.css"' in once
+    assert '<noscript data-critical><link rel="stylesheet" href="assets/css/styles.css"></noscript>' in once
+    assert "<!-- <link rel=\"stylesheet\" href=\"assets/css/styles.css\"> -->" in once
+
+    assert ba.strip_critical(once) == ASSET_HTML
+    again, _ = ba.inline_critical_css(ba.strip_critical(once), critical)
+    assert again == once
+
+
+# ── 画像参照の書き換え（convert_to_webp）────────────────────────
+
+@pytest.fixture()
+def image_site(tmp_path: Path) -> Path:
+    images = tmp_path / "assets" / "images"
+    images.mkdir(parents=True)
+    for name, avif in (("hero", True), ("menu", False), ("photo", False)):
+        Image.new("RGB", (1000, 500)).save(images / f"{name}.webp")
+        Image.new("RGB", (480, 240)).save(images / f"{name}-480w.webp")
+        if avif:
+            Image.new("RGB", (1000, 500)).save(images / f"{name}.avif")
+    return tmp_path
+
+
+IMAGE_HTML = """<html>
+<head>
+  <link rel="preload" as="image" href="assets/images/hero.jpg" fetchpriority="high" data-hints>
+</head>
+<body>
+  <img src="assets/images/hero.jpg" alt="">
+  <picture class="art">
+    <source media="(max-width: 600px)" srcset="assets/images/menu.jpg">
+    <img src="assets/images/photo.jpg" alt="">
+  </picture>
+  <!-- <img src="assets/images/menu.jpg"> -->
+  <script>const s = '<img src="assets/images/menu.jpg">';</script>
+  <p style="background:url(assets/images/menu.jpg)">menu.jpg</p>
+</body>
+</html>
+"""
+
+
+def _convert(html: str, site: Path) -> str:
+    html, _, _ = cw.rewrite_references(html, site)
+    html, _ = cw.add_srcset(html, site)
+    html, _ = cw.refresh_hints_preload(html)
+    return html
+
+
+def test_rewrite_images(image_site: Path) -> None:
+    html = _convert(IMAGE_HTML, image_site)
+    # AVIF がある <img> は生成した <picture>、<img> は WebP のバリアントから選ぶ
+    assert '<picture data-converted>\n    <source type="image/avif" srcset="assets/images/hero.avif"' in html
+    assert ('<img src="assets/images/hero.webp" srcset="assets/images/hero-480w.webp 480w, '
+            'assets/images/hero.webp 1000w" sizes="100vw" alt="">') in html
+    # 手書きの <picture> は属性と media 付きの <source> を残し、URL だけ差し替える
+    assert '<picture class="art">\n    <source media="(max-width: 600px)" srcset="assets/images/menu.webp">' in html
+    assert '<img src="assets/images/photo.webp" srcset="assets/images/photo-480w.webp 480w' in html
+    # コメント・<script> の中身と本文はそのまま、style 属性の url() は書き換える
+    assert '<!-- <img src="assets/images/menu.jpg"> -->' in html
+    assert """'<img src="assets/images/menu.jpg">'""" in html
+    assert 'style="background:url(assets/images/menu.webp)">menu.jpg</p>' in html
+    # build_hints.py の preload は変換後の AVIF に合わせて作り直す
+    assert ('<link rel="preload" as="image" imagesrcset="assets/images/hero.avif" '
+            'imagesizes="100vw" type="image/avif" fetchpriority="high" data-hints>') in html
+
+
+def test_rewrite_images_idempotent(image_site: Path) -> None:
+    once = _convert(IMAGE_HTML, image_site)
+    assert _convert(once, image_site) == once
+
+
+def test_authored_picture_gets_avif_source(image_site: Path) -> None:
+    """手書きの <picture> には目印付きの AVIF の <source> を <img> の直前に足し、AVIF がなくなれば外す"""
+    images = image_site / "assets" / "images"
+    Image.new("RGB", (1000, 500)).save(images / "photo.avif")
+    html = _convert(IMAGE_HTML, image_site)
+    assert ('<source media="(max-width: 600px)" srcset="assets/images/menu.webp">\n'
+            '    <source type="image/avif" srcset="assets/images/photo.avif" sizes="100vw" data-converted>\n'
+            '    <img src="assets/images/photo.webp"') in html
+    assert _convert(html, image_site) == html
+
+    (images / "photo.avif").unlink()
+    assert "photo.avif" not in _convert(html, image_site)
+
+
+def test_generated_picture_collapses_without_avif(image_site: Path) -> None:
+    """AVIF がなくなった画像は、生成した <picture> を <img> に戻す"""
+    html = _convert(IMAGE_HTML, image_site)
+    (image_site / "assets" / "images" / "hero.avif").unlink()
+    html = _convert(html, image_site)
+    assert "data-converted" not in html
+    assert '<link rel="preload" as="image" href="assets/images/hero.webp" imagesrcset=' in html
+
+
+# ── 生成画像キャッシュ（generate_images）──────────────────────
+
+@pytest.fixture()
+def image_cache(tmp_path: Path):
+    gi = pytest.importorskip("generate_images", reason="google-genai が必要です")
+    return gi.ImageCache(tmp_path / "cache", max_bytes=250)
+
+
+def test_image_cache_lru(image_cache) -> None:
+    """容量を超えたら最終利用が古いものから消し、get() はファイルの更新時刻を変えない"""
+    first = image_cache.put("a" * 64, b"x" * 100)
+    os.utime(first, (1, 1))
+    image_cache.put("b" * 64, b"x" * 100)
+    assert image_cache.get("a" * 64) == first          # a を最近使ったことにする
+    assert first.stat().st_mtime == 1
+
+    image_cache.put("c" * 64, b"x" * 100)              # 300 > 250 なので b を消す
+    assert image_cache.get("b" * 64) is None
+    assert image_cache.get("a" * 64) is not None
+    assert image_cache.total == 200
+
+
+def test_image_cache_index_persists(image_cache) -> None:
+    """索引は次回の起動で読み直され、壊れていればキャッシュフォルダから作り直す"""
+    image_cache.put("a" * 64, b"x" * 100)
+    image_cache.put("b" * 64, b"x" * 50)
+    reopened = type(image_cache)(image_cache.root, image_cache.max_bytes)
+    assert reopened.entries == image_cache.entries and reopened.total == 150
+
+    (image_cache.root / "index.json").write_text("{broken", encoding="utf-8")
+    rebuilt = type(image_cache)(image_cache.root, image_cache.max_bytes)
+    assert sorted(rebuilt.entries) == ["a" * 64, "b" * 64] and rebuilt.total == 150
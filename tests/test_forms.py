@@ -8,10 +8,15 @@
 """
 from playwright.sync_api import Page, expect
 
+from waits import settle, wait_for_in_viewport, wait_for_transitions
+
 
 def _scroll_to_form(page: Page) -> None:
-    page.locator("#contact").scroll_into_view_if_needed()
-    page.wait_for_timeout(200)
+    contact = page.locator("#contact")
+    contact.scroll_into_view_if_needed()
+    # 表示アニメーション（js-reveal）が終わるまで待つ
+    wait_for_in_viewport(contact)
+    wait_for_transitions(contact)
 
 
 def test_honeypot_is_hidden(page: Page) -> None:
@@ -27,16 +32,12 @@ def test_empty_submit_shows_errors(page: Page) -> None:
 
     submit_btn = page.locator("#js-submit-btn")
     submit_btn.click()
-    page.wait_for_timeout(300)
 
     # 名前・メール・お問い合わせ種別・メッセージの少なくとも1つにエラーが出ること
-    has_any_error = (
-        page.locator("#error-name").is_visible()
-        or page.locator("#error-email").is_visible()
-        or page.locator("#error-inquiry").is_visible()
-        or page.locator("#error-message").is_visible()
+    errors = page.locator(
+        "#error-name:visible, #error-email:visible, #error-inquiry:visible, #error-message:visible"
     )
-    assert has_any_error, "空送信してもエラーメッセージが表示されませんでした"
+    expect(errors, "空送信してもエラーメッセージが表示されませんでした").not_to_have_count(0)
 
 
 def test_invalid_email_shows_error(page: Page) -> None:
@@ -47,7 +48,6 @@ def test_invalid_email_shows_error(page: Page) -> None:
     page.locator('#contact-form input[name="email"]').fill("not-an-email")
 
     page.locator("#js-submit-btn").click()
-    page.wait_for_timeout(300)
 
     expect(page.locator("#error-email")).to_be_visible()
 
@@ -65,7 +65,8 @@ def test_privacy_checkbox_required(page: Page) -> None:
     assert not checkbox.is_checked(), "プライバシーチェックボックスが既にチェックされています"
 
     page.locator("#js-submit-btn").click()
-    page.wait_for_timeout(300)
+    # 未同意ならチェックボックスまでスムーズスクロールする。それが終わってから判定する
+    settle(page)
 
     # フォーム成功メッセージが表示されていないこと
     assert not page.locator("#form-success").is_visible(), "プライバシー未同意なのに送信成功になっています"
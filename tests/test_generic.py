@@ -6,128 +6,119 @@
 Phase 9 で以下のように実行する:
     python -m pytest tests/test_generic.py -v --tb=short
 （TEST_BASE_URL 環境変数でテスト先を指定）
+
+読むだけのチェックは snapshot（セッションで1回だけ読み込んだページ）で行い、
+フォーム操作など状態を変えるチェックだけ page で毎回ページを開く。
 """
 import re
-from playwright.sync_api import Page, expect, Request, Response
+from playwright.sync_api import Page, BrowserContext, APIRequestContext, expect, Request, Response
+
+from asset_audit import format_results
+from conftest import PageSnapshot
+from waits import settle
 
 
 # ── 1. ページ基本 ────────────────────────────────────────────
 
-def test_page_returns_200(page: Page, base_url: str) -> None:
+def test_page_returns_200(api_request: APIRequestContext, base_url: str) -> None:
     """トップページが HTTP 200 で返ること"""
-    resp = page.request.get(base_url)
+    resp = api_request.get(base_url)
     assert resp.status == 200, f"HTTP {resp.status} が返りました（200 を期待）"
 
 
-def test_title_exists(page: Page) -> None:
+def test_title_exists(snapshot: PageSnapshot) -> None:
     """title タグが存在し、空でないこと"""
-    title = page.title()
+    title = snapshot.title
     assert title and len(title.strip()) > 0, "title が空です"
 
 
-def test_h1_exactly_once(page: Page) -> None:
+def test_h1_exactly_once(snapshot: PageSnapshot) -> None:
     """h1 がページ内に1つだけ存在すること（SEO 基本要件）"""
-    count = page.locator("h1").count()
+    count = snapshot.h1_count
     assert count == 1, f"h1 が {count} 個あります（1つだけにすること）"
 
 
-def test_meta_description_exists(page: Page) -> None:
+def test_meta_description_exists(snapshot: PageSnapshot) -> None:
     """meta description が存在し、内容が50文字以上あること"""
-    meta = page.locator('meta[name="description"]')
-    assert meta.count() == 1, "meta[name=description] が存在しません"
-    content = meta.get_attribute("content") or ""
+    contents = snapshot.meta("description")
+    assert len(contents) == 1, "meta[name=description] が存在しません"
+    content = contents[0] or ""
     assert len(content) >= 50, f"meta description が短すぎます ({len(content)}文字)"
 
 
-def test_ogp_tags_exist(page: Page) -> None:
+def test_ogp_tags_exist(snapshot: PageSnapshot) -> None:
     """OGP 必須タグ（og:title / og:description / og:image）が揃っていること"""
     for prop in ("og:title", "og:description", "og:image"):
-        tag = page.locator(f'meta[property="{prop}"]')
-        assert tag.count() == 1, f'{prop} が見つかりません'
-        assert tag.get_attribute("content"), f'{prop} の content が空です'
+        contents = snapshot.meta(prop)
+        assert len(contents) == 1, f'{prop} が見つかりません'
+        assert contents[0], f'{prop} の content が空です'
 
 
 # ── 2. アセット読み込み ──────────────────────────────────────
 
-def test_stylesheet_loads(page: Page) -> None:
+def _assets_of(asset_audit: list, *kinds: str) -> list:
+    return [r for r in asset_audit if r.kinds & set(kinds)]
+
+
+def test_stylesheet_loads(asset_audit: list) -> None:
     """CSS ファイルが正常に読み込まれること"""
-    links = page.locator('link[rel="stylesheet"][href]')
-    assert links.count() > 0, "link[rel=stylesheet] が見つかりません"
+    styles = _assets_of(asset_audit, "stylesheet")
+    assert styles, "link[rel=stylesheet] が見つかりません"
 
-    for i in range(links.count()):
-        href = links.nth(i).get_attribute("href") or ""
-        if href.startswith("http"):
-            url = href
-        else:
-            url = page.url.rstrip("/") + "/" + href.lstrip("/")
-        resp = page.request.get(url)
-        assert resp.status == 200, f"CSS の読み込みに失敗: {href} → HTTP {resp.status}"
+    failed = [r for r in styles if not r.ok]
+    assert failed == [], "CSS の読み込みに失敗:\n" + format_results(failed)
 
 
-def test_javascript_loads(page: Page) -> None:
+def test_javascript_loads(asset_audit: list) -> None:
     """JS ファイルが正常に読み込まれること"""
-    scripts = page.locator('script[src]')
-    if scripts.count() == 0:
+    scripts = _assets_of(asset_audit, "script")
+    if not scripts:
         return  # JS なしサイトはスキップ
 
-    for i in range(scripts.count()):
-        src = scripts.nth(i).get_attribute("src") or ""
-        if src.startswith("http"):
-            url = src
-        else:
-            url = page.url.rstrip("/") + "/" + src.lstrip("/")
-        resp = page.request.get(url)
-        assert resp.status == 200, f"JS の読み込みに失敗: {src} → HTTP {resp.status}"
+    failed = [r for r in scripts if not r.ok]
+    assert failed == [], "JS の読み込みに失敗:\n" + format_results(failed)
 
 
-def test_all_images_load(page: Page) -> None:
+def test_all_images_load(snapshot: PageSnapshot, asset_audit: list) -> None:
     """全画像が読み込まれること（lazy-load も含む）"""
-    # lazy-load をトリガーするためページ最下部にスクロール
-    page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-    page.wait_for_timeout(600)
-    page.evaluate("window.scrollTo(0, 0)")
-    page.wait_for_load_state("networkidle")
-
-    broken = page.evaluate("""() => {
-        return Array.from(document.images)
-            .filter(img => !img.complete || img.naturalWidth === 0)
-            .map(img => img.src);
-    }""")
+    # スナップショットはページ最下部までスクロールし、読み込み完了を待ってから取得している
+    broken = snapshot.broken_images
     assert broken == [], "読み込めない画像:\n" + "\n".join(broken)
 
+    # srcset の候補や <picture> の source など、今の画面幅では読まれない画像も HTTP で確認する
+    images = _assets_of(asset_audit, "image", "og-image")
+    failed = [r for r in images if not r.ok or not r.content_type.startswith("image/")]
+    assert failed == [], "画像として返らない URL:\n" + format_results(failed)
+
+
+def test_all_assets_reachable(asset_audit: list) -> None:
+    """ページが参照する全リソース（icon / preload / CSS の url() 等を含む）が HTTP 200 で返ること"""
+    failed = [r for r in asset_audit if not r.ok]
+    assert failed == [], "取得できないリソース:\n" + format_results(failed)
+
 
-def test_images_have_alt(page: Page) -> None:
+def test_images_have_alt(snapshot: PageSnapshot) -> None:
     """全 img 要素に alt 属性が設定されていること（アクセシビリティ）"""
-    missing = page.evaluate("""() => {
-        return Array.from(document.images)
-            .filter(img => img.alt === undefined || img.alt === null)
-            .map(img => img.src);
-    }""")
     # alt="" は許容（装飾画像）、属性なしは NG
+    missing = [img["src"] for img in snapshot.images if not img["has_alt"]]
     assert missing == [], "alt 属性がない画像:\n" + "\n".join(missing)
 
 
 # ── 3. モバイル表示 ──────────────────────────────────────────
 
-def test_no_horizontal_overflow_mobile(mobile_page: Page) -> None:
+def test_no_horizontal_overflow_mobile(mobile_snapshot: PageSnapshot) -> None:
     """モバイル (375px) で横スクロールが発生しないこと"""
-    overflow = mobile_page.evaluate("""() => {
-        return document.documentElement.scrollWidth > document.documentElement.clientWidth;
-    }""")
-    assert not overflow, "モバイル幅 (375px) で横スクロールが発生しています"
+    assert not mobile_snapshot.horizontal_overflow, "モバイル幅 (375px) で横スクロールが発生しています"
 
 
-def test_no_horizontal_overflow_tablet(tablet_page: Page) -> None:
+def test_no_horizontal_overflow_tablet(tablet_snapshot: PageSnapshot) -> None:
     """タブレット (768px) で横スクロールが発生しないこと"""
-    overflow = tablet_page.evaluate("""() => {
-        return document.documentElement.scrollWidth > document.documentElement.clientWidth;
-    }""")
-    assert not overflow, "タブレット幅 (768px) で横スクロールが発生しています"
+    assert not tablet_snapshot.horizontal_overflow, "タブレット幅 (768px) で横スクロールが発生しています"
 
 
 # ── 4. JavaScript エラー ─────────────────────────────────────
 
-def test_no_console_errors(page: Page, base_url: str) -> None:
+def test_no_console_errors(context: BrowserContext, base_url: str) -> None:
     """JavaScript の console.error / uncaught error がないこと"""
     errors: list[str] = []
 
@@ -138,8 +129,7 @@ def test_no_console_errors(page: Page, base_url: str) -> None:
     def handle_pageerror(exc):
         errors.append(str(exc))
 
-    # 新しいページで再読み込みして監視
-    context = page.context
+    # 新しいページで読み込みながら監視
     new_page = context.new_page()
     new_page.on("console", handle_console)
     new_page.on("pageerror", handle_pageerror)
@@ -168,7 +158,7 @@ def test_form_empty_submit_blocked(page: Page) -> None:
 
     # フォームまでスクロール
     form.scroll_into_view_if_needed()
-    page.wait_for_timeout(200)
+    settle(page)
 
     # 送信ボタンを探してクリック
     submit = form.locator('button[type="submit"], input[type="submit"]').first
@@ -176,7 +166,8 @@ def test_form_empty_submit_blocked(page: Page) -> None:
         return  # 送信ボタンが見つからない場合はスキップ
 
     submit.click()
-    page.wait_for_timeout(400)
+    # 送信処理によるスクロール・アニメーションが終わってから判定する
+    settle(page)
 
     # 成功メッセージが表示されていないことを確認（空送信でCVさせない）
     success_selectors = ["#form-success", ".form-success", "[data-success]"]
@@ -188,13 +179,12 @@ def test_form_empty_submit_blocked(page: Page) -> None:
 
 # ── 6. アクセシビリティ基本 ──────────────────────────────────
 
-def test_skip_nav_exists(page: Page) -> None:
+def test_skip_nav_exists(snapshot: PageSnapshot) -> None:
     """スキップナビゲーション（skip-to-content）リンクが存在すること"""
-    skip = page.locator('a[href="#main"], a[href^="#skip"], .skip-nav, [class*="skip"]')
-    assert skip.count() > 0, "スキップナビゲーションリンクが見つかりません"
+    assert snapshot.skip_nav_count > 0, "スキップナビゲーションリンクが見つかりません"
 
 
-def test_lang_attribute_exists(page: Page) -> None:
+def test_lang_attribute_exists(snapshot: PageSnapshot) -> None:
     """html 要素に lang 属性が設定されていること"""
-    lang = page.locator("html").get_attribute("lang")
+    lang = snapshot.lang
     assert lang and len(lang) > 0, 'html 要素に lang 属性がありません'
@@ -8,6 +8,8 @@
 """
 from playwright.sync_api import Page, expect
 
+from waits import wait_for_transitions
+
 
 # ── メニュータブ ──────────────────────────────────────────────
 
@@ -29,7 +31,7 @@ def test_menu_tab_switches_to_sweets(page: Page) -> None:
     page.locator("#menu").scroll_into_view_if_needed()
     sweets_tab = page.locator('#tab-sweets')
     sweets_tab.click()
-    page.wait_for_timeout(300)
+    expect(sweets_tab).to_have_attribute("aria-selected", "true")
 
     sweets_panel = page.locator('#panel-sweets')
     expect(sweets_panel).to_be_visible()
@@ -42,9 +44,9 @@ def test_menu_tab_switches_back_to_coffee(page: Page) -> None:
     """スイーツ→コーヒーと戻れること"""
     page.locator("#menu").scroll_into_view_if_needed()
     page.locator('#tab-sweets').click()
-    page.wait_for_timeout(200)
+    expect(page.locator('#tab-sweets')).to_have_attribute("aria-selected", "true")
     page.locator('#tab-coffee').click()
-    page.wait_for_timeout(300)
+    expect(page.locator('#tab-coffee')).to_have_attribute("aria-selected", "true")
 
     expect(page.locator('#panel-coffee')).to_be_visible()
     expect(page.locator('#panel-sweets')).to_be_hidden()
@@ -64,7 +66,6 @@ def test_faq_opens_on_click(page: Page) -> None:
     page.locator("#faq").scroll_into_view_if_needed()
     trigger = page.locator("#faq-trigger-1")
     trigger.click()
-    page.wait_for_timeout(400)
 
     expect(trigger).to_have_attribute("aria-expanded", "true")
 
@@ -75,11 +76,11 @@ def test_faq_closes_on_second_click(page: Page) -> None:
     trigger = page.locator("#faq-trigger-1")
 
     trigger.click()
-    page.wait_for_timeout(300)
     expect(trigger).to_have_attribute("aria-expanded", "true")
+    # 開くアニメーション（max-height）が終わってから閉じる
+    wait_for_transitions(page.locator("#faq"))
 
     trigger.click()
-    page.wait_for_timeout(300)
     expect(trigger).to_have_attribute("aria-expanded", "false")
 
 
@@ -95,7 +96,6 @@ def test_privacy_modal_opens(page: Page) -> None:
 
     privacy_link = page.locator(".js-privacy-open").first
     privacy_link.click()
-    page.wait_for_timeout(300)
 
     expect(modal).to_be_visible()
 
@@ -104,14 +104,15 @@ def test_privacy_modal_closes(page: Page) -> None:
     """モーダルの × ボタンをクリックするとモーダルが非表示になること"""
     page.locator("#contact").scroll_into_view_if_needed()
     page.locator(".js-privacy-open").first.click()
-    page.wait_for_timeout(300)
+    modal = page.locator("#modal-privacy")
+    expect(modal).to_be_visible()
+    wait_for_transitions(modal)
 
     # ボタン（×）を使って閉じる（オーバーレイと区別するため button タグを指定）
     close_btn = page.locator("#modal-privacy button.js-modal-close")
     close_btn.click()
-    page.wait_for_timeout(300)
 
-    expect(page.locator("#modal-privacy")).to_be_hidden()
+    expect(modal).to_be_hidden()
 
 
 # ── 統計カウンター ────────────────────────────────────────────
@@ -7,6 +7,8 @@
 """
 from playwright.sync_api import Page, expect
 
+from waits import wait_for_in_viewport, wait_for_scroll_idle
+
 
 def test_desktop_nav_links(page: Page) -> None:
     """デスクトップでナビリンクが 6 項目以上表示されること"""
@@ -47,10 +49,11 @@ def test_nav_link_scrolls_to_section(page: Page) -> None:
     concept_link.click(force=True)
 
     # スクロールアニメーション完了を待つ
-    page.wait_for_timeout(800)
+    wait_for_scroll_idle(page)
 
     # #concept がビューポート内に入っていること
     assert page.locator("#concept").count() == 1, "#concept が DOM にありません"
+    wait_for_in_viewport(page.locator("#concept"))
 
 
 def test_footer_nav_links(page: Page) -> None:
@@ -0,0 +1,393 @@
+"""
+表示性能の予算テスト（Core Web Vitals 相当）
+
+デスクトップ / モバイル / タブレットの各画面サイズでページを1回ずつ新しく読み込み、
+以下を計測して tests/budgets/{案件名}.json の予算と比較する。
+  - LCP（最大コンテンツの描画）・CLS（レイアウトのずれ）・TBT（メインスレッドの長いタスク）・FP（初回描画）
+  - リソースごとの転送サイズ（CDP の Network イベントで圧縮後のバイト数を取る）と合計
+  - 画像の読み込みヒント（LCP 画像が即時・fetchpriority="high"・preload 済みか、画面外の画像が lazy か。
+    build_hints.py で計測結果どおりに付け直せる。付け直した案件だけ予算に "image_hints": true を書いて有効にする）
+
+あわせて前回のベースライン（tests/budgets/{案件名}.baseline.json）と比べ、
+転送サイズが増えたリソースや、FP / FCP / LCP が遅くなった場合は差分表つきで失敗する
+（build_assets.py --critical などの改善の効果は、差分表をテスト結果に記録して確認する）。
+ベースラインがなければ今回の計測結果で作成する。意図した増加なら更新する:
+    python -m pytest tests/test_performance.py --update-perf-baseline
+
+CDP を使うため Chromium でのみ実行する（--har replay のときは計測しない）。
+"""
+import fnmatch
+import json
+from pathlib import Path
+
+import pytest
+from playwright.sync_api import Browser
+
+from conftest import VIEWPORTS, new_context, project_name
+
+BUDGET_DIR = Path(__file__).resolve().parent / "budgets"
+
+# 予算ファイルがない案件・項目に使う既定値（web.dev の "Good" の基準）
+DEFAULT_BUDGET = {
+    "lcp_ms": 2500,
+    "cls": 0.1,
+    "tbt_ms": 200,
+    "fp_ms": 1800,
+    "image_hints": False,   # True で画像の読み込みヒントを確認する（build_hints.py 適用済みの案件）
+}
+
+# ベースラインとの比較: この割合かつこのバイト数を超えて増えたら失敗
+REGRESSION_RATIO = 0.10
+REGRESSION_MIN_BYTES = 5 * 1024
+# 描画タイミングの比較: この割合かつこのミリ秒を超えて遅くなったら失敗（計測のぶれを吸収する）
+PAINT_REGRESSION_RATIO = 0.20
+PAINT_REGRESSION_MIN_MS = 100
+PAINT_METRICS = ("fp_ms", "fcp_ms", "lcp_ms")
+# これより下（どの画面サイズでもファーストビューに入らない位置）の画像は loading="lazy" であること
+LAZY_MIN_TOP = max(v["height"] for v in VIEWPORTS.values())
+
+# ページ読み込み前に仕込む計測スクリプト（buffered: true で登録前のエントリも拾う）
+PERF_OBSERVER_JS = """
+(() => {
+    const perf = window.__perf = { lcp: 0, cls: 0, fp: 0, fcp: 0, longtasks: [] };
+    const observe = (type, callback) => {
+        try {
+            new PerformanceObserver(list => list.getEntries().forEach(callback))
+                .observe({ type, buffered: true });
+        } catch (e) { /* 未対応のエントリ種別は無視 */ }
+    };
+    observe("largest-contentful-paint", e => {
+        perf.lcp = e.renderTime || e.loadTime || e.startTime;
+        window.__lcpElement = e.element;
+    });
+    observe("paint", e => {
+        if (e.name === "first-paint") perf.fp = e.startTime;
+        if (e.name === "first-contentful-paint") perf.fcp = e.startTime;
+    });
+    observe("longtask", e => { perf.longtasks.push([e.startTime, e.duration]); });
+    // CLS はセッションウィンドウ（間隔 1 秒未満・最大 5 秒）ごとの合計の最大値
+    let windowValue = 0, windowStart = 0, lastShift = 0;
+    observe("layout-shift", e => {
+        if (e.hadRecentInput) return;
+        if (e.startTime - lastShift > 1000 || e.startTime - windowStart > 5000) {
+            windowValue = 0;
+            windowStart = e.startTime;
+        }
+        windowValue += e.value;
+        lastShift = e.startTime;
+        perf.cls = Math.max(perf.cls, windowValue);
+    });
+})();
+"""
+
+
+# ── 予算・ベースライン ────────────────────────────────────────
+
+def load_budget(project: str, viewport: str) -> dict:
+    """
+    予算ファイルから画面サイズごとの予算を読む。
+    {"default": {...}, "mobile": {...}} のように書き、画面サイズ別の値が default を上書きする。
+    """
+    path = BUDGET_DIR / f"{project}.json"
+    data = json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+    budget = {**DEFAULT_BUDGET, **data.get("default", {}), **data.get(viewport, {})}
+    budget["resource_kb"] = {
+        **data.get("default", {}).get("resource_kb", {}),
+        **data.get(viewport, {}).get("resource_kb", {}),
+    }
+    return budget
+
+
+def baseline_path(project: str) -> Path:
+    return BUDGET_DIR / f"{project}.baseline.json"
+
+
+def load_baseline(project: str) -> dict:
+    path = baseline_path(project)
+    return json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+
+
+def save_baseline(project: str, viewport: str, metrics: dict) -> None:
+    """画面サイズ単位でベースラインを書き換える（他の画面サイズの記録は残す）"""
+    data = load_baseline(project)
+    data[viewport] = {
+        "lcp_ms": round(metrics["lcp_ms"]),
+        "cls": round(metrics["cls"], 4),
+        "tbt_ms": round(metrics["tbt_ms"]),
+        "fp_ms": round(metrics["fp_ms"]),
+        "fcp_ms": round(metrics["fcp_ms"]),
+        "total_bytes": metrics["total_bytes"],
+        "resources": dict(sorted(metrics["resources"].items())),
+    }
+    BUDGET_DIR.mkdir(exist_ok=True)
+    baseline_path(project).write_text(
+        json.dumps(data, ensure_ascii=False, indent=2) + "\n", encoding="utf-8",
+    )
+
+# 読み込み直後（スクロール前）の <img> の位置と読み込みヒント、LCP 画像が preload 済みかを返す
+IMAGE_HINTS_JS = """
+() => {
+    const abs = (url) => { try { return new URL(url, document.baseURI).href; } catch (e) { return null; } };
+    const candidates = (srcset) => (srcset || "").split(",").map(c => abs(c.trim().split(/\\s+/)[0])).filter(Boolean);
+    const preloaded = new Set();
+    document.querySelectorAll('link[rel~="preload"][as="image"]').forEach(l => {
+        if (l.getAttribute("href")) preloaded.add(l.href);
+        candidates(l.getAttribute("imagesrcset")).forEach(u => preloaded.add(u));
+    });
+    return [...document.querySelectorAll("img")].map(img => {
+        const r = img.getBoundingClientRect();
+        return {
+            src: img.getAttribute("src") || "",
+            loading: img.getAttribute("loading"),
+            fetchpriority: img.getAttribute("fetchpriority"),
+            top: r.top,
+            in_view: r.width > 0 && r.height > 0 && r.top < innerHeight && r.bottom > 0,
+            lcp: img === window.__lcpElement,
+            preloaded: preloaded.has(img.currentSrc),
+        };
+    });
+}
+"""
+
+
+# ── 計測 ─────────────────────────────────────────────────────
+
+def resource_key(url: str, base_url: str) -> str:
+    """同じ案件内のリソースは base_url からの相対パス、外部リソースは URL のまま"""
+    if url.startswith(base_url):
+        return url[len(base_url):] or "index.html"
+    return url
+
+
+def measure(browser: Browser, context_args: dict, base_url: str, viewport: str, cpu_slowdown: float) -> dict:
+    """新しいコンテキスト（キャッシュなし）で1回読み込み、指標と転送サイズを返す"""
+    context = new_context(browser, context_args, None, VIEWPORTS[viewport])
+    try:
+        page = context.new_page()
+        page.add_init_script(PERF_OBSERVER_JS)
+
+        cdp = context.new_cdp_session(page)
+        urls: dict = {}
+        sizes: dict = {}
+        cdp.on("Network.responseReceived", lambda e: urls.__setitem__(e["requestId"], e["response"]["url"]))
+        cdp.on("Network.loadingFinished", lambda e: sizes.__setitem__(e["requestId"], e["encodedDataLength"]))
+        cdp.send("Network.enable")
+        if cpu_slowdown > 1:
+            cdp.send("Emulation.setCPUThrottlingRate", {"rate": cpu_slowdown})
+
+        page.goto(base_url, wait_until="load")
+        page.wait_for_load_state("networkidle")
+        # 最後の LCP / layout-shift エントリが届くよう 2 フレーム待つ
+        page.evaluate("() => new Promise(r => requestAnimationFrame(() => requestAnimationFrame(r)))")
+        perf = page.evaluate("() => window.__perf")
+        images = page.evaluate(IMAGE_HINTS_JS)
+    finally:
+        context.close()
+
+    resources: dict = {}
+    for request_id, size in sizes.items():
+        url = urls.get(request_id)
+        if url and not url.startswith("data:"):
+            key = resource_key(url, base_url)
+            resources[key] = resources.get(key, 0) + int(size)
+
+    # TBT: FCP 以降の長いタスクのうち 50ms を超えた部分の合計
+    tbt = sum(max(0, duration - 50) for start, duration in perf["longtasks"] if start >= perf["fcp"])
+    return {
+        "lcp_ms": perf["lcp"],
+        "cls": perf["cls"],
+        "tbt_ms": tbt,
+        "fp_ms": perf["fp"],
+        "fcp_ms": perf["fcp"],
+        "total_bytes": sum(resources.values()),
+        "resources": resources,
+        "images": images,
+    }
+
+
+@pytest.fixture(scope="module", params=list(VIEWPORTS))
+def perf(request, browser: Browser, browser_context_args: dict, har, base_url: str) -> dict:
+    """画面サイズごとに1回だけ計測する（同じ画面サイズのテストは結果を共有する）"""
+    if browser.browser_type.name != "chromium":
+        pytest.skip("性能計測は CDP が使える Chromium でのみ実行します")
+    if har:
+        pytest.skip("HAR 再生中は転送サイズ・タイミングが実際と異なるため計測しません")
+
+    viewport = request.param
+    project = project_name(base_url)
+    budget = load_budget(project, viewport)
+    metrics = measure(browser, browser_context_args, base_url, viewport, budget.get("cpu_slowdown", 1))
+
+    baseline = load_baseline(project).get(viewport)
+    if baseline is None or request.config.getoption("update_perf_baseline"):
+        save_baseline(project, viewport, metrics)
+        baseline = None
+
+    return {"viewport": viewport, "budget": budget, "metrics": metrics, "baseline": baseline}
+
+
+# ── 指標の予算 ───────────────────────────────────────────────
+
+def test_lcp_within_budget(perf: dict) -> None:
+    """LCP が予算内であること"""
+    lcp, limit = perf["metrics"]["lcp_ms"], perf["budget"]["lcp_ms"]
+    assert lcp <= limit, f"[{perf['viewport']}] LCP {lcp:.0f}ms が予算 {limit}ms を超えています"
+
+
+def test_cls_within_budget(perf: dict) -> None:
+    """CLS が予算内であること"""
+    cls, limit = perf["metrics"]["cls"], perf["budget"]["cls"]
+    assert cls <= limit, f"[{perf['viewport']}] CLS {cls:.3f} が予算 {limit} を超えています"
+
+
+def test_tbt_within_budget(perf: dict) -> None:
+    """TBT（長いタスクによるブロック時間）が予算内であること"""
+    tbt, limit = perf["metrics"]["tbt_ms"], perf["budget"]["tbt_ms"]
+    assert tbt <= limit, f"[{perf['viewport']}] TBT {tbt:.0f}ms が予算 {limit}ms を超えています"
+
+
+def test_first_paint_within_budget(perf: dict) -> None:
+    """初回描画（FP）が予算内であること"""
+    fp, limit = perf["metrics"]["fp_ms"], perf["budget"]["fp_ms"]
+    assert 0 < fp <= limit, f"[{perf['viewport']}] FP {fp:.0f}ms が予算 {limit}ms を超えています"
+
+
+# ── 転送サイズ ───────────────────────────────────────────────
+
+def test_total_transfer_within_budget(perf: dict) -> None:
+    """初回読み込みの合計転送サイズが予算内であること"""
+    limit_kb = perf["budget"].get("total_kb")
+    if limit_kb is None:
+        pytest.skip("total_kb の予算が設定されていません")
+    total_kb = perf["metrics"]["total_bytes"] / 1024
+    top = sorted(perf["metrics"]["resources"].items(), key=lambda kv: -kv[1])[:10]
+    detail = "\n".join(f"  {size / 1024:8.1f} KB  {key}" for key, size in top)
+    assert total_kb <= limit_kb, (
+        f"[{perf['viewport']}] 合計転送サイズ {total_kb:.0f} KB が予算 {limit_kb} KB を超えています\n"
+        f"大きいリソース:\n{detail}"
+    )
+
+
+def resource_budget(key: str, limits: dict) -> tuple:
+    """
+    key に当てはまる予算のうち最も具体的なもの（ワイルドカード以外の文字が多いもの。同じなら先に書いたもの）を返す。
+    戻り値: (パターン, 予算[KB])。当てはまるものがなければ (None, None)
+    """
+    matched = [(pattern, kb) for pattern, kb in limits.items() if fnmatch.fnmatch(key, pattern)]
+    if not matched:
+        return None, None
+    return max(matched, key=lambda m: len(m[0]) - sum(m[0].count(c) for c in "*?[]"))
+
+
+def test_resources_within_budget(perf: dict) -> None:
+    """
+    リソースごとの予算（resource_kb。パスはワイルドカード可）を超えていないこと。
+    複数のパターンに当てはまるリソースは最も具体的なパターンの予算だけで判定する
+    （"assets/images/hero*" と "assets/images/*" なら hero 画像は前者）。
+    """
+    over = []
+    for key, size in perf["metrics"]["resources"].items():
+        pattern, limit_kb = resource_budget(key, perf["budget"]["resource_kb"])
+        if pattern is not None and size / 1024 > limit_kb:
+            over.append(f"  {key}: {size / 1024:.1f} KB > {limit_kb} KB（{pattern}）")
+    assert over == [], f"[{perf['viewport']}] 予算を超えたリソース:\n" + "\n".join(over)
+
+
+def test_no_transfer_regression(perf: dict) -> None:
+    """前回のベースラインから転送サイズが大きく増えたリソースがないこと"""
+    baseline = perf["baseline"]
+    if baseline is None:
+        pytest.skip("今回の計測結果でベースラインを作成・更新したため比較しません")
+
+    before, after = baseline["resources"], perf["metrics"]["resources"]
+    regressed = []
+    rows = []
+    for key in sorted(set(before) | set(after)):
+        old, new = before.get(key, 0), after.get(key, 0)
+        if old == new:
+            continue
+        mark = " "
+        if new - old > max(REGRESSION_MIN_BYTES, old * REGRESSION_RATIO):
+            regressed.append(key)
+            mark = "!"
+        rows.append(f" {mark} {old / 1024:8.1f} KB → {new / 1024:8.1f} KB  ({(new - old) / 1024:+.1f} KB)  {key}")
+
+    assert regressed == [], (
+        f"[{perf['viewport']}] 転送サイズが増えたリソースがあります（! が閾値超え）\n"
+        + "\n".join(rows)
+        + "\n意図した変更なら --update-perf-baseline でベースラインを更新してください"
+    )
+
+
+# ── 画像の読み込みヒント ─────────────────────────────────────
+
+def skip_unless_image_hints(perf: dict) -> None:
+    """予算で image_hints が有効な案件だけ確認する（build_hints.py 未適用のページは対象外）"""
+    if not perf["budget"]["image_hints"]:
+        pytest.skip('image_hints の確認が無効です（build_hints.py 適用後に予算へ "image_hints": true を追加）')
+
+
+def test_lcp_image_prioritized(perf: dict) -> None:
+    """LCP が画像なら、lazy ではなく fetchpriority="high" で、<link rel="preload"> で先読みされていること"""
+    skip_unless_image_hints(perf)
+    lcp = next((img for img in perf["metrics"]["images"] if img["lcp"]), None)
+    if lcp is None:
+        pytest.skip("LCP 要素が画像ではありません")
+
+    problems = []
+    if lcp["loading"] == "lazy":
+        problems.append('loading="lazy" が付いています')
+    if lcp["fetchpriority"] != "high":
+        problems.append('fetchpriority="high" がありません')
+    if not lcp["preloaded"]:
+        problems.append('<link rel="preload" as="image"> で先読みされていません')
+    assert problems == [], (
+        f"[{perf['viewport']}] LCP 画像 {lcp['src']} の読み込みヒント:\n"
+        + "\n".join(f"  - {p}" for p in problems)
+        + "\npython build_hints.py で計測結果どおりに付け直せます"
+    )
+
+
+def test_offscreen_images_lazy(perf: dict) -> None:
+    """ファーストビューの画像は lazy でなく、どの画面サイズでも画面外になる位置の画像は lazy であること"""
+    skip_unless_image_hints(perf)
+    images = perf["metrics"]["images"]
+    lazy_in_view = [img["src"] for img in images if img["in_view"] and img["loading"] == "lazy"]
+    eager_below = [
+        img["src"] for img in images
+        if not img["in_view"] and img["top"] >= LAZY_MIN_TOP and img["loading"] != "lazy"
+    ]
+    assert lazy_in_view == [] and eager_below == [], (
+        f"[{perf['viewport']}] 読み込みヒントが配置と合っていません\n"
+        + "".join(f"  ファーストビューなのに lazy: {src}\n" for src in lazy_in_view)
+        + "".join(f"  画面外なのに lazy でない: {src}\n" for src in eager_below)
+        + "python build_hints.py で計測結果どおりに付け直せます"
+    )
+
+
+# ── 描画タイミング ───────────────────────────────────────────
+
+def test_no_paint_regression(perf: dict, record_property) -> None:
+    """前回のベースラインから FP / FCP / LCP が大きく遅くなっていないこと（差分はテスト結果に記録する）"""
+    baseline = perf["baseline"]
+    if baseline is None:
+        pytest.skip("今回の計測結果でベースラインを作成・更新したため比較しません")
+
+    regressed = []
+    rows = []
+    for key in PAINT_METRICS:
+        if key not in baseline:
+            continue
+        old, new = baseline[key], perf["metrics"][key]
+        mark = " "
+        if new - old > max(PAINT_REGRESSION_MIN_MS, old * PAINT_REGRESSION_RATIO):
+            regressed.append(key)
+            mark = "!"
+        rows.append(f" {mark} {key:<7} {old:7.0f}ms → {new:7.0f}ms  ({new - old:+.0f}ms)")
+        record_property(f"{perf['viewport']}_{key}_delta", round(new - old))
+
+    assert regressed == [], (
+        f"[{perf['viewport']}] 描画が遅くなりました（! が閾値超え）\n"
+        + "\n".join(rows)
+        + "\n意図した変更なら --update-perf-baseline でベースラインを更新してください"
+    )
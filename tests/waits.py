@@ -0,0 +1,113 @@
+"""
+イベント駆動の待機ヘルパー
+
+page.wait_for_timeout() の固定待ちの代わりに、ブラウザで実際に起きる事象を待つ。
+固定待ちより速く（終わった瞬間に進む）、負荷の高い CI でも待ち不足にならない。
+
+  wait_for_transitions(locator)   CSS トランジション / アニメーションの終了
+                                  （transitionend / animationend と同じタイミング）
+  wait_for_in_viewport(locator)   要素が画面内に入ったこと（IntersectionObserver）
+  wait_for_scroll_idle(page)      スムーズスクロールの停止
+  settle(page)                    スクロール停止 + ページ全体のアニメーション終了
+  load_all_images(page)           ページを1画面ずつスクロールし、画面に入った画像の decode() を待つ
+
+属性や表示状態の変化は expect()（自動でポーリングする）で待つ:
+  expect(trigger).to_have_attribute("aria-expanded", "true")
+"""
+from playwright.sync_api import Locator, Page
+
+# 要素（と子孫）で実行中のアニメーションが全て終わるのを待つ。
+# CSS トランジション / アニメーションは Web Animations として取れるので、
+# transitionend / animationend を個別に待つのと違い、何も動いていなければすぐ戻る。
+_TRANSITIONS_JS = """
+async (el) => {
+    await new Promise(r => requestAnimationFrame(() => requestAnimationFrame(r)));
+    const running = () => el.getAnimations({ subtree: true })
+        .filter(a => a.playState === "running" && a.effect?.getComputedTiming().iterations !== Infinity);
+    for (let list = running(); list.length; list = running()) {
+        await Promise.all(list.map(a => a.finished.catch(() => null)));
+    }
+}
+"""
+
+_IN_VIEWPORT_JS = """
+(el) => new Promise(resolve => {
+    const io = new IntersectionObserver(entries => {
+        if (entries.some(e => e.isIntersecting)) {
+            io.disconnect();
+            resolve();
+        }
+    });
+    io.observe(el);
+})
+"""
+
+# scrollY が 3 フレーム続けて変わらなければ停止とみなす（scrollend 未対応のブラウザでも動く）
+_SCROLL_IDLE_JS = """
+() => new Promise(resolve => {
+    let last = -1, still = 0;
+    const tick = () => {
+        still = window.scrollY === last ? still + 1 : 0;
+        last = window.scrollY;
+        if (still >= 3) resolve();
+        else requestAnimationFrame(tick);
+    };
+    requestAnimationFrame(tick);
+})
+"""
+
+# 画面に入った img だけ decode() を待つ（display:none のタブ内画像などは対象外）
+_LOAD_ALL_IMAGES_JS = """
+async () => {
+    const frame = () => new Promise(r => requestAnimationFrame(() => requestAnimationFrame(r)));
+    // scroll-behavior: smooth のページでも 1 回で移動させる（途中で止まると先の画像が読み込まれない）
+    const jump = (y) => window.scrollTo({ top: y, behavior: "instant" });
+    const decoding = [];
+    const io = new IntersectionObserver(entries => {
+        for (const e of entries) {
+            if (!e.isIntersecting) continue;
+            decoding.push(e.target.decode().catch(() => null));
+            io.unobserve(e.target);
+        }
+    });
+    Array.from(document.images).forEach(img => io.observe(img));
+
+    const height = () => document.documentElement.scrollHeight;
+    for (let y = 0; y < height(); y += window.innerHeight) {
+        jump(y);
+        await frame();
+    }
+    jump(height());
+    await frame();
+    io.disconnect();
+    await Promise.all(decoding);
+    jump(0);
+}
+"""
+
+
+def wait_for_transitions(locator: Locator) -> None:
+    """要素（と子孫）の CSS トランジション / アニメーションが終わるまで待つ"""
+    locator.evaluate(_TRANSITIONS_JS)
+
+
+def wait_for_in_viewport(locator: Locator) -> None:
+    """要素が画面内に入るまで待つ"""
+    locator.evaluate(_IN_VIEWPORT_JS)
+
+
+def wait_for_scroll_idle(page: Page) -> None:
+    """スムーズスクロールが止まるまで待つ"""
+    page.evaluate(_SCROLL_IDLE_JS)
+
+
+def settle(page: Page) -> None:
+    """スクロールが止まり、ページ全体のアニメーションが終わるまで待つ"""
+    wait_for_scroll_idle(page)
+    wait_for_transitions(page.locator("body"))
+
+
+def load_all_images(page: Page) -> None:
+    """lazy-load を含む全画像を読み込む（1画面ずつスクロールして decode() を待ち、先頭に戻る）"""
+    page.evaluate(_LOAD_ALL_IMAGES_JS)
+    page.wait_for_load_state("networkidle")